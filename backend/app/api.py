@@ -0,0 +1,667 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+REST API 路由（資料存取層 + 排班規則增量檢查器）
+資料存取層與檢查器由子系統登錄表在第一次使用時建立
+"""
+
+import os
+import math
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+
+from app.models import LeaveRequest, LeaveRequestChangeResult, Schedule, StoreStaff, ScheduleChangeResult, SchedulingRule, Staff
+from app.validation import SHIFT_TYPES, ScheduleValidatorService, shift_durations, to_rule_schedule
+from scheduling.roster import DEFAULT_REPAIR_BUDGET, DEFAULT_TIME_BUDGET, generate_roster
+from storage.pagination import (
+    MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, parse_fields, project, split_page
+)
+from storage.repository import ConflictError, Repository
+
+# 檢查範圍內排班超過此筆數時，各品牌分區送到共用行程池平行檢查
+PARALLEL_VALIDATION_THRESHOLD = 20000
+# 自動排班的區域搜尋時間預算上限（秒）
+MAX_ROSTER_TIME_BUDGET = 10.0
+# 自動排班多起點搜尋的起點數上限；各起點在共用行程池執行
+MAX_ROSTER_STARTS = 16
+# 多起點搜尋每個品牌的預估耗時上限（秒）：ceil(起點數 / 行程數) × time_budget
+MAX_MULTISTART_SECONDS = 30.0
+
+router = APIRouter()
+notifications_router = APIRouter()
+
+
+# 子系統依賴：已建立時直接取用，第一次使用時在執行緒中建立
+async def get_repository(request: Request) -> Repository:
+    return await request.app.state.subsystems.aget("repository")
+
+async def get_validator(request: Request) -> ScheduleValidatorService:
+    return await request.app.state.subsystems.aget("validator")
+
+async def get_push_queue(request: Request):
+    return await request.app.state.subsystems.aget("push_queue")
+
+async def get_process_pool(request: Request):
+    return await request.app.state.subsystems.aget("process_pool")
+
+async def get_roster_batches(request: Request):
+    return await request.app.state.subsystems.aget("roster_batches")
+
+async def get_my_schedule(request: Request):
+    """個人排班快取：尚未建立（沒有人查詢過）或未啟用 LINE Bot 時為 None，不需要失效"""
+    subsystems = request.app.state.subsystems
+    return subsystems.get("my_schedule") if subsystems.constructed("my_schedule") else None
+
+
+def init_sample_data(repository: Repository):
+    """初始化範例資料"""
+    now = datetime.now().isoformat()
+    today = datetime.now().date().isoformat()
+
+    # 員工資料
+    sample_staff = [
+        Staff(id="staff_1", employee_id="E001", name="王小美", brand_id="brand_1",
+              phone="0912-345-678", monthly_available_hours=160, min_rest_days_per_month=8),
+        Staff(id="staff_2", employee_id="E002", name="李小雅", brand_id="brand_1",
+              phone="0912-345-679", monthly_available_hours=160, min_rest_days_per_month=8),
+        Staff(id="staff_3", employee_id="E003", name="張小婷", brand_id="brand_2",
+              phone="0912-345-680", monthly_available_hours=150, min_rest_days_per_month=8),
+    ]
+
+    # 排班資料
+    sample_schedules = [
+        Schedule(id="schedule_1", staff_id="staff_1", shift_type_id="早班", schedule_date=today),
+        Schedule(id="schedule_2", staff_id="staff_2", shift_type_id="晚班", schedule_date=today),
+    ]
+
+    # 請假資料
+    sample_leaves = [
+        LeaveRequest(id="leave_1", staff_id="staff_1", leave_type="事假", start_date="2026-01-20",
+                     end_date="2026-01-20", reason="個人事情", status="pending", created_at=now),
+        LeaveRequest(id="leave_2", staff_id="staff_2", leave_type="病假", start_date="2026-01-18",
+                     end_date="2026-01-19", reason="身體不適", status="approved",
+                     created_at=now, approved_at=now),
+    ]
+
+    # 範例規則
+    sample_rules = [
+        SchedulingRule(id="rule_1", rule_name="每班最少人數", rule_type="min_staff_per_shift",
+                       rule_value=2, description="每個班次至少需要2名員工"),
+        SchedulingRule(id="rule_2", rule_name="每月最少休息天數", rule_type="min_rest_days",
+                       rule_value=8, description="每位員工每月至少休息8天"),
+        SchedulingRule(id="rule_3", rule_name="每月最多工作時數", rule_type="max_monthly_hours",
+                       rule_value=200, description="每位員工每月最多工作200小時"),
+    ]
+
+    repository.upsert("staff", [dict(staff) for staff in sample_staff])
+    repository.upsert("schedules", [dict(schedule) for schedule in sample_schedules])
+    repository.upsert("leave_requests", [dict(leave) for leave in sample_leaves])
+    repository.upsert("scheduling_rules", [dict(rule) for rule in sample_rules])
+
+
+def _rule_schedule(schedule: dict, durations: Dict[str, int]):
+    try:
+        return to_rule_schedule(schedule, durations)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid schedule_date, expected YYYY-MM-DD")
+
+def _change_result(schedule: dict, delta) -> ScheduleChangeResult:
+    return ScheduleChangeResult(
+        **schedule,
+        new_violations=[asdict(v) for v in delta.appeared],
+        resolved_violations=[asdict(v) for v in delta.cleared]
+    )
+
+def _conflict(e: ConflictError) -> HTTPException:
+    return HTTPException(status_code=409, detail=str(e))
+
+def _roster_changed(my_schedule, *rows: Optional[dict]):
+    """排班或請假異動後，使相關員工的個人排班快取失效"""
+    if my_schedule is None:
+        return
+    for staff_id in {row['staff_id'] for row in rows if row and row['staff_id']}:
+        my_schedule.invalidate(staff_id)
+
+def _page_request(model, cursor: Optional[str], key_size: int, fields: Optional[str]):
+    """解析分頁游標與投影欄位，格式錯誤回傳 400"""
+    try:
+        after = decode_cursor(cursor, key_size) if cursor else None
+        selected = parse_fields(fields, model.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return after, selected or list(model.model_fields)
+
+def _page_response(rows: List[dict], fields: List[str], next_cursor: Optional[str]) -> JSONResponse:
+    """分頁或投影的回應直接輸出 JSON，不經過 response_model 驗證"""
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return JSONResponse(content=project(rows, fields), headers=headers)
+
+# 員工管理 API
+@router.get("/api/staff", response_model=List[Staff])
+def get_all_staff(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    repository: Repository = Depends(get_repository)
+):
+    """獲取所有員工資料，依 id 排序，cursor 為 id 游標"""
+    if not (cursor or limit or fields):
+        return repository.list("staff")
+
+    after, selected = _page_request(Staff, cursor, 1, fields)
+    rows = repository.list("staff", after, limit + 1 if limit else None)
+    rows, next_cursor = split_page(rows, limit, lambda s: (s["id"],))
+    return _page_response(rows, selected, next_cursor)
+
+@router.get("/api/staff/{staff_id}", response_model=Staff)
+def get_staff(staff_id: str, repository: Repository = Depends(get_repository)):
+    """獲取特定員工資料"""
+    staff = repository.get("staff", staff_id)
+    if staff is None:
+        raise HTTPException(status_code=404, detail="Staff not found")
+    return staff
+
+@router.post("/api/staff", response_model=Staff)
+def create_staff(staff: Staff, repository: Repository = Depends(get_repository),
+                 checker: ScheduleValidatorService = Depends(get_validator),
+                 my_schedule=Depends(get_my_schedule)):
+    """建立新員工"""
+    staff.id = None
+    with checker.write() as validator:
+        try:
+            row = repository.insert("staff", dict(staff))
+        except ConflictError as e:
+            raise _conflict(e)
+        validator.set_staff(checker.rule_staff())
+    if my_schedule is not None:
+        my_schedule.invalidate_staff(row['id'])
+    return row
+
+@router.put("/api/staff/{staff_id}", response_model=Staff)
+def update_staff(staff_id: str, staff: Staff, repository: Repository = Depends(get_repository),
+                 checker: ScheduleValidatorService = Depends(get_validator),
+                 my_schedule=Depends(get_my_schedule)):
+    """更新員工資料"""
+    with checker.write() as validator:
+        try:
+            row = repository.update("staff", staff_id, dict(staff))
+        except ConflictError as e:
+            raise _conflict(e)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Staff not found")
+        validator.set_staff(checker.rule_staff())
+    if my_schedule is not None:
+        my_schedule.invalidate_staff(staff_id)
+    return row
+
+@router.delete("/api/staff/{staff_id}")
+def delete_staff(staff_id: str, repository: Repository = Depends(get_repository),
+                 checker: ScheduleValidatorService = Depends(get_validator),
+                 my_schedule=Depends(get_my_schedule)):
+    """刪除員工資料"""
+    with checker.write() as validator:
+        if repository.delete("staff", staff_id) is None:
+            raise HTTPException(status_code=404, detail="Staff not found")
+        validator.set_staff(checker.rule_staff())
+    if my_schedule is not None:
+        my_schedule.invalidate_staff(staff_id)
+    return {"message": "Staff deleted successfully"}
+
+# 排班管理 API
+@router.get("/api/schedules", response_model=List[Schedule])
+def get_schedules(
+    staff_id: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    repository: Repository = Depends(get_repository)
+):
+    """獲取排班資料，依 (schedule_date, id) 排序，cursor 為該排序鍵的游標"""
+    if not (cursor or limit or fields):
+        return repository.list_schedules(staff_id, date_from, date_to)
+
+    after, selected = _page_request(Schedule, cursor, 2, fields)
+    # 多取一筆判斷是否有下一頁
+    rows = repository.list_schedules(staff_id, date_from, date_to, after, limit + 1 if limit else None)
+    rows, next_cursor = split_page(rows, limit, lambda s: (s["schedule_date"], s["id"]))
+    return _page_response(rows, selected, next_cursor)
+
+@router.get("/api/schedules/{schedule_id}", response_model=Schedule)
+def get_schedule(schedule_id: str, repository: Repository = Depends(get_repository)):
+    """獲取特定排班資料"""
+    schedule = repository.get("schedules", schedule_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return schedule
+
+@router.post("/api/schedules", response_model=ScheduleChangeResult)
+def create_schedule(schedule: Schedule, repository: Repository = Depends(get_repository),
+                    checker: ScheduleValidatorService = Depends(get_validator),
+                    my_schedule=Depends(get_my_schedule)):
+    """建立新排班"""
+    schedule.id = None
+    durations = shift_durations()
+    _rule_schedule(dict(schedule), durations)
+
+    with checker.write() as validator:
+        try:
+            row = repository.insert("schedules", dict(schedule))
+        except ConflictError as e:
+            raise _conflict(e)
+        # 只檢查受影響的班別、員工月份與連續工作區段
+        delta = validator.add(_rule_schedule(row, durations))
+    _roster_changed(my_schedule, row)
+    return _change_result(row, delta)
+
+@router.put("/api/schedules/{schedule_id}", response_model=ScheduleChangeResult)
+def update_schedule(schedule_id: str, schedule: Schedule, repository: Repository = Depends(get_repository),
+                    checker: ScheduleValidatorService = Depends(get_validator),
+                    my_schedule=Depends(get_my_schedule)):
+    """更新排班資料"""
+    schedule.id = schedule_id
+    rule_schedule = _rule_schedule(dict(schedule), shift_durations())
+
+    with checker.write() as validator:
+        # 排班改給其他員工時，原員工的快取也要失效
+        previous = repository.get("schedules", schedule_id) if my_schedule is not None else None
+        try:
+            row = repository.update("schedules", schedule_id, dict(schedule))
+        except ConflictError as e:
+            raise _conflict(e)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        delta = validator.update(rule_schedule)
+    _roster_changed(my_schedule, previous, row)
+    return _change_result(row, delta)
+
+@router.delete("/api/schedules/{schedule_id}")
+def delete_schedule(schedule_id: str, repository: Repository = Depends(get_repository),
+                    checker: ScheduleValidatorService = Depends(get_validator),
+                    my_schedule=Depends(get_my_schedule)):
+    """刪除排班資料"""
+    with checker.write() as validator:
+        row = repository.delete("schedules", schedule_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        delta = validator.remove(schedule_id)
+    _roster_changed(my_schedule, row)
+    return {
+        "message": "Schedule deleted successfully",
+        "new_violations": [asdict(v) for v in delta.appeared],
+        "resolved_violations": [asdict(v) for v in delta.cleared]
+    }
+
+@router.post("/api/schedules/generate")
+def generate_schedules(
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    brand_id: Optional[str] = None,
+    time_budget: float = Query(DEFAULT_TIME_BUDGET, gt=0, le=MAX_ROSTER_TIME_BUDGET),
+    seed: int = 0,
+    starts: int = Query(1, ge=1, le=MAX_ROSTER_STARTS),
+    save: bool = False,
+    repository: Repository = Depends(get_repository),
+    checker: ScheduleValidatorService = Depends(get_validator),
+    my_schedule=Depends(get_my_schedule),
+    pool=Depends(get_process_pool)
+):
+    """
+    自動產生整月排班；該月既有排班不變動，save=true 時整批寫入，否則只回傳預覽
+
+    人力不跨品牌：未指定 brand_id 時各品牌分別排班（time_budget 為每個品牌的上限），
+    每班人數與品牌專屬規則在品牌內計算。全店大量專櫃請使用 /api/roster-batches。
+    starts > 1 時以 seed..seed+starts-1 在共用行程池平行搜尋，取目標值最佳者；
+    預估耗時超過 MAX_MULTISTART_SECONDS 時回應 422
+    """
+    from app.process_pool import pool_workers
+    from app.roster import load_roster_problem, merge_results, roster_rows, roster_summary
+    from scheduling.batch import RosterPartition, partition_problem
+
+    workers = pool_workers(pool)
+    if starts > 1 and math.ceil(starts / workers) * time_budget > MAX_MULTISTART_SECONDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{starts} starts x {time_budget}s on {workers} workers exceeds "
+                   f"{MAX_MULTISTART_SECONDS}s; lower starts or time_budget, or use /api/roster-batches"
+        )
+
+    problem = load_roster_problem(repository, year, month, brand_id)
+    partitions = partition_problem(problem, "brand") if brand_id is None else [RosterPartition(brand_id, problem)]
+    brands = []
+    for partition in partitions:
+        multistart = None
+        if starts > 1:
+            from scheduling.multistart import generate_roster_multistart
+
+            multistart = generate_roster_multistart(partition.problem, seeds=range(seed, seed + starts),
+                                                    time_budget=time_budget, max_workers=workers,
+                                                    executor=pool)
+            brand_result = multistart.best
+        else:
+            brand_result = generate_roster(partition.problem, time_budget=time_budget, seed=seed)
+        brands.append((partition.key, brand_result, multistart))
+
+    result = merge_results([brand_result for _, brand_result, _ in brands])
+    rows = roster_rows(result.assignments)
+    if save and rows:
+        with checker.bulk_write():
+            repository.upsert("schedules", rows)
+        _roster_changed(my_schedule, *rows)
+
+    return {
+        "year": year,
+        "month": month,
+        "brand_id": brand_id,
+        "saved": save and bool(rows),
+        **roster_summary(result),
+        "brands": [
+            {"brand_id": key,
+             **{k: v for k, v in roster_summary(brand_result).items() if k != "hours"},
+             "multistart": multistart.summary() if multistart else None}
+            for key, brand_result, multistart in brands
+        ],
+        "schedules": rows,
+    }
+
+@router.post("/api/roster-batches", status_code=202)
+def start_roster_batch(
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    partition_by: str = Query("brand", pattern="^(brand|store)$"),
+    time_budget: float = Query(DEFAULT_TIME_BUDGET, gt=0, le=MAX_ROSTER_TIME_BUDGET),
+    seed: int = 0,
+    restart: bool = False,
+    stores: Optional[List[StoreStaff]] = None,
+    runner=Depends(get_roster_batches)
+):
+    """
+    全店整月批次排班（背景執行，以 GET /api/roster-batches/{job_id} 查詢進度）
+
+    partition_by=store 時本體為專櫃列表（stores 資料表的 id 與 staff）；
+    相同月份與分區方式重新執行時略過已完成的分區；restart=true 先刪除該月份先前批次排班
+    寫入的排班（備註「批次排班」）與檢查點再從頭執行，否則先前寫入的排班會被當成既有排班保留
+    """
+    from app.roster_batch import BatchRunningError
+
+    if partition_by == "store" and stores is None:
+        raise HTTPException(status_code=422, detail="stores is required when partitioning by store")
+    try:
+        job = runner.start(year, month, partition_by,
+                           stores=[dict(store) for store in stores] if stores is not None else None,
+                           time_budget=time_budget, seed=seed, restart=restart)
+    except BatchRunningError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.to_dict()
+
+@router.get("/api/roster-batches")
+def get_roster_batches_status(runner=Depends(get_roster_batches)):
+    """批次排班列表（不含各分區明細）"""
+    return [{k: v for k, v in job.to_dict().items() if k != "partitions"} for job in runner.jobs()]
+
+@router.get("/api/roster-batches/{job_id}")
+def get_roster_batch(job_id: str, runner=Depends(get_roster_batches)):
+    """批次排班進度與各分區耗時"""
+    job = runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Roster batch not found")
+    return job.to_dict()
+
+# 排班規則 API
+@router.get("/api/rules", response_model=List[SchedulingRule])
+def get_rules(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    repository: Repository = Depends(get_repository)
+):
+    """獲取所有排班規則，依 id 排序，cursor 為 id 游標"""
+    if not (cursor or limit or fields):
+        return repository.list("scheduling_rules")
+
+    after, selected = _page_request(SchedulingRule, cursor, 1, fields)
+    rows = repository.list("scheduling_rules", after, limit + 1 if limit else None)
+    rows, next_cursor = split_page(rows, limit, lambda r: (r["id"],))
+    return _page_response(rows, selected, next_cursor)
+
+@router.post("/api/rules", response_model=SchedulingRule)
+def create_rule(rule: SchedulingRule, repository: Repository = Depends(get_repository),
+                checker: ScheduleValidatorService = Depends(get_validator)):
+    """建立新排班規則"""
+    rule.id = None
+    with checker.write() as validator:
+        row = repository.insert("scheduling_rules", dict(rule))
+        validator.set_rules(checker.active_rules())
+    return row
+
+@router.put("/api/rules/{rule_id}", response_model=SchedulingRule)
+def update_rule(rule_id: str, rule: SchedulingRule, repository: Repository = Depends(get_repository),
+                checker: ScheduleValidatorService = Depends(get_validator)):
+    """更新排班規則"""
+    with checker.write() as validator:
+        row = repository.update("scheduling_rules", rule_id, dict(rule))
+        if row is None:
+            raise HTTPException(status_code=404, detail="Rule not found")
+        validator.set_rules(checker.active_rules())
+    return row
+
+@router.delete("/api/rules/{rule_id}")
+def delete_rule(rule_id: str, repository: Repository = Depends(get_repository),
+                checker: ScheduleValidatorService = Depends(get_validator)):
+    """刪除排班規則"""
+    with checker.write() as validator:
+        if repository.delete("scheduling_rules", rule_id) is None:
+            raise HTTPException(status_code=404, detail="Rule not found")
+        validator.set_rules(checker.active_rules())
+    return {"message": "Rule deleted successfully"}
+
+# 請假管理 API
+@router.get("/api/leave-requests", response_model=List[LeaveRequest])
+def get_leave_requests(
+    staff_id: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    repository: Repository = Depends(get_repository)
+):
+    """獲取請假申請，依 (start_date, id) 排序，cursor 為該排序鍵的游標"""
+    if not (cursor or limit or fields):
+        return repository.list_leave_requests(staff_id, status, date_from, date_to)
+
+    after, selected = _page_request(LeaveRequest, cursor, 2, fields)
+    rows = repository.list_leave_requests(staff_id, status, date_from, date_to,
+                                          after, limit + 1 if limit else None)
+    rows, next_cursor = split_page(rows, limit, lambda r: (r["start_date"], r["id"]))
+    return _page_response(rows, selected, next_cursor)
+
+@router.get("/api/leave-requests/{leave_id}", response_model=LeaveRequest)
+def get_leave_request(leave_id: str, repository: Repository = Depends(get_repository)):
+    """獲取特定請假申請"""
+    leave_request = repository.get("leave_requests", leave_id)
+    if leave_request is None:
+        raise HTTPException(status_code=404, detail="Leave request not found")
+    return leave_request
+
+@router.post("/api/leave-requests", response_model=LeaveRequest)
+def create_leave_request(leave_request: LeaveRequest, repository: Repository = Depends(get_repository),
+                         my_schedule=Depends(get_my_schedule)):
+    """建立新請假申請"""
+    # TODO: 檢查請假規則
+    # TODO: 檢查時間衝突
+
+    leave_request.id = None
+    leave_request.created_at = datetime.now().isoformat()
+    row = repository.insert("leave_requests", dict(leave_request))
+    _roster_changed(my_schedule, row)
+    return row
+
+def _repair_roster(leave: dict, repository: Repository, checker: ScheduleValidatorService,
+                   my_schedule) -> Optional[dict]:
+    """
+    請假核准後局部重排：移除請假員工在請假日的班，由同品牌員工補上
+
+    ROSTER_AUTO_REPAIR=false 時停用；ROSTER_REPAIR_BUDGET 為搜尋時間預算（秒）
+    """
+    if os.getenv("ROSTER_AUTO_REPAIR", "true").lower() != "true":
+        return None
+    from app.roster import plan_leave_repair
+
+    budget = float(os.getenv("ROSTER_REPAIR_BUDGET", DEFAULT_REPAIR_BUDGET))
+    plan = plan_leave_repair(repository, leave, budget)
+    if plan is None or not (plan["removed"] or plan["added"]):
+        return plan
+    with checker.bulk_write():
+        for row in plan["removed"]:
+            repository.delete("schedules", row["id"])
+        if plan["added"]:
+            repository.upsert("schedules", plan["added"])
+    _roster_changed(my_schedule, *plan["removed"], *plan["added"])
+    return plan
+
+@router.put("/api/leave-requests/{leave_id}", response_model=LeaveRequestChangeResult)
+def update_leave_request(leave_id: str, leave_request: LeaveRequest,
+                         repository: Repository = Depends(get_repository),
+                         checker: ScheduleValidatorService = Depends(get_validator),
+                         my_schedule=Depends(get_my_schedule)):
+    """更新請假申請；改為核准時自動局部重排受影響的排班"""
+    # TODO: 檢查請假規則
+    # TODO: 檢查時間衝突
+
+    approving = leave_request.status == "approved"
+    if approving and not leave_request.approved_at:
+        leave_request.approved_at = datetime.now().isoformat()
+
+    previous = repository.get("leave_requests", leave_id) if approving or my_schedule is not None else None
+    row = repository.update("leave_requests", leave_id, dict(leave_request))
+    if row is None:
+        raise HTTPException(status_code=404, detail="Leave request not found")
+    _roster_changed(my_schedule, previous, row)
+
+    result = dict(row)
+    if approving and (previous is None or previous["status"] != "approved"):
+        result["roster_changes"] = _repair_roster(row, repository, checker, my_schedule)
+    return result
+
+@router.delete("/api/leave-requests/{leave_id}")
+def delete_leave_request(leave_id: str, repository: Repository = Depends(get_repository),
+                         my_schedule=Depends(get_my_schedule)):
+    """刪除請假申請"""
+    row = repository.delete("leave_requests", leave_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Leave request not found")
+    _roster_changed(my_schedule, row)
+    return {"message": "Leave request deleted successfully"}
+
+# 排班檢查 API
+@router.post("/api/validate-schedules")
+def validate_schedules(date_from: str, date_to: str, repository: Repository = Depends(get_repository),
+                       checker: ScheduleValidatorService = Depends(get_validator),
+                       pool=Depends(get_process_pool)):
+    """檢查排班是否符合規則（每班人數與品牌專屬規則依品牌分別計算）"""
+    from scheduling.partition import validate_partitioned
+
+    # 以日期範圍查詢取出排班，班別時數只查一次
+    durations = shift_durations()
+    schedules = [
+        _rule_schedule(schedule, durations)
+        for schedule in repository.list_schedules(date_from=date_from, date_to=date_to)
+    ]
+    staff_list = checker.rule_staff()
+    rules = checker.active_rules()
+
+    # 不論筆數都依品牌分區檢查，結果相同；大範圍（例如全店整月）才送到行程池，避免佔住單一核心
+    if len(schedules) >= PARALLEL_VALIDATION_THRESHOLD:
+        violations = validate_partitioned(schedules, staff_list, rules, executor=pool)
+    else:
+        violations = validate_partitioned(schedules, staff_list, rules, max_workers=1)
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "total_schedules": len(schedules),
+        "violations": [asdict(v) for v in violations],
+        "is_valid": not violations
+    }
+
+# 統計 API
+@router.get("/api/stats")
+def get_stats(repository: Repository = Depends(get_repository)):
+    """獲取統計資料"""
+    today = datetime.now().date().isoformat()
+
+    return {
+        "total_staff": repository.count("staff"),
+        "today_schedules": repository.count("schedules", schedule_date=today),
+        "pending_leaves": repository.count("leave_requests", status="pending"),
+        "total_schedules": repository.count("schedules"),
+        "total_leave_requests": repository.count("leave_requests"),
+        "active_staff": repository.count("staff", is_active=True),
+        "approved_leaves": repository.count("leave_requests", status="approved"),
+        "rejected_leaves": repository.count("leave_requests", status="rejected")
+    }
+
+@router.get("/api/stats/monthly")
+def get_monthly_stats(year: int, month: int, repository: Repository = Depends(get_repository)):
+    """獲取月度統計資料"""
+    # TODO: 實作統計邏輯
+
+    return {
+        "year": year,
+        "month": month,
+        "total_staff": repository.count("staff"),
+        "total_schedules": repository.count("schedules"),
+        "total_working_hours": 0,
+        "average_hours_per_staff": 0
+    }
+
+# 通知 API
+def _line_recipients(repository: Repository, brand_id: Optional[str] = None) -> Dict[str, dict]:
+    """已綁定 LINE 的在職員工：staff_id -> 員工資料"""
+    return {
+        staff['id']: staff for staff in repository.list("staff")
+        if staff['is_active'] and staff.get('line_user_id') and (brand_id is None or staff['brand_id'] == brand_id)
+    }
+
+@notifications_router.post("/api/notifications/roster-published")
+def notify_roster_published(year: int = Query(..., ge=1, le=9999), month: int = Query(..., ge=1, le=12),
+                            brand_id: Optional[str] = None,
+                            repository: Repository = Depends(get_repository),
+                            push_queue=Depends(get_push_queue)):
+    """通知員工當月班表已公布（內容相同，以 Multicast 群發；排入推播佇列）"""
+    from line_bot.client import text_message
+
+    message = text_message(f"📅 {year}年{month:02d}月班表已公布\n\n請輸入「我的排班」查看您的班表。")
+    recipients = [staff['line_user_id'] for staff in _line_recipients(repository, brand_id).values()]
+    queued = push_queue.enqueue_pushes([(user_id, [message]) for user_id in recipients])
+    return {"year": year, "month": month, "recipients": len(recipients), "queued_requests": queued}
+
+@notifications_router.post("/api/notifications/shift-reminders")
+def notify_shift_reminders(schedule_date: str, brand_id: Optional[str] = None,
+                           repository: Repository = Depends(get_repository),
+                           push_queue=Depends(get_push_queue)):
+    """提醒當日有班的員工（同一班別的提醒內容相同，以 Multicast 群發；排入推播佇列）"""
+    from line_bot.client import text_message
+
+    staff_by_id = _line_recipients(repository, brand_id)
+    pushes = []
+    for schedule in repository.list_schedules(date_from=schedule_date, date_to=schedule_date):
+        staff = staff_by_id.get(schedule['staff_id'])
+        shift = SHIFT_TYPES.get(schedule['shift_type_id'])
+        if staff is None or shift is None or schedule['status'] != 'scheduled':
+            continue
+        text = f"⏰ 上班提醒\n\n{schedule_date} {shift['name']} {shift['start_time']}-{shift['end_time']}"
+        pushes.append((staff['line_user_id'], [text_message(text)]))
+    queued = push_queue.enqueue_pushes(pushes)
+    return {"schedule_date": schedule_date, "recipients": len(pushes), "queued_requests": queued}
+
+@notifications_router.get("/metrics/push-queue")
+def push_queue_metrics(push_queue=Depends(get_push_queue)):
+    """推播佇列的工作狀態、重試與 429 次數"""
+    return push_queue.metrics()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+應用程式設定
+每個部署入口對應一組設定（profile），決定要啟用哪些子系統；
+子系統只在第一次使用或啟動後背景預熱時才建立
+"""
+
+import os
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+APP_VERSION = "1.0.2"
+
+# REST API：full（資料存取層 + 規則檢查器）、mock（固定的員工資料）、none
+API_MODES = ("full", "mock", "none")
+# LINE Webhook：bot（ScheduleBotHandler）、reply（關鍵字回覆，背景 worker 送出）、
+# log（只記錄事件與將回覆的內容）、ack（直接回應 200）、none（不提供 Webhook）
+LINE_MODES = ("bot", "reply", "log", "ack", "none")
+REPLY_STYLES = ("basic", "smart")
+
+
+@dataclass(frozen=True)
+class AppConfig:
+    """應用程式設定；以 AppConfig.profile() 或 AppConfig.from_env() 取得"""
+    profile_name: str = "full"
+    api: str = "full"
+    line: str = "bot"
+    reply_style: str = "basic"
+    push_fallback: bool = False      # Reply 失敗時改以推播佇列送出
+    notifications: bool = False      # 班表公布 / 上班提醒推播 API
+    sample_data: bool = True         # 新建立的資料庫寫入範例資料
+    env_test: bool = False           # /env-test 端點
+    warm_up: bool = True             # 啟動後在背景建立子系統，不延遲開始接收請求
+    environment: str = "production"
+    line_channel_access_token: Optional[str] = field(default=None, repr=False)
+    line_channel_secret: Optional[str] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.api not in API_MODES:
+            raise ValueError(f"Unknown api mode: {self.api}")
+        if self.line not in LINE_MODES:
+            raise ValueError(f"Unknown line mode: {self.line}")
+        if self.reply_style not in REPLY_STYLES:
+            raise ValueError(f"Unknown reply style: {self.reply_style}")
+
+    @property
+    def line_configured(self) -> bool:
+        return bool(self.line_channel_access_token and self.line_channel_secret)
+
+    @classmethod
+    def profile(cls, name: str, **overrides) -> "AppConfig":
+        """取得指定 profile 的設定，LINE 金鑰讀取環境變數"""
+        if name not in PROFILES:
+            raise ValueError(f"Unknown app profile: {name}")
+        settings = {
+            "line_channel_access_token": os.getenv("LINE_CHANNEL_ACCESS_TOKEN"),
+            "line_channel_secret": os.getenv("LINE_CHANNEL_SECRET"),
+            **overrides,
+        }
+        return replace(PROFILES[name], **settings)
+
+    @classmethod
+    def from_env(cls, default_profile: str = "full") -> "AppConfig":
+        """依環境變數 APP_PROFILE 選擇 profile，APP_WARM_UP=false 時停用背景預熱"""
+        overrides = {}
+        if os.getenv("APP_WARM_UP"):
+            overrides["warm_up"] = os.getenv("APP_WARM_UP").lower() == "true"
+        return cls.profile(os.getenv("APP_PROFILE", default_profile), **overrides)
+
+
+# 原本各自獨立的入口程式所對應的設定
+PROFILES = {
+    # main.py：完整功能
+    "full": AppConfig("full", api="full", line="bot", notifications=True),
+    # smart_line_main.py：較精確的關鍵字回覆，Reply 失敗時改用推播
+    "smart": AppConfig("smart", api="mock", line="reply", reply_style="smart", push_fallback=True),
+    # push_line_main.py：關鍵字回覆，Reply 失敗時改用推播
+    "push": AppConfig("push", api="mock", line="reply", push_fallback=True),
+    # full_line_main.py：關鍵字回覆
+    "line": AppConfig("line", api="mock", line="reply"),
+    # line_working_main.py：只記錄 Webhook 事件
+    "line_log": AppConfig("line_log", api="mock", line="log"),
+    # working_main.py：基本功能，Webhook 直接回應
+    "working": AppConfig("working", api="mock", line="ack"),
+    # simple_main.py：只提供健康檢查與環境變數檢查
+    "simple": AppConfig("simple", api="none", line="none", env_test=True),
+}
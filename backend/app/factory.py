@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FastAPI 應用程式工廠
+依 AppConfig 組合健康檢查、REST API 與 LINE Webhook；
+LINE SDK、資料存取層、規則檢查器與推播佇列皆登錄為延遲建立的子系統，
+匯入與建立 app 時只載入 FastAPI 與路由本身，縮短閒置後第一個請求的冷啟動時間
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Optional
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.config import APP_VERSION, AppConfig
+from app.subsystems import Subsystems
+
+# 尚未連接資料存取層的版本使用的員工資料
+MOCK_STAFF = [
+    {
+        "id": "staff_1",
+        "employee_id": "E001",
+        "name": "張小櫃",
+        "brand_id": "brand_1",
+        "phone": "0912345678",
+        "email": "staff1@example.com",
+        "is_active": True
+    },
+    {
+        "id": "staff_2",
+        "employee_id": "E002",
+        "name": "李小姐",
+        "brand_id": "brand_1",
+        "phone": "0923456789",
+        "email": "staff2@example.com",
+        "is_active": True
+    }
+]
+
+
+def _register_subsystems(config: AppConfig, subsystems: Subsystems):
+    """
+    依設定登錄子系統；登錄順序即背景預熱順序，
+    關閉時依相反順序停止（後登錄的可依賴先登錄的）
+    """
+    if config.api == "full":
+        def create_repository():
+            from storage.repository import create_repository
+            repository = create_repository()
+            # 初始化資料（SQLite 只在第一次建立資料庫時寫入）
+            if config.sample_data and repository.is_new:
+                from app.api import init_sample_data
+                with subsystems.timed("init_sample_data"):
+                    init_sample_data(repository)
+            return repository
+
+        def create_validator():
+            from app.validation import ScheduleValidatorService
+            return ScheduleValidatorService(subsystems.get("repository"))
+
+        # 資料存取層 (STORAGE_BACKEND=memory 或 sqlite，正式環境使用 Supabase)
+        subsystems.register("repository", create_repository)
+        # 排班規則增量檢查器：排班異動時只重算受影響的員工與日期
+        subsystems.register("validator", create_validator)
+
+        def create_process_pool():
+            from app.process_pool import create_process_pool
+            return create_process_pool()
+
+        async def stop_process_pool(pool):
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+
+        # 共用行程池（forkserver / spawn）：大範圍排班檢查與排班搜尋，不在請求中 fork
+        subsystems.register("process_pool", create_process_pool, stop=stop_process_pool)
+
+    uses_push_queue = config.notifications or (config.line == "reply" and config.push_fallback)
+    if config.line in ("bot", "reply") or uses_push_queue:
+        def create_line_client():
+            from line_bot.client import AsyncLineClient
+            return AsyncLineClient(config.line_channel_access_token)
+
+        async def close_line_client(client):
+            await client.close()
+
+        # 共用的 LINE API 客戶端：連線池在所有事件間重複使用
+        subsystems.register("line_client", create_line_client, stop=close_line_client)
+
+    if uses_push_queue:
+        def create_push_queue():
+            from line_bot.push_queue import create_push_queue
+            return create_push_queue(subsystems.get("line_client"))
+
+        async def start_push_queue(queue):
+            await queue.start()
+
+        async def stop_push_queue(queue):
+            await queue.stop()
+
+        # 推播先寫入佇列日誌，由背景 worker 限速送出並在 429 / 5xx 時重試
+        subsystems.register("push_queue", create_push_queue, start=start_push_queue, stop=stop_push_queue)
+
+    if config.line in ("bot", "reply"):
+        def create_deduplicator():
+            from line_bot.dedup import create_deduplicator
+            # WEBHOOK_DEDUP_SHARED=true 時透過資料存取層跨 worker 共用
+            repository = subsystems.get("repository") if "repository" in subsystems else None
+            return create_deduplicator(repository)
+
+        # LINE 重送的事件依 webhookEventId 略過
+        subsystems.register("deduplicator", create_deduplicator)
+
+    if config.line == "bot" and "repository" in subsystems:
+        def create_my_schedule():
+            from line_bot.my_schedule import create_my_schedule_cache
+            return create_my_schedule_cache(subsystems.get("repository"))
+
+        # 「我的排班」：每月批次讀取一次，REST API 寫入時使受影響員工的資料失效
+        subsystems.register("my_schedule", create_my_schedule)
+
+    if config.api == "full":
+        def create_roster_batches():
+            from app.roster_batch import create_roster_batch_runner
+            my_schedule = subsystems.get("my_schedule") if "my_schedule" in subsystems else None
+            return create_roster_batch_runner(subsystems.get("repository"), subsystems.get("validator"),
+                                              my_schedule, executor=subsystems.get("process_pool"))
+
+        async def stop_roster_batches(runner):
+            await asyncio.to_thread(runner.close)
+
+        # 全店整月批次排班：背景執行，已完成的分區記錄在檢查點，中斷後可接續
+        subsystems.register("roster_batches", create_roster_batches, stop=stop_roster_batches)
+
+    if config.line == "bot":
+        def create_state_store():
+            from line_bot.state_store import create_state_store
+            return create_state_store()
+
+        async def stop_state_store(store):
+            await asyncio.to_thread(store.close)
+
+        # 對話狀態（STATE_STORE=memory 或 sqlite），關閉時釋放 SQLite 連線
+        subsystems.register("state_store", create_state_store, stop=stop_state_store,
+                            warm_up=config.line_configured)
+
+        def create_bot_events():
+            from linebot import LineBotApi
+            from line_bot.handlers import ScheduleBotHandler
+            from app.webhook import BotEventHandler
+            my_schedule = subsystems.get("my_schedule") if "my_schedule" in subsystems else None
+            # 簽名已由 LineSignatureMiddleware 驗證，不需要 WebhookHandler
+            bot_handler = ScheduleBotHandler(LineBotApi(config.line_channel_access_token),
+                                             state_store=subsystems.get("state_store"), my_schedule=my_schedule)
+            return BotEventHandler(bot_handler, subsystems.get("deduplicator"))
+
+        # 未設定 LINE 金鑰時不預熱（收不到通過簽名驗證的事件）
+        subsystems.register("bot_events", create_bot_events, warm_up=config.line_configured)
+
+    if config.line == "reply":
+        def create_dispatcher():
+            from line_bot.dispatcher import create_dispatcher
+            from app.webhook import create_event_handler
+            return create_dispatcher(create_event_handler(config, subsystems))
+
+        async def start_dispatcher(dispatcher):
+            await dispatcher.start()
+
+        async def stop_dispatcher(dispatcher):
+            await dispatcher.stop()
+
+        # 事件依用戶分片排入背景 worker，同一用戶的事件依序處理
+        subsystems.register("dispatcher", create_dispatcher, start=start_dispatcher, stop=stop_dispatcher)
+
+
+def create_app(config: Optional[AppConfig] = None) -> FastAPI:
+    """
+    建立 FastAPI 應用程式
+
+    Args:
+        config: 應用程式設定，預設依環境變數 APP_PROFILE 選擇
+    """
+    started = time.perf_counter()
+    config = config or AppConfig.from_env()
+    subsystems = Subsystems()
+    _register_subsystems(config, subsystems)
+
+    app = FastAPI(
+        title="百貨櫃姐排班系統",
+        description="Department Store Staff Scheduling System API",
+        version="1.0.0"
+    )
+    app.state.config = config
+    app.state.subsystems = subsystems
+
+    # CORS 設定
+    if config.api == "full":
+        from storage.pagination import NEXT_CURSOR_HEADER
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=["*"],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+            expose_headers=[NEXT_CURSOR_HEADER],
+        )
+
+    if config.line != "none":
+        from line_bot.signature import LineSignatureMiddleware
+        # Webhook 簽名驗證：直接對原始本體計算 HMAC，解析後的 JSON 放在 request.state.line_payload
+        app.add_middleware(LineSignatureMiddleware, channel_secret=config.line_channel_secret)
+
+    # 健康檢查路由
+    @app.get("/health")
+    async def health_check():
+        """健康檢查端點"""
+        return {
+            "status": "healthy",
+            "timestamp": datetime.now().isoformat(),
+            "version": APP_VERSION,
+            "environment": config.environment,
+            "profile": config.profile_name,
+            "line_configured": config.line_configured
+        }
+
+    # 根路由
+    @app.get("/")
+    async def root():
+        """API 根路由"""
+        return {
+            "message": "百貨櫃姐排班系統 API",
+            "version": "1.0.0",
+            "status": "running",
+            "timestamp": datetime.now().isoformat(),
+            "environment": config.environment
+        }
+
+    @app.get("/metrics/startup")
+    async def startup_metrics():
+        """建立 app 與各子系統的耗時（子系統建立時間包含第一次匯入模組）"""
+        return {
+            "profile": config.profile_name,
+            "create_app_ms": round(app.state.create_app_seconds * 1000, 2),
+            **subsystems.metrics()
+        }
+
+    if config.env_test:
+        # 測試環境變數
+        @app.get("/env-test")
+        async def env_test():
+            """測試環境變數"""
+            return {
+                "supabase_url": os.getenv("SUPABASE_URL") is not None,
+                "line_token": os.getenv("LINE_CHANNEL_ACCESS_TOKEN") is not None,
+                "line_secret": os.getenv("LINE_CHANNEL_SECRET") is not None,
+                "env_vars": {
+                    "SUPABASE_URL": "✅" if os.getenv("SUPABASE_URL") else "❌",
+                    "LINE_CHANNEL_ACCESS_TOKEN": "✅" if os.getenv("LINE_CHANNEL_ACCESS_TOKEN") else "❌",
+                    "LINE_CHANNEL_SECRET": "✅" if os.getenv("LINE_CHANNEL_SECRET") else "❌"
+                }
+            }
+
+    if config.api == "full":
+        from app import api
+        app.include_router(api.router)
+        if config.notifications:
+            app.include_router(api.notifications_router)
+    elif config.api == "mock":
+        # 模擬員工資料
+        @app.get("/api/staff")
+        async def get_staff():
+            """獲取員工資料"""
+            return MOCK_STAFF
+
+    if config.line != "none":
+        from app.webhook import create_webhook_router
+        app.include_router(create_webhook_router(config, subsystems))
+
+    @app.on_event("startup")
+    async def startup_event():
+        """應用啟動時執行：子系統在背景建立，不延遲開始接收請求"""
+        if config.warm_up:
+            app.state.warm_up_task = asyncio.create_task(subsystems.warm_up())
+        print(f"🚀 百貨櫃姐排班系統已啟動 ({config.profile_name})")
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """應用關閉時執行"""
+        task = getattr(app.state, "warm_up_task", None)
+        if task is not None and not task.done():
+            await task
+        await subsystems.shutdown()
+
+    app.state.create_app_seconds = time.perf_counter() - started
+    return app
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+REST API 資料模型
+"""
+
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class Staff(BaseModel):
+    id: Optional[str] = None
+    employee_id: str
+    name: str
+    brand_id: str
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    monthly_available_hours: int = 160
+    min_rest_days_per_month: int = 8
+    is_active: bool = True
+    line_user_id: Optional[str] = None
+
+class Schedule(BaseModel):
+    id: Optional[str] = None
+    staff_id: str
+    shift_type_id: str
+    schedule_date: str
+    status: str = "scheduled"
+    notes: Optional[str] = None
+    created_by: Optional[str] = None
+
+class SchedulingRule(BaseModel):
+    id: Optional[str] = None
+    brand_id: Optional[str] = None
+    rule_name: str
+    rule_type: str
+    rule_value: int
+    description: Optional[str] = None
+    is_active: bool = True
+
+class LeaveRequest(BaseModel):
+    id: Optional[str] = None
+    staff_id: str
+    leave_type: str
+    start_date: str
+    end_date: str
+    reason: str
+    status: str = "pending"
+    created_at: Optional[str] = None
+    approved_by: Optional[str] = None
+    approved_at: Optional[str] = None
+
+class StoreStaff(BaseModel):
+    """專櫃與所屬員工（stores 資料表的 id 與 staff 欄位）"""
+    id: str
+    staff: List[str] = []
+
+class ScheduleChangeResult(Schedule):
+    """排班異動結果，附上本次異動新增與解除的違規"""
+    new_violations: List[dict] = []
+    resolved_violations: List[dict] = []
+
+class LeaveRequestChangeResult(LeaveRequest):
+    """請假異動結果，核准時附上局部重排的排班異動"""
+    roster_changes: Optional[dict] = None
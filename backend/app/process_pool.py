@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共用行程池（REST API 使用）
+大範圍排班檢查、多起點排班與批次排班共用一個長駐的行程池；
+子行程以 forkserver（不支援時 spawn）建立，不從多執行緒的伺服器行程 fork，
+工作資料以參數序列化傳入
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# 不可使用 fork：伺服器行程有多個執行緒，fork 可能把其他執行緒持有的鎖複製到子行程
+START_METHODS = ("forkserver", "spawn")
+# forkserver 先載入排班模組，之後建立的子行程不必重新匯入
+PRELOAD_MODULES = ["scheduling.validator", "scheduling.partition", "scheduling.roster"]
+
+
+def default_start_method() -> str:
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class WorkerPool(ProcessPoolExecutor):
+    """記錄行程數的行程池（ProcessPoolExecutor 未公開行程數）"""
+
+    def __init__(self, max_workers: int, mp_context=None):
+        super().__init__(max_workers=max_workers, mp_context=mp_context)
+        self.workers = max_workers
+
+
+def create_process_pool(max_workers: Optional[int] = None,
+                        start_method: Optional[str] = None) -> WorkerPool:
+    """
+    建立共用行程池；WORKER_PROCESSES 為行程數（預設 CPU 核心數），
+    WORKER_START_METHOD 為 forkserver 或 spawn。子行程在第一次送出工作時才啟動
+    """
+    workers = os.getenv("WORKER_PROCESSES")
+    max_workers = max_workers or (int(workers) if workers else os.cpu_count() or 1)
+    start_method = start_method or os.getenv("WORKER_START_METHOD") or default_start_method()
+    if start_method not in START_METHODS:
+        raise ValueError(f"Unsupported worker start method: {start_method}")
+
+    context = multiprocessing.get_context(start_method)
+    if start_method == "forkserver":
+        context.set_forkserver_preload(PRELOAD_MODULES)
+    return WorkerPool(max_workers, mp_context=context)
+
+
+def pool_workers(pool: WorkerPool) -> int:
+    """行程池的行程數（create_process_pool 建立時記錄）"""
+    return pool.workers
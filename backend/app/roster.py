@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自動排班（REST API 使用）
+由資料存取層讀取員工、規則、已核准請假與既有排班，組成排班引擎的問題，
+並把結果轉回 schedules 資料表的資料列
+"""
+
+import calendar
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.validation import shift_durations, to_rule_definition, to_rule_staff
+from scheduling.partition import rules_for_brands
+from scheduling.roster import RosterProblem, RosterResult, repair_roster
+from scheduling.validator import find_rule
+
+# 請假開始日早於該月超過此天數者不列入（單筆請假不超過兩個月）
+LEAVE_LOOKBACK_DAYS = 62
+# 自動產生的排班在 notes 欄位的標記
+GENERATED_NOTE = "自動排班"
+REPAIR_NOTE = "請假調班"
+# 沒有 max_consecutive_days 規則時，局部重排可調整請假日期前後幾天的排班
+DEFAULT_REPAIR_WINDOW = 7
+
+
+def _leave_days(leaves: List[dict], first: date, last: date) -> Dict[str, Set[date]]:
+    """員工 ID -> 該月份內的請假日期"""
+    days: Dict[str, Set[date]] = {}
+    for leave in leaves:
+        try:
+            start = max(date.fromisoformat(leave["start_date"]), first)
+            end = min(date.fromisoformat(leave["end_date"]), last)
+        except ValueError:
+            continue
+        staff_days = days.setdefault(leave["staff_id"], set())
+        staff_days.update(start + timedelta(days=n) for n in range((end - start).days + 1))
+    return days
+
+
+def _carry_in(schedules: List[dict], staff_ids: Set[str], first: date) -> Dict[str, int]:
+    """員工 ID -> 上個月底（到 first 前一天）已連續工作的天數"""
+    worked: Dict[str, Set[str]] = {}
+    for schedule in schedules:
+        if schedule["status"] == "scheduled" and schedule["staff_id"] in staff_ids:
+            worked.setdefault(schedule["staff_id"], set()).add(schedule["schedule_date"])
+    carry_in = {}
+    for staff_id, days in worked.items():
+        run, day = 0, first - timedelta(days=1)
+        while day.isoformat() in days:
+            run += 1
+            day -= timedelta(days=1)
+        if run:
+            carry_in[staff_id] = run
+    return carry_in
+
+
+def load_roster_problem(repository, year: int, month: int,
+                        brand_id: Optional[str] = None) -> RosterProblem:
+    """
+    讀取一個月份的排班問題
+
+    該月已存在的排班視為固定，不會被覆寫；規則依品牌套用（品牌專屬規則優先）。
+
+    Args:
+        repository: 資料存取層
+        year, month: 排班月份
+        brand_id: 只排指定品牌的員工，None 表示全部在職員工
+    """
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+
+    staff_list = [
+        to_rule_staff(s) for s in repository.list("staff")
+        if s["is_active"] and (brand_id is None or s["brand_id"] == brand_id)
+    ]
+    staff_ids = {s.id for s in staff_list}
+    rules = rules_for_brands(
+        [to_rule_definition(r) for r in repository.list("scheduling_rules") if r["is_active"]],
+        {s.brand_id for s in staff_list}
+    )
+
+    leaves = [
+        leave for leave in repository.list_leave_requests(
+            status="approved", date_from=(first - timedelta(days=LEAVE_LOOKBACK_DAYS)).isoformat()
+        )
+        if leave["staff_id"] in staff_ids
+        and leave["start_date"] <= last.isoformat() and leave["end_date"] >= first.isoformat()
+    ]
+    fixed = [
+        (s["staff_id"], date.fromisoformat(s["schedule_date"]), s["shift_type_id"])
+        for s in repository.list_schedules(date_from=first.isoformat(), date_to=last.isoformat())
+        if s["status"] == "scheduled" and s["staff_id"] in staff_ids
+    ]
+
+    carry_in = {}
+    consecutive = find_rule(rules, "max_consecutive_days")
+    if consecutive:
+        previous = repository.list_schedules(
+            date_from=(first - timedelta(days=consecutive.rule_value)).isoformat(),
+            date_to=(first - timedelta(days=1)).isoformat()
+        )
+        carry_in = _carry_in(previous, staff_ids, first)
+
+    return RosterProblem(
+        year=year,
+        month=month,
+        staff=staff_list,
+        rules=rules,
+        shift_hours=shift_durations(),
+        leave_days=_leave_days(leaves, first, last),
+        fixed=fixed,
+        carry_in=carry_in,
+    )
+
+
+def roster_rows(assignments, note: str = GENERATED_NOTE) -> List[dict]:
+    """新排的班轉為 schedules 資料列（id 由資料存取層配發）"""
+    return [
+        {"id": None, "staff_id": staff_id, "shift_type_id": shift_id, "schedule_date": day.isoformat(),
+         "status": "scheduled", "notes": note, "created_by": None}
+        for staff_id, day, shift_id in assignments
+    ]
+
+
+def merge_results(results: List[RosterResult]) -> RosterResult:
+    """各品牌分別排班的結果合併（員工不重疊；缺額依 (日期, 班別) 加總）"""
+    shortfall: Dict[Tuple[date, str], int] = {}
+    hours: Dict[str, int] = {}
+    for result in results:
+        for key, missing in result.shortfall.items():
+            shortfall[key] = shortfall.get(key, 0) + missing
+        hours.update(result.hours)
+    return RosterResult(
+        assignments=[a for result in results for a in result.assignments],
+        shortfall=shortfall,
+        hours=hours,
+        objective=round(sum(result.objective for result in results), 3),
+        iterations=sum(result.iterations for result in results),
+        elapsed=sum(result.elapsed for result in results),
+    )
+
+
+def roster_summary(result: RosterResult) -> dict:
+    """排班結果摘要（缺額、各員工工時與搜尋統計）"""
+    return {
+        "total_assignments": len(result.assignments),
+        "is_complete": result.is_complete,
+        "shortfall": [
+            {"schedule_date": day.isoformat(), "shift_type_id": shift_id, "missing": missing}
+            for (day, shift_id), missing in sorted(result.shortfall.items())
+        ],
+        "hours": result.hours,
+        "objective": result.objective,
+        "iterations": result.iterations,
+        "elapsed_ms": round(result.elapsed * 1000, 2),
+    }
+
+
+def _months(first: date, last: date) -> List[Tuple[int, int]]:
+    months, day = [], first.replace(day=1)
+    while day <= last:
+        months.append((day.year, day.month))
+        day = (day + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def plan_leave_repair(repository, leave: dict, time_budget: float, seed: int = 0) -> Optional[dict]:
+    """
+    規劃核准請假後的局部重排（不寫入）
+
+    以目前的排班為起點，只調整同品牌員工在請假日期前後（max_consecutive_days 天內）的班，
+    補回請假員工空出的班。請假跨月時逐月處理，時間預算平均分配。
+
+    Returns:
+        removed（含 id 的資料列）、added（待新增的資料列）與仍缺人的班；
+        員工不存在、已離職或日期格式錯誤時回傳 None
+    """
+    staff = repository.get("staff", leave["staff_id"])
+    if staff is None or not staff["is_active"]:
+        return None
+    try:
+        leave_first = date.fromisoformat(leave["start_date"])
+        leave_last = date.fromisoformat(leave["end_date"])
+    except ValueError:
+        return None
+
+    months = _months(leave_first, leave_last)
+    removed: List[dict] = []
+    added: List[dict] = []
+    shortfall = []
+    iterations, elapsed = 0, 0.0
+    for year, month in months:
+        problem = load_roster_problem(repository, year, month, staff["brand_id"])
+        first = max(leave_first, date(year, month, 1))
+        last = min(leave_last, date(year, month, calendar.monthrange(year, month)[1]))
+        consecutive = find_rule(problem.rules, "max_consecutive_days")
+        window = timedelta(days=consecutive.rule_value if consecutive else DEFAULT_REPAIR_WINDOW)
+        window_first, window_last = first - window, last + window
+
+        # 鄰域內的排班可調整，其餘（含未定義時數的班別）維持不變
+        def movable(assignment):
+            return window_first <= assignment[1] <= window_last and assignment[2] in problem.shift_hours
+
+        current = [a for a in problem.fixed if movable(a)]
+        problem.fixed = [a for a in problem.fixed if not movable(a)]
+        repair = repair_roster(problem, current, time_budget / len(months), seed)
+
+        row_ids: Dict[Tuple[str, str], str] = {
+            (row["staff_id"], row["schedule_date"]): row["id"]
+            for row in repository.list_schedules(date_from=window_first.isoformat(),
+                                                 date_to=window_last.isoformat())
+            if row["status"] == "scheduled"
+        }
+        for staff_id, day, shift_id in repair.removed:
+            row_id = row_ids.get((staff_id, day.isoformat()))
+            if row_id is not None:
+                removed.append({"id": row_id, "staff_id": staff_id, "shift_type_id": shift_id,
+                                "schedule_date": day.isoformat()})
+        added.extend(roster_rows(repair.added, REPAIR_NOTE))
+        shortfall.extend(
+            {"schedule_date": day.isoformat(), "shift_type_id": shift_id, "missing": missing}
+            for (day, shift_id), missing in sorted(repair.shortfall.items())
+        )
+        iterations += repair.iterations
+        elapsed += repair.elapsed
+
+    return {
+        "removed": removed,
+        "added": added,
+        "shortfall": shortfall,
+        "iterations": iterations,
+        "elapsed_ms": round(elapsed * 1000, 2),
+    }
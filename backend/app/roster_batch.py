@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全店整月批次排班
+一次讀取整月的排班問題，依品牌或專櫃分區後在共用行程池求解（大的分區先排），
+完成的分區累積到一定筆數就整批寫入資料存取層，並記錄在磁碟上的檢查點；
+中斷後以相同參數重新執行時略過已完成的分區
+"""
+
+import os
+import json
+import time
+import calendar
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from app.roster import load_roster_problem, roster_rows
+from scheduling.batch import RosterPartition, partition_problem, solve_partitions
+from scheduling.partition import PARTITION_KEYS, store_assignments
+from scheduling.roster import DEFAULT_TIME_BUDGET, RosterResult
+
+DEFAULT_CHECKPOINT_DIR = 'roster_batches'
+# 累積到此筆數才寫入一次（每次寫入後重建規則檢查器）
+DEFAULT_FLUSH_ROWS = 5000
+BATCH_NOTE = "批次排班"
+
+
+class BatchRunningError(Exception):
+    """已有其他批次排班在執行"""
+
+
+class BatchCheckpoint:
+    """
+    已完成分區的檢查點（JSON Lines，一行一個分區）
+
+    分區寫入資料存取層後才記錄；中斷時最後一行可能不完整，讀取時略過
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[str, dict]:
+        done = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    done[record['key']] = record
+        except FileNotFoundError:
+            pass
+        return done
+
+    def append(self, records: List[dict]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+@dataclass
+class RosterBatchJob:
+    """一次批次排班的進度"""
+    job_id: str
+    year: int
+    month: int
+    partition_by: str
+    time_budget: float
+    seed: int
+    state: str = 'pending'             # pending / running / completed / failed / cancelled
+    error: Optional[str] = None
+    started_at: Optional[str] = None
+    load_ms: float = 0.0
+    elapsed: float = 0.0
+    written: int = 0                   # 已寫入的排班筆數
+    flushes: int = 0
+    partitions: Dict[str, dict] = field(default_factory=dict)  # 分區鍵 -> 狀態與耗時
+    _started: float = field(default=0.0, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def update_partition(self, key: str, **values):
+        with self._lock:
+            self.partitions[key].update(values)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            partitions = [dict(key=key, **values) for key, values in self.partitions.items()]
+            elapsed = time.perf_counter() - self._started if self.state == 'running' else self.elapsed
+        counts = {}
+        for partition in partitions:
+            counts[partition['status']] = counts.get(partition['status'], 0) + 1
+        finished = counts.get('done', 0) + counts.get('resumed', 0)
+        solved = [p['elapsed_ms'] for p in partitions if p['status'] in ('solved', 'done')]
+        return {
+            "job_id": self.job_id,
+            "year": self.year,
+            "month": self.month,
+            "partition_by": self.partition_by,
+            "state": self.state,
+            "error": self.error,
+            "started_at": self.started_at,
+            "progress": {
+                "total": len(partitions),
+                "finished": finished,
+                "resumed": counts.get('resumed', 0),
+                "pending": counts.get('pending', 0),
+                "percent": round(finished * 100 / len(partitions), 1) if partitions else 0.0,
+            },
+            "written": self.written,
+            "flushes": self.flushes,
+            "load_ms": self.load_ms,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "solve_ms_total": round(sum(solved), 2),
+            "partitions": partitions,
+        }
+
+
+class RosterBatchRunner:
+    """
+    在背景執行緒執行批次排班（同時只執行一個），進度以 job_id 查詢
+
+    job_id 由月份與分區方式組成，相同參數重新執行時沿用同一個檢查點
+    """
+
+    def __init__(self, repository, validator, my_schedule=None,
+                 directory: str = DEFAULT_CHECKPOINT_DIR, max_workers: Optional[int] = None,
+                 flush_rows: int = DEFAULT_FLUSH_ROWS, executor=None):
+        self.repository = repository
+        self.validator = validator
+        self.my_schedule = my_schedule
+        self.directory = directory
+        self.max_workers = max_workers
+        self.flush_rows = max(1, flush_rows)
+        self.executor = executor
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, RosterBatchJob] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._current: Optional[RosterBatchJob] = None
+        self._stop = threading.Event()
+
+    def checkpoint(self, job_id: str) -> BatchCheckpoint:
+        return BatchCheckpoint(os.path.join(self.directory, f"{job_id}.jsonl"))
+
+    def start(self, year: int, month: int, partition_by: str = 'brand',
+              stores: Optional[List[dict]] = None, time_budget: float = DEFAULT_TIME_BUDGET,
+              seed: int = 0, restart: bool = False) -> RosterBatchJob:
+        """
+        開始批次排班；相同的批次正在執行時直接回傳該批次
+
+        Args:
+            partition_by: 'brand' 或 'store'
+            stores: 含 id 與 staff 欄位的專櫃資料（partition_by='store' 時必填）
+            restart: 刪除該月份先前批次排班寫入的排班（備註為 BATCH_NOTE）與所有檢查點，從頭執行；
+                只清除檢查點時，先前寫入的排班會被當成既有排班保留
+        """
+        if partition_by == 'store' and stores is None:
+            raise ValueError("stores is required when partitioning by store")
+        job_id = f"{year}-{month:02d}-{partition_by}"
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                if self._current.job_id == job_id:
+                    return self._current
+                raise BatchRunningError(f"Roster batch {self._current.job_id} is running")
+            job = RosterBatchJob(job_id, year, month, partition_by, time_budget, seed)
+            self._jobs[job_id] = self._current = job
+            store_of = store_assignments(stores) if partition_by == 'store' else None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(job, store_of, restart),
+                                            name=f"roster-batch-{job_id}", daemon=True)
+            self._thread.start()
+            return job
+
+    def get(self, job_id: str) -> Optional[RosterBatchJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[RosterBatchJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def close(self, timeout: Optional[float] = None):
+        """不再送出新的分區，等待執行中的分區完成並寫入"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self, job: RosterBatchJob, store_of: Optional[Dict[str, str]], restart: bool = False):
+        job._started = time.perf_counter()
+        job.started_at = datetime.now().isoformat()
+        job.state = 'running'
+        checkpoint = self.checkpoint(job.job_id)
+        try:
+            if restart:
+                self._discard(job.year, job.month)
+            problem = load_roster_problem(self.repository, job.year, job.month)
+            partitions = partition_problem(problem, job.partition_by, store_of)
+            job.load_ms = round((time.perf_counter() - job._started) * 1000, 2)
+
+            done = checkpoint.load()
+            with job._lock:
+                for partition in partitions:
+                    record = done.get(partition.key)
+                    job.partitions[partition.key] = (
+                        {**{k: v for k, v in record.items() if k != 'key'}, "status": "resumed"}
+                        if record is not None
+                        else {"staff": len(partition.problem.staff), "status": "pending"}
+                    )
+            remaining = [p for p in partitions if p.key not in done]
+
+            buffered: List[tuple] = []
+            for partition, result in solve_partitions(remaining, job.time_budget, job.seed,
+                                                      self.max_workers, cancelled=self._stop.is_set,
+                                                      executor=self.executor):
+                job.update_partition(partition.key, status='solved', elapsed_ms=round(result.elapsed * 1000, 2))
+                buffered.append((partition, result))
+                if sum(len(r.assignments) for _, r in buffered) >= self.flush_rows:
+                    self._flush(job, checkpoint, buffered)
+                    buffered = []
+            self._flush(job, checkpoint, buffered)
+            job.state = 'cancelled' if self._stop.is_set() else 'completed'
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e)
+            print(f"❌ 批次排班 {job.job_id} 失敗: {e}")
+        finally:
+            job.elapsed = time.perf_counter() - job._started
+
+    def _discard(self, year: int, month: int):
+        """刪除該月份批次排班寫入的排班，再清除該月份各分區方式的檢查點"""
+        first = date(year, month, 1)
+        last = date(year, month, calendar.monthrange(year, month)[1])
+        rows = [row for row in self.repository.list_schedules(date_from=first.isoformat(), date_to=last.isoformat())
+                if row.get('notes') == BATCH_NOTE]
+        if rows:
+            with self.validator.bulk_write():
+                for row in rows:
+                    self.repository.delete("schedules", row['id'])
+            if self.my_schedule is not None:
+                for staff_id in {row['staff_id'] for row in rows}:
+                    self.my_schedule.invalidate(staff_id)
+        for partition_by in PARTITION_KEYS:
+            self.checkpoint(f"{year}-{month:02d}-{partition_by}").clear()
+
+    def _flush(self, job: RosterBatchJob, checkpoint: BatchCheckpoint, finished: List[tuple]):
+        """整批寫入已完成的分區，再記錄到檢查點"""
+        if not finished:
+            return
+        rows = [row for _, result in finished for row in roster_rows(result.assignments, BATCH_NOTE)]
+        if rows:
+            with self.validator.bulk_write():
+                self.repository.upsert("schedules", rows)
+            if self.my_schedule is not None:
+                for staff_id in {row['staff_id'] for row in rows}:
+                    self.my_schedule.invalidate(staff_id)
+
+        records = [_record(partition, result) for partition, result in finished]
+        checkpoint.append(records)
+        for record in records:
+            job.update_partition(record['key'], status='done',
+                                 **{k: v for k, v in record.items() if k != 'key'})
+        job.written += len(rows)
+        job.flushes += 1
+
+
+def _record(partition: RosterPartition, result: RosterResult) -> dict:
+    return {
+        "key": partition.key,
+        "staff": len(partition.problem.staff),
+        "assignments": len(result.assignments),
+        "missing": sum(result.shortfall.values()),
+        "objective": result.objective,
+        "elapsed_ms": round(result.elapsed * 1000, 2),
+    }
+
+
+def create_roster_batch_runner(repository, validator, my_schedule=None, executor=None) -> RosterBatchRunner:
+    """
+    建立批次排班執行器；executor 為共用行程池，ROSTER_BATCH_DIR 為檢查點目錄，
+    ROSTER_BATCH_WORKERS 為同時求解的分區數上限
+    """
+    workers = os.getenv("ROSTER_BATCH_WORKERS")
+    return RosterBatchRunner(
+        repository, validator, my_schedule,
+        directory=os.getenv("ROSTER_BATCH_DIR", DEFAULT_CHECKPOINT_DIR),
+        max_workers=int(workers) if workers else None,
+        executor=executor,
+    )
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+延遲建立的子系統
+LINE SDK、資料存取層、規則檢查器等只在第一次使用時建立（連同匯入模組），
+並記錄建立耗時；需要背景 worker 的子系統在事件迴圈中啟動
+"""
+
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+Factory = Callable[[], Any]
+Hook = Callable[[Any], Awaitable[None]]
+
+
+class Subsystems:
+    """
+    子系統登錄表
+
+    - get(name)：同步取得，第一次呼叫時建立（執行緒安全，可在 threadpool 路由中使用；
+      factory 可再 get 其他子系統，但不可互相依賴）
+    - aget(name)：在事件迴圈中取得，建立移到執行緒進行並確保已啟動
+    - warm_up()：啟動後在背景依登錄順序建立並啟動子系統（登錄時 warm_up=False 者除外）
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Factory] = {}
+        self._start_hooks: Dict[str, Hook] = {}
+        self._stop_hooks: Dict[str, Hook] = {}
+        self._cold: Set[str] = set()   # 不在背景預熱、第一次使用時才建立
+        self._instances: Dict[str, Any] = {}
+        self._started: List[str] = []
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.RLock] = {}
+        self._start_locks: Dict[str, asyncio.Lock] = {}
+        self.timings: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Factory,
+                 start: Optional[Hook] = None, stop: Optional[Hook] = None, warm_up: bool = True):
+        self._factories[name] = factory
+        if not warm_up:
+            self._cold.add(name)
+        if start is not None:
+            self._start_hooks[name] = start
+        if stop is not None:
+            self._stop_hooks[name] = stop
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+    def constructed(self, name: str) -> bool:
+        return name in self._instances
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        # 每個子系統各自一把鎖：建立較慢的子系統時不阻擋其他子系統
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.RLock())
+        with lock:
+            if name not in self._instances:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                self.timings[name] = time.perf_counter() - started
+                self._instances[name] = instance
+            return self._instances[name]
+
+    async def aget(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is None:
+            instance = await asyncio.to_thread(self.get, name)
+        if name in self._start_hooks and name not in self._started:
+            lock = self._start_locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                if name not in self._started:
+                    await self._start_hooks[name](instance)
+                    self._started.append(name)
+        return instance
+
+    async def warm_up(self, names: Optional[List[str]] = None):
+        """依序建立並啟動子系統（略過登錄時 warm_up=False 者）；單一子系統失敗不影響其他子系統"""
+        for name in names or [name for name in self._factories if name not in self._cold]:
+            try:
+                await self.aget(name)
+            except Exception as e:
+                print(f"Failed to warm up {name}: {e}")
+
+    async def shutdown(self):
+        """依登錄的相反順序停止已建立的子系統（後登錄的可依賴先登錄的）"""
+        for name in reversed(list(self._factories)):
+            if name not in self._instances or name not in self._stop_hooks:
+                continue
+            if name in self._started or name not in self._start_hooks:
+                await self._stop_hooks[name](self._instances[name])
+        self._started.clear()
+
+    @contextmanager
+    def timed(self, name: str):
+        """記錄子系統建立過程中的一個步驟（例如寫入範例資料）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    def metrics(self) -> dict:
+        """已建立的子系統與建立耗時（毫秒，包含第一次匯入模組的時間與 timed 記錄的步驟）"""
+        return {
+            "registered": list(self._factories),
+            "constructed": list(self._instances),
+            "started": list(self._started),
+            "construct_ms": {name: round(seconds * 1000, 2) for name, seconds in self.timings.items()},
+        }
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班規則增量檢查器（REST API 使用）
+排班異動時只重算受影響的員工與日期；其他 worker 寫入過資料時依版本號重建
+"""
+
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, List
+
+from scheduling import validator as schedule_rules
+from scheduling.shifts import DEFAULT_SHIFT_HOURS, SHIFT_TYPES
+
+# 檢查器依賴的資料表；版本號與檢查器不一致代表其他 worker 寫入過，需要重建
+VALIDATOR_TABLES = ("staff", "schedules", "scheduling_rules")
+
+
+def to_rule_staff(staff: dict) -> schedule_rules.Staff:
+    return schedule_rules.Staff(
+        id=staff["id"],
+        employee_id=staff["employee_id"],
+        name=staff["name"],
+        brand_id=staff["brand_id"],
+        monthly_available_hours=staff["monthly_available_hours"],
+        min_rest_days_per_month=staff["min_rest_days_per_month"],
+        is_active=staff["is_active"]
+    )
+
+def shift_durations() -> Dict[str, int]:
+    """班別 ID -> 時數，每次請求只查一次 shift_types"""
+    return {shift_id: shift["duration_hours"] for shift_id, shift in SHIFT_TYPES.items()}
+
+def to_rule_schedule(schedule: dict, durations: Dict[str, int]) -> schedule_rules.Schedule:
+    """日期格式錯誤時拋出 ValueError"""
+    return schedule_rules.Schedule(
+        id=schedule["id"],
+        staff_id=schedule["staff_id"],
+        shift_type=schedule["shift_type_id"],
+        schedule_date=date.fromisoformat(schedule["schedule_date"]),
+        duration_hours=durations.get(schedule["shift_type_id"], DEFAULT_SHIFT_HOURS),
+        status=schedule["status"]
+    )
+
+def to_rule_definition(rule: dict) -> schedule_rules.SchedulingRule:
+    return schedule_rules.SchedulingRule(
+        id=rule["id"],
+        rule_name=rule["rule_name"],
+        rule_type=rule["rule_type"],
+        rule_value=rule["rule_value"],
+        description=rule["description"] or "",
+        brand_id=rule["brand_id"]
+    )
+
+
+class ScheduleValidatorService:
+    """持有增量檢查器與其對應的資料版本號"""
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.validator = None
+        self.revision = None
+        self._lock = threading.Lock()
+        self.rebuild()
+
+    def rule_staff(self) -> List[schedule_rules.Staff]:
+        return [to_rule_staff(s) for s in self.repository.list("staff")]
+
+    def active_rules(self) -> List[schedule_rules.SchedulingRule]:
+        return [to_rule_definition(r) for r in self.repository.list("scheduling_rules") if r["is_active"]]
+
+    def rebuild(self):
+        """以目前資料重建增量檢查器"""
+        revision = self.repository.revision(*VALIDATOR_TABLES)
+        validator = schedule_rules.IncrementalScheduleValidator(self.rule_staff(), self.active_rules())
+        durations = shift_durations()
+        validator.load(to_rule_schedule(s, durations) for s in self.repository.list_schedules())
+        self.validator, self.revision = validator, revision
+
+    @contextmanager
+    def write(self):
+        """
+        包住一次會影響檢查器的寫入：開始前確認檢查器是最新的，
+        寫入後若版本號不是恰好加一（期間有其他 worker 寫入）就重建
+        """
+        with self._lock:
+            if self.repository.revision(*VALIDATOR_TABLES) != self.revision:
+                self.rebuild()
+            expected = self.revision + 1
+            yield self.validator
+            if self.repository.revision(*VALIDATOR_TABLES) == expected:
+                self.revision = expected
+            else:
+                self.rebuild()
+
+    @contextmanager
+    def bulk_write(self):
+        """包住一次整批寫入（例如自動排班），寫入後直接重建檢查器"""
+        with self._lock:
+            yield
+            self.rebuild()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LINE Webhook 路由
+簽名已由 LineSignatureMiddleware 驗證，解析後的 JSON 放在 request.state.line_payload；
+處理事件所需的子系統在第一次收到事件時才建立（或由啟動後的背景預熱建立）
+"""
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from app.config import AppConfig
+from app.subsystems import Subsystems
+from line_bot.replies import REPLY_BUILDERS, basic_reply
+
+
+class BotEventHandler:
+    """
+    以 ScheduleBotHandler 處理事件，LINE 重送的事件依 webhookEventId 略過
+
+    ScheduleBotHandler 會同步呼叫 LINE API 與資料存取層，需在 threadpool 中執行
+    """
+
+    def __init__(self, bot_handler, deduplicator):
+        from linebot.models import MessageEvent, PostbackEvent
+
+        self._message_event = MessageEvent
+        self._postback_event = PostbackEvent
+        self.handle_message = deduplicator.guard(bot_handler.handle_text_message)
+        self.handle_postback = deduplicator.guard(bot_handler.handle_postback)
+
+    def handle(self, event: dict):
+        """由已解析的 dict 建立 SDK 事件物件，不重新解碼與解析本體"""
+        event_type = event.get("type")
+        if event_type == "message" and (event.get("message") or {}).get("type") == "text":
+            self.handle_message(self._message_event.new_from_json_dict(event))
+        elif event_type == "postback":
+            self.handle_postback(self._postback_event.new_from_json_dict(event))
+
+    def handle_all(self, events: list):
+        for event in events:
+            self.handle(event)
+
+
+def create_event_handler(config: AppConfig, subsystems: Subsystems):
+    """關鍵字回覆模式的事件處理函式（在背景 worker 中執行）"""
+    build_reply = REPLY_BUILDERS[config.reply_style]
+
+    async def handle_event(event: dict):
+        if event.get("type") != "message" or event.get("message", {}).get("type") != "text":
+            return
+
+        from line_bot.client import text_message
+
+        user_message = event["message"].get("text", "")
+        reply_token = event.get("replyToken", "")
+        user_id = event.get("source", {}).get("userId", "")
+        print(f"User message: {user_message} (user: {user_id})")
+
+        messages = [text_message(build_reply(user_message))]
+
+        client = await subsystems.aget("line_client")
+        if await client.reply(reply_token, messages):
+            return
+        if config.push_fallback:
+            # Reply 失敗時改以推播佇列送出（限速、重試並以 retry key 避免重複）
+            print("Reply failed, queueing push message")
+            await (await subsystems.aget("push_queue")).aenqueue_pushes([(user_id, messages)])
+        else:
+            print("Failed to send reply")
+
+    return handle_event
+
+
+def create_webhook_router(config: AppConfig, subsystems: Subsystems) -> APIRouter:
+    """依 config.line 建立 Webhook 路由"""
+    router = APIRouter()
+
+    if config.line == "ack":
+        @router.post("/webhook/line")
+        async def line_webhook():
+            """LINE Bot Webhook 處理（直接回應）"""
+            return {"status": "ok"}
+
+    elif config.line == "log":
+        @router.post("/webhook/line")
+        async def line_webhook(request: Request):
+            """LINE Bot Webhook 處理（只記錄事件與將回覆的內容）"""
+            for event in request.state.line_payload.get("events", []):
+                print(f"Processing event: {event}")
+                message = event.get("message") or {}
+                if event.get("type") == "message" and message.get("type") == "text":
+                    print(f"Reply message: {basic_reply(message.get('text', ''))}")
+            return {"status": "ok"}
+
+    elif config.line == "bot":
+        @router.post("/webhook/line")
+        async def line_webhook(request: Request):
+            """LINE Bot Webhook 處理（ScheduleBotHandler）"""
+            events = request.state.line_payload.get("events", [])
+            if events:
+                bot = await subsystems.aget("bot_events")
+                # 同步的 LINE API 與資料存取在 threadpool 執行，不阻塞事件迴圈
+                await run_in_threadpool(bot.handle_all, events)
+            return JSONResponse(content={"status": "ok"})
+
+    elif config.line == "reply":
+        @router.post("/webhook/line")
+        async def line_webhook(request: Request):
+            """LINE Bot Webhook 處理（排入佇列立即回應）"""
+            events = request.state.line_payload.get("events", [])
+            if not events:
+                return {"status": "ok"}
+            deduplicator = await subsystems.aget("deduplicator")
+            dispatcher = await subsystems.aget("dispatcher")
+
+            # 重複事件直接略過；佇列已滿時釋放事件並回應 503，讓 LINE 稍後重送
+            busy = False
+            for event in events:
+                if not deduplicator.claim(event):
+                    continue
+                if not dispatcher.submit(event):
+                    deduplicator.release(event)
+                    busy = True
+            if busy:
+                return JSONResponse(status_code=503, content={"status": "busy"})
+            return {"status": "ok"}
+
+        @router.get("/metrics/line-webhook")
+        async def line_webhook_metrics():
+            """Webhook 佇列深度、處理筆數、延遲、去重與推播佇列統計"""
+            metrics = {**(await subsystems.aget("dispatcher")).metrics(),
+                       "dedup": (await subsystems.aget("deduplicator")).metrics()}
+            if config.push_fallback:
+                metrics["push_queue"] = (await subsystems.aget("push_queue")).metrics()
+            return metrics
+
+    return router
@@ -79,13 +79,45 @@ CREATE TABLE schedule_violations (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- 冪等鍵表（LINE webhook 事件去重，多個 worker 共用）
+CREATE TABLE idempotency_keys (
+    key TEXT PRIMARY KEY,                    -- 例如 line:<webhookEventId>
+    expires_at DOUBLE PRECISION NOT NULL     -- 到期時間 (Unix epoch 秒)
+);
+
+-- 資料版本號表（每次寫入由觸發程序遞增，多個 worker 以此判斷記憶體快取是否過期）
+CREATE TABLE revisions (
+    name TEXT PRIMARY KEY,                   -- 資料表名稱
+    value BIGINT NOT NULL DEFAULT 0          -- 寫入次數（每個寫入語句加一）
+);
+
+INSERT INTO revisions (name) VALUES ('staff'), ('schedules'), ('scheduling_rules'), ('leave_requests');
+
+CREATE FUNCTION bump_revision() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE revisions SET value = value + 1 WHERE name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE TRIGGER staff_revision AFTER INSERT OR UPDATE OR DELETE ON staff
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_revision();
+CREATE TRIGGER schedules_revision AFTER INSERT OR UPDATE OR DELETE ON schedules
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_revision();
+CREATE TRIGGER scheduling_rules_revision AFTER INSERT OR UPDATE OR DELETE ON scheduling_rules
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_revision();
+CREATE TRIGGER leave_requests_revision AFTER INSERT OR UPDATE OR DELETE ON leave_requests
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_revision();
+
 -- 建立索引以提升查詢效能
 CREATE INDEX idx_staff_brand_id ON staff(brand_id);
 CREATE INDEX idx_staff_employee_id ON staff(employee_id);
+CREATE INDEX idx_staff_line_user_id ON staff(line_user_id);
 CREATE INDEX idx_schedules_staff_id ON schedules(staff_id);
 CREATE INDEX idx_schedules_date ON schedules(schedule_date);
 CREATE INDEX idx_schedules_shift_type ON schedules(shift_type_id);
 CREATE INDEX idx_scheduling_rules_brand ON scheduling_rules(brand_id);
+CREATE INDEX idx_idempotency_keys_expires ON idempotency_keys(expires_at);
 
 -- 插入預設資料
 
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LINE 訊息批次發送
+同一個 reply token 的訊息合併成一次 Reply（最多 5 則），
+內容相同的推播合併成 Multicast（每次最多 500 位用戶）
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+
+MAX_MESSAGES_PER_REQUEST = 5
+MAX_MULTICAST_RECIPIENTS = 500
+
+Push = Tuple[str, List[Any]]  # (收件者, 訊息列表)
+
+
+def chunked(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _payload_key(messages: List[Any]) -> str:
+    """訊息內容的比對鍵；支援 dict 與 line-bot-sdk 訊息物件"""
+    return json.dumps([m if isinstance(m, dict) else m.as_json_dict() for m in messages],
+                      ensure_ascii=False, sort_keys=True)
+
+
+def group_pushes(pushes: Iterable[Push]) -> List[Tuple[List[str], List[Any]]]:
+    """
+    依訊息內容分組推播
+
+    Returns:
+        [(收件者列表, 訊息列表)]，每組最多 MAX_MULTICAST_RECIPIENTS 位收件者，
+        訊息超過 MAX_MESSAGES_PER_REQUEST 則時拆成多組；保持第一次出現的順序
+    """
+    # 收件者以 dict 保存：去除重複且維持順序
+    groups: "OrderedDict[str, Tuple[Dict[str, None], List[Any]]]" = OrderedDict()
+    for to, messages in pushes:
+        for part in chunked(list(messages), MAX_MESSAGES_PER_REQUEST):
+            key = _payload_key(part)
+            if key not in groups:
+                groups[key] = ({}, part)
+            groups[key][0][to] = None
+    return [(recipients, messages)
+            for recipients_all, messages in groups.values()
+            for recipients in chunked(list(recipients_all), MAX_MULTICAST_RECIPIENTS)]
+
+
+def is_user_id(to: str) -> bool:
+    """Multicast 只接受用戶 ID（U 開頭），群組與聊天室需個別推播"""
+    return to.startswith("U")
+
+
+def plan_pushes(pushes: Iterable[Push]) -> List[Tuple[str, Any, List[Any]]]:
+    """
+    以最少的 API 呼叫規劃推播
+
+    Returns:
+        [("multicast", 用戶 ID 列表, 訊息列表) 或 ("push", 收件者, 訊息列表)]
+    """
+    calls = []
+    for recipients, messages in group_pushes(pushes):
+        users = [to for to in recipients if is_user_id(to)]
+        singles = [to for to in recipients if not is_user_id(to)]
+        if len(users) > 1:
+            calls.append(("multicast", users, messages))
+        else:
+            singles = users + singles
+        calls.extend(("push", to, messages) for to in singles)
+    return calls
+
+
+class ReplyBatcher:
+    """
+    依 reply token 暫存訊息，事件處理完後一次送出
+
+    reply token 只能使用一次，超過 5 則的訊息改以推播送給事件來源。
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, reply_token: str, message: Any):
+        with self._lock:
+            self._pending.setdefault(reply_token, []).append(message)
+
+    def take(self, reply_token: str) -> List[List[Any]]:
+        """取出並清空該 reply token 的訊息，每組最多 5 則（第一組用於 Reply）"""
+        with self._lock:
+            messages = self._pending.pop(reply_token, [])
+        return chunked(messages, MAX_MESSAGES_PER_REQUEST)
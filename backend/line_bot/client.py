@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LINE Messaging API 非同步客戶端
+所有請求共用同一個連線池，不會阻塞事件迴圈
+"""
+
+import os
+from typing import List, Optional
+
+import httpx
+
+LINE_API_BASE = "https://api.line.me/v2/bot"
+
+
+def text_message(text: str) -> dict:
+    """文字訊息物件"""
+    return {"type": "text", "text": text}
+
+
+class AsyncLineClient:
+    """LINE Reply / Push API 客戶端"""
+
+    def __init__(self, access_token: Optional[str],
+                 base_url: Optional[str] = None,
+                 max_connections: int = 20,
+                 timeout: float = 10.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.access_token = access_token
+        self._client = httpx.AsyncClient(
+            base_url=base_url or os.getenv("LINE_API_BASE", LINE_API_BASE),
+            headers={"Authorization": f"Bearer {access_token}"},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            transport=transport,
+        )
+
+    async def send(self, path: str, payload: dict, retry_key: Optional[str] = None) -> httpx.Response:
+        """
+        送出請求並回傳原始回應（由呼叫端判斷狀態碼與重試）
+
+        retry_key 會放在 X-Line-Retry-Key 標頭，LINE 對同一個 key 只會傳送一次。
+        """
+        headers = {"X-Line-Retry-Key": retry_key} if retry_key else None
+        return await self._client.post(path, json=payload, headers=headers)
+
+    async def _post(self, path: str, payload: dict, label: str) -> bool:
+        if not self.access_token:
+            print("LINE_CHANNEL_ACCESS_TOKEN not configured")
+            return False
+
+        try:
+            response = await self.send(path, payload)
+        except httpx.HTTPError as e:
+            print(f"Error sending LINE {label} message: {e}")
+            return False
+
+        if response.status_code == 200:
+            return True
+        print(f"Failed to send {label} message: {response.status_code} - {response.text}")
+        return False
+
+    async def reply(self, reply_token: str, messages: List[dict]) -> bool:
+        """以 reply token 回覆訊息"""
+        return await self._post("/message/reply", {"replyToken": reply_token, "messages": messages}, "reply")
+
+    async def push(self, to: str, messages: List[dict]) -> bool:
+        """主動推播訊息給單一用戶"""
+        return await self._post("/message/push", {"to": to, "messages": messages}, "push")
+
+    async def multicast(self, to: List[str], messages: List[dict]) -> bool:
+        """同一則訊息推播給多位用戶（最多 500 位）"""
+        return await self._post("/message/multicast", {"to": to, "messages": messages}, "multicast")
+
+    async def close(self):
+        await self._client.aclose()
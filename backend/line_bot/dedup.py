@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LINE Webhook 事件去重
+LINE 在回應過慢時會重送 webhook（deliveryContext.isRedelivery），
+以 webhookEventId 判斷事件是否已處理過，避免重複回覆與重複建立請假申請
+"""
+
+import os
+import time
+import functools
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+DEFAULT_TTL = 600            # 秒；涵蓋 LINE 的重送期間
+DEFAULT_MAX_ENTRIES = 100000
+KEY_PREFIX = "line:"
+
+
+def webhook_event_id(event) -> Optional[str]:
+    """webhookEventId；支援原始 JSON dict 與 line-bot-sdk 事件物件"""
+    if isinstance(event, dict):
+        return event.get("webhookEventId")
+    return getattr(event, "webhook_event_id", None)
+
+
+def is_redelivery(event) -> bool:
+    if isinstance(event, dict):
+        return bool((event.get("deliveryContext") or {}).get("isRedelivery"))
+    context = getattr(event, "delivery_context", None)
+    return bool(getattr(context, "is_redelivery", False))
+
+
+class EventDeduplicator:
+    """
+    webhookEventId 的 TTL + LRU 集合
+
+    TTL 固定，因此插入順序即為到期順序：最舊的項目永遠在最前面，
+    宣告與清除皆為 O(1)（均攤），項目數不超過 max_entries。
+    指定 repository 時再以 Repository.claim_key 宣告，讓多個 worker 共用去重結果。
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 repository=None, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.repository = repository
+        self._clock = clock
+        self._seen: "OrderedDict[str, float]" = OrderedDict()  # event id -> 到期時間
+        self._lock = threading.Lock()
+
+        self.claimed = 0
+        self.duplicates = 0
+        self.redeliveries = 0
+
+    def _evict(self, now: float):
+        """清除過期與超出容量的最舊項目（呼叫端需持有鎖）"""
+        while self._seen:
+            event_id, expires = next(iter(self._seen.items()))
+            if expires > now and len(self._seen) <= self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def claim(self, event) -> bool:
+        """
+        宣告事件
+
+        Returns:
+            True 表示第一次收到，應處理；False 表示重複事件，應略過。
+            沒有 webhookEventId 的事件一律回傳 True。
+        """
+        if is_redelivery(event):
+            self.redeliveries += 1
+        event_id = webhook_event_id(event)
+        if not event_id:
+            return True
+
+        now = self._clock()
+        with self._lock:
+            expires = self._seen.get(event_id)
+            if expires is not None and expires > now:
+                self.duplicates += 1
+                return False
+            self._seen[event_id] = now + self.ttl
+            self._seen.move_to_end(event_id)
+            self._evict(now)
+
+        if self.repository is not None:
+            try:
+                if not self.repository.claim_key(KEY_PREFIX + event_id, self.ttl):
+                    self.duplicates += 1
+                    return False
+            except Exception as e:
+                # 共用儲存失敗時仍處理事件，只退回本機去重
+                print(f"Error claiming webhook event {event_id}: {e}")
+        self.claimed += 1
+        return True
+
+    def release(self, event):
+        """釋放已宣告的事件（例如未能排入佇列），讓 LINE 重送時可以再處理"""
+        event_id = webhook_event_id(event)
+        if not event_id:
+            return
+        with self._lock:
+            self._seen.pop(event_id, None)
+        if self.repository is not None:
+            try:
+                self.repository.release_key(KEY_PREFIX + event_id)
+            except Exception as e:
+                print(f"Error releasing webhook event {event_id}: {e}")
+
+    def guard(self, func):
+        """
+        裝飾 line-bot-sdk 事件處理函式：重複事件直接略過；處理失敗時釋放事件，
+        LINE 重送時可以再處理
+
+        保持單一參數，WebhookHandler 依參數個數決定是否傳入 destination。
+        """
+        @functools.wraps(func)
+        def guarded(event):
+            if not self.claim(event):
+                return None
+            try:
+                return func(event)
+            except Exception:
+                self.release(event)
+                raise
+        return guarded
+
+    def metrics(self) -> dict:
+        with self._lock:
+            size = len(self._seen)
+        return {
+            "ttl_seconds": self.ttl,
+            "entries": size,
+            "max_entries": self.max_entries,
+            "shared": self.repository is not None,
+            "claimed": self.claimed,
+            "duplicates": self.duplicates,
+            "redeliveries": self.redeliveries,
+        }
+
+
+def create_deduplicator(repository=None) -> EventDeduplicator:
+    """
+    依環境變數建立去重器
+
+    WEBHOOK_DEDUP_TTL / WEBHOOK_DEDUP_MAX_ENTRIES 設定本機集合；
+    WEBHOOK_DEDUP_SHARED=true 且有傳入 repository 時，透過資料存取層跨 worker 去重。
+    """
+    shared = os.getenv("WEBHOOK_DEDUP_SHARED", "false").lower() == "true"
+    return EventDeduplicator(
+        ttl=float(os.getenv("WEBHOOK_DEDUP_TTL", DEFAULT_TTL)),
+        max_entries=int(os.getenv("WEBHOOK_DEDUP_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        repository=repository if shared else None,
+    )
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LINE Webhook 事件分派
+Webhook 只負責驗證與排入佇列，事件由固定數量的 worker 在背景處理
+"""
+
+import os
+import time
+import zlib
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 1000
+# 延遲統計保留最近的樣本數
+LATENCY_SAMPLES = 1000
+
+
+def event_source_key(event: dict) -> str:
+    """事件來源（用戶、群組或聊天室），同一來源的事件依序處理"""
+    source = event.get("source") or {}
+    return source.get("userId") or source.get("groupId") or source.get("roomId") or ""
+
+
+class LatencyWindow:
+    """最近 N 筆延遲樣本（毫秒）"""
+
+    def __init__(self, size: int = LATENCY_SAMPLES):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, milliseconds: float):
+        self._samples.append(milliseconds)
+
+    def summary(self) -> dict:
+        if not self._samples:
+            return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(self._samples)
+        last = len(ordered) - 1
+        return {
+            "p50": round(ordered[last // 2], 2),
+            "p95": round(ordered[int(last * 0.95)], 2),
+            "max": round(ordered[last], 2),
+        }
+
+
+class EventDispatcher:
+    """
+    依事件來源分片的非同步 worker 池
+
+    每個 worker 有自己的有界佇列；同一個來源一律送到同一個 worker，
+    因此同一用戶的事件依收到的順序處理，不同用戶之間則可並行。
+    """
+
+    def __init__(self, handler: EventHandler,
+                 workers: int = DEFAULT_WORKERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.handler = handler
+        self.worker_count = max(1, workers)
+        self.queue_size = queue_size
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.queue_wait = LatencyWindow()
+        self.handle_time = LatencyWindow()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """啟動 worker（需在事件迴圈中呼叫）"""
+        if self.running:
+            return
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.worker_count)]
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+
+    async def stop(self, drain: bool = True):
+        """停止 worker；drain 為 True 時先處理完佇列中的事件"""
+        if drain:
+            for queue in self._queues:
+                await queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, event: dict) -> bool:
+        """
+        將事件排入對應 worker 的佇列，不等待處理
+
+        Returns:
+            False 表示佇列已滿或尚未啟動，事件未被接受
+        """
+        self.received += 1
+        if not self.running:
+            self.dropped += 1
+            return False
+        key = event_source_key(event)
+        queue = self._queues[zlib.crc32(key.encode("utf-8")) % self.worker_count]
+        try:
+            queue.put_nowait((time.perf_counter(), event))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            enqueued_at, event = await queue.get()
+            started = time.perf_counter()
+            self.queue_wait.add((started - enqueued_at) * 1000)
+            try:
+                await self.handler(event)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Error processing LINE event: {e}")
+            finally:
+                self.handle_time.add((time.perf_counter() - started) * 1000)
+                queue.task_done()
+
+    def metrics(self) -> dict:
+        """佇列深度、處理筆數與延遲統計"""
+        depths = [queue.qsize() for queue in self._queues]
+        return {
+            "workers": self.worker_count,
+            "queue_capacity": self.queue_size,
+            "queue_depth": sum(depths),
+            "queue_depth_per_worker": depths,
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "queue_wait_ms": self.queue_wait.summary(),
+            "handle_ms": self.handle_time.summary(),
+        }
+
+
+def create_dispatcher(handler: EventHandler, workers: Optional[int] = None,
+                      queue_size: Optional[int] = None) -> EventDispatcher:
+    """依環境變數 LINE_WEBHOOK_WORKERS / LINE_WEBHOOK_QUEUE_SIZE 建立分派器"""
+    return EventDispatcher(
+        handler,
+        workers=workers or int(os.getenv("LINE_WEBHOOK_WORKERS", DEFAULT_WORKERS)),
+        queue_size=queue_size or int(os.getenv("LINE_WEBHOOK_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)),
+    )
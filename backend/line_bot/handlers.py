@@ -16,52 +16,68 @@ from linebot.models import (
 )
 from linebot.exceptions import LineBotApiError
 
+from line_bot.batcher import ReplyBatcher
+from line_bot.messages import MessageTemplates
+from line_bot.state_store import StateStore, create_state_store
+
 class ScheduleBotHandler:
     """排班機器人處理器"""
     
-    def __init__(self, line_bot_api: LineBotApi, handler: WebhookHandler):
+    def __init__(self, line_bot_api: LineBotApi, handler: Optional[WebhookHandler] = None,
+                 state_store: Optional[StateStore] = None, my_schedule=None):
         self.line_bot_api = line_bot_api
         self.handler = handler
-        self.user_states = {}  # 儲存用戶對話狀態
+        # 儲存用戶對話狀態（有到期時間與容量上限，可設定為 SQLite 跨 worker 共用）
+        self.user_states = state_store or create_state_store()
+        # 個人排班查詢（MyScheduleCache），未連接資料存取層時為 None
+        self.my_schedule = my_schedule
+        self.outbox = ReplyBatcher()  # 事件處理期間暫存回覆，結束時一次送出
         
     def handle_text_message(self, event: MessageEvent):
         """處理文字訊息"""
         user_id = event.source.user_id
-        message_text = event.message.text.strip()
-        
-        # 檢查用戶狀態
-        if user_id in self.user_states:
-            self._handle_stateful_message(user_id, message_text, event.reply_token)
-            return
-            
-        # 主要功能路由
-        if message_text == "排班查詢":
-            self._send_schedule_query_menu(event.reply_token)
-        elif message_text == "我的排班":
-            self._send_my_schedule(user_id, event.reply_token)
-        elif message_text == "請假申請":
-            self._send_leave_request_menu(event.reply_token)
-        elif message_text == "排班規則":
-            self._send_scheduling_rules(event.reply_token)
-        elif message_text == "聯絡管理員":
-            self._send_admin_contact(event.reply_token)
-        else:
-            self._send_main_menu(event.reply_token)
+        try:
+            message_text = event.message.text.strip()
+
+            # 檢查用戶狀態
+            user_state = self.user_states.get(user_id)
+            if user_state is not None:
+                self._handle_stateful_message(user_id, user_state, message_text, event.reply_token)
+                return
+
+            # 主要功能路由
+            if message_text == "排班查詢":
+                self._send_schedule_query_menu(event.reply_token)
+            elif message_text == "我的排班":
+                self._send_my_schedule(user_id, event.reply_token)
+            elif message_text == "請假申請":
+                self._send_leave_request_menu(event.reply_token)
+            elif message_text == "排班規則":
+                self._send_scheduling_rules(event.reply_token)
+            elif message_text == "聯絡管理員":
+                self._send_admin_contact(event.reply_token)
+            else:
+                self._send_main_menu(event.reply_token)
+        finally:
+            self._flush_replies(event.reply_token, user_id)
     
     def handle_postback(self, event: PostbackEvent):
         """處理 Postback 事件（按鈕點擊）"""
         user_id = event.source.user_id
-        data = event.postback.data
-        
-        # 解析 Postback 數據
-        if data.startswith("schedule_query_"):
-            self._handle_schedule_query(user_id, data, event.reply_token)
-        elif data.startswith("leave_request_"):
-            self._handle_leave_request(user_id, data, event.reply_token)
-        elif data == "main_menu":
-            self._send_main_menu(event.reply_token)
-        else:
-            self._send_text_message(event.reply_token, "功能開發中，請稍後再試。")
+        try:
+            data = event.postback.data
+
+            # 解析 Postback 數據
+            if data.startswith("schedule_query_"):
+                self._handle_schedule_query(user_id, data, event.reply_token)
+            elif data.startswith("leave_request_"):
+                self._handle_leave_request(user_id, data, event.reply_token)
+            elif data == "main_menu":
+                self._send_main_menu(event.reply_token)
+            else:
+                self._send_text_message(event.reply_token, "功能開發中，請稍後再試。")
+        finally:
+            self._flush_replies(event.reply_token, user_id)
     
     def _send_main_menu(self, reply_token: str):
         """發送主選單"""
@@ -97,7 +113,7 @@ class ScheduleBotHandler:
         # 創建 Carousel 模板
         columns = []
         for query_date, date_str in dates[:3]:  # LINE Carousel 最多顯示3個
-            column = CarouselTemplate(
+            column = CarouselColumn(
                 thumbnail_image_url="https://via.placeholder.com/300x200/4CAF50/FFFFFF?text=排班查詢",
                 title=f"{date_str} 排班",
                 text="點擊查看當日排班詳情",
@@ -127,34 +143,15 @@ class ScheduleBotHandler:
         self._send_template_message(reply_token, template_message)
     
     def _send_my_schedule(self, user_id: str, reply_token: str):
-        """發送個人排班"""
-        # TODO: 從資料庫查詢用戶的排班
-        # 這裡先發送範例訊息
-        
-        today = date.today()
-        current_month = today.strftime("%Y年%m月")
-        
-        schedule_text = f"""
-📅 {current_month} 個人排班表
-
-本週排班：
-• 週一 (今天) - 早班 09:00-17:00
-• 週二 - 早班 09:00-17:00  
-• 週三 - 休息
-• 週四 - 晚班 13:00-21:00
-• 週五 - 晚班 13:00-21:00
-• 週六 - 早班 09:00-17:00
-• 週日 - 休息
+        """發送個人排班（本週排班與本月統計）"""
+        if self.my_schedule is None:
+            self._send_text_message(reply_token, "個人排班查詢暫時無法使用，請稍後再試。")
+            return
 
-本月統計：
-• 已工作時數：128小時
-• 剩餘可用時數：32小時
-• 已休息天數：6天
-• 剩餘需休息：2天
+        schedule_text = self.my_schedule.render(user_id)
+        if schedule_text is None:
+            schedule_text = MessageTemplates.error_message("user_not_found")
 
-💡 提醒：本月還需休息2天才能達到規定要求
-        """
-        
         self._send_text_message(reply_token, schedule_text.strip())
     
     def _send_leave_request_menu(self, reply_token: str):
@@ -226,54 +223,39 @@ class ScheduleBotHandler:
         self._send_text_message(reply_token, contact_text.strip())
     
     def _handle_schedule_query(self, user_id: str, data: str, reply_token: str):
-        """處理排班查詢"""
+        """處理排班查詢（查詢者所屬品牌當天該班別的值班人員）"""
         # 解析數據格式: schedule_query_2024-01-15_早班
-        parts = data.split("_")
-        if len(parts) < 4:
+        query_date_str, _, shift_type = data[len("schedule_query_"):].partition("_")
+        if not shift_type:
             self._send_text_message(reply_token, "查詢格式錯誤，請重新選擇。")
             return
-            
-        query_date_str = f"{parts[2]}-{parts[3]}-{parts[4]}"
-        shift_type = parts[5]
-        
+
         try:
             query_date = datetime.strptime(query_date_str, "%Y-%m-%d").date()
-            date_str = query_date.strftime("%m月%d日(%a)")
-            
-            # TODO: 從資料庫查詢實際排班資料
-            # 這裡先發送範例資料
-            
-            schedule_info = f"""
-📅 {date_str} {shift_type} 排班
+        except ValueError:
+            self._send_text_message(reply_token, "日期格式錯誤，請重新選擇。")
+            return
 
-【值班人員】
-• 王小美 (員工編號: E001)
-• 李小雅 (員工編號: E002)
+        if self.my_schedule is None:
+            self._send_text_message(reply_token, "排班查詢暫時無法使用，請稍後再試。")
+            return
 
-【班別時間】
-• 早班：09:00-17:00
-• 地點：1樓化妝品專櫃
+        schedule_info = self.my_schedule.render_shift(user_id, query_date, shift_type)
+        if schedule_info is None:
+            schedule_info = MessageTemplates.error_message("user_not_found")
 
-【備註】
-• 今日有新品上架活動
-• 請準時到班並做好交接
-            """
-            
-            self._send_text_message(reply_token, schedule_info.strip())
-            
-        except ValueError:
-            self._send_text_message(reply_token, "日期格式錯誤，請重新選擇。")
+        self._send_text_message(reply_token, schedule_info.strip())
     
     def _handle_leave_request(self, user_id: str, data: str, reply_token: str):
         """處理請假申請"""
         leave_type = data.replace("leave_request_", "")
         
         # 設置用戶狀態，等待輸入請假日期
-        self.user_states[user_id] = {
+        self.user_states.set(user_id, {
             "action": "leave_request",
             "leave_type": leave_type,
             "step": "input_date"
-        }
+        })
         
         leave_type_map = {
             "personal": "事假",
@@ -294,15 +276,10 @@ class ScheduleBotHandler:
         
         self._send_text_message(reply_token, prompt_message.strip())
     
-    def _handle_stateful_message(self, user_id: str, message_text: str, reply_token: str):
-        """處理有狀態的對話"""
-        if user_id not in self.user_states:
-            return
-            
-        user_state = self.user_states[user_id]
-        
+    def _handle_stateful_message(self, user_id: str, user_state: dict, message_text: str, reply_token: str):
+        """處理有狀態的對話（狀態修改後需寫回 user_states）"""
         if message_text == "取消":
-            del self.user_states[user_id]
+            self.user_states.delete(user_id)
             self._send_main_menu(reply_token)
             return
         
@@ -315,7 +292,8 @@ class ScheduleBotHandler:
                     
                     # 進入下一步：輸入請假原因
                     user_state["step"] = "input_reason"
-                    user_state["leave_date"] = leave_date
+                    user_state["leave_date"] = leave_date.isoformat()
+                    self.user_states.set(user_id, user_state)
                     
                     prompt_message = f"""
 請假日期：{leave_date.strftime('%m月%d日')}
@@ -329,21 +307,21 @@ class ScheduleBotHandler:
                     self._send_text_message(reply_token, "日期格式錯誤，請使用 MM/DD 格式，例如：01/20")
     
     def _send_text_message(self, reply_token: str, text: str):
-        """發送文字訊息"""
-        try:
-            self.line_bot_api.reply_message(
-                reply_token,
-                TextSendMessage(text=text)
-            )
-        except LineBotApiError as e:
-            print(f"發送訊息失敗: {e}")
+        """發送文字訊息（事件處理完後與其他回覆合併送出）"""
+        self.outbox.add(reply_token, TextSendMessage(text=text))
     
     def _send_template_message(self, reply_token: str, template_message):
-        """發送模板訊息"""
+        """發送模板訊息（事件處理完後與其他回覆合併送出）"""
+        self.outbox.add(reply_token, template_message)
+    
+    def _flush_replies(self, reply_token: str, user_id: str):
+        """以一次 Reply 送出最多 5 則暫存訊息，其餘改以推播送出"""
+        batches = self.outbox.take(reply_token)
+        if not batches:
+            return
         try:
-            self.line_bot_api.reply_message(
-                reply_token,
-                template_message
-            )
+            self.line_bot_api.reply_message(reply_token, batches[0])
+            for messages in batches[1:]:
+                self.line_bot_api.push_message(user_id, messages)
         except LineBotApiError as e:
-            print(f"發送模板訊息失敗: {e}")
+            print(f"發送訊息失敗: {e}")
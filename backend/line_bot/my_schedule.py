@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+「我的排班」與「排班查詢」
+依 LINE User ID 找到員工，顯示本週排班與本月統計，或同品牌某天某班別的值班人員；
+每個月份一次批次讀取全部員工的排班與已核准請假，查詢時只在記憶體中組出訊息
+（值班人員由位元集合月曆求出），員工的排班或請假異動時只重新讀取該員工的資料
+"""
+
+import os
+import time
+import calendar
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from line_bot.messages import MessageTemplates
+from scheduling.availability import MonthCalendar, popcount
+from scheduling.shifts import SHIFT_TYPES, shift_hours
+
+DEFAULT_TTL = 300          # 秒；其他 worker 寫入的資料最晚在此時間後反映
+DEFAULT_MAX_MONTHS = 3
+# 請假開始日早於查詢範圍超過此天數者不列入（單筆請假不超過兩個月）
+LEAVE_LOOKBACK_DAYS = 62
+WEEKDAYS = ("週一", "週二", "週三", "週四", "週五", "週六", "週日")
+
+
+def month_span(year: int, month: int) -> Tuple[date, date]:
+    """月份延伸到完整的週（週一至週日），月初與月底所在的週都能從同一份資料組出"""
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    return first - timedelta(days=first.weekday()), last + timedelta(days=6 - last.weekday())
+
+
+def _overlaps(leave: dict, start: str, end: str) -> bool:
+    return leave['start_date'] <= end and leave['end_date'] >= start
+
+
+def monthly_stats(staff: dict, schedules: List[dict], leaves: List[dict], year: int, month: int) -> dict:
+    """
+    月度統計（MessageTemplates.monthly_schedule_summary 使用的欄位）
+
+    休息天數與規則檢查器相同：當月天數減去有排班的天數
+    """
+    days = calendar.monthrange(year, month)[1]
+    first, last = date(year, month, 1), date(year, month, days)
+    first_iso, last_iso = first.isoformat(), last.isoformat()
+
+    work_days: Set[str] = set()
+    total_hours = 0
+    for schedule in schedules:
+        if schedule['status'] != 'scheduled' or not first_iso <= schedule['schedule_date'] <= last_iso:
+            continue
+        work_days.add(schedule['schedule_date'])
+        total_hours += shift_hours(schedule['shift_type_id'])
+
+    leave_days: Set[date] = set()
+    for leave in leaves:
+        try:
+            start = max(date.fromisoformat(leave['start_date']), first)
+            end = min(date.fromisoformat(leave['end_date']), last)
+        except ValueError:
+            continue
+        leave_days.update(start + timedelta(days=n) for n in range((end - start).days + 1))
+
+    rest_days = days - len(work_days)
+    return {
+        "work_days": len(work_days),
+        "total_hours": total_hours,
+        "rest_days": rest_days,
+        "leave_days": len(leave_days),
+        "remaining_hours": max(0, (staff['monthly_available_hours'] or 0) - total_hours),
+        "needed_rest_days": max(0, (staff['min_rest_days_per_month'] or 0) - rest_days),
+    }
+
+
+def render_my_schedule(staff: dict, schedules: List[dict], leaves: List[dict], today: date) -> str:
+    """個人排班訊息：本週每日班別、本月統計與休息提醒"""
+    monday = today - timedelta(days=today.weekday())
+    by_date = {s['schedule_date']: s for s in schedules if s['status'] == 'scheduled'}
+
+    lines = []
+    for offset, weekday in enumerate(WEEKDAYS):
+        day = monday + timedelta(days=offset)
+        day_iso = day.isoformat()
+        label = f"{weekday} {day:%m/%d}" + (" (今天)" if day == today else "")
+        leave = next((l for l in leaves if l['start_date'] <= day_iso <= l['end_date']), None)
+        schedule = by_date.get(day_iso)
+        if leave is not None:
+            detail = f"請假（{leave['leave_type']}）"
+        elif schedule is not None:
+            shift = SHIFT_TYPES.get(schedule['shift_type_id'])
+            detail = schedule['shift_type_id']
+            if shift:
+                detail += f" {shift['start_time']}-{shift['end_time']}"
+        else:
+            detail = "休息"
+        lines.append(f"• {label} - {detail}")
+
+    month_label = f"{today.year}年{today.month:02d}月"
+    stats = monthly_stats(staff, schedules, leaves, today.year, today.month)
+    text = (f"📅 {month_label} 個人排班表\n\n👤 {staff['name']}\n\n本週排班：\n" + "\n".join(lines)
+            + "\n\n" + MessageTemplates.monthly_schedule_summary(month_label, stats).strip())
+    if stats['needed_rest_days'] > 0:
+        text += f"\n\n💡 提醒：本月還需休息{stats['needed_rest_days']}天才能達到規定要求"
+    return text
+
+
+def render_shift_roster(day: date, shift_id: str, on_shift: List[dict], free: int, on_leave: int) -> str:
+    """某天某班別的值班人員，以及當天可支援（未排班且未請假）與請假的人數"""
+    shift = SHIFT_TYPES.get(shift_id)
+    lines = [f"• {staff['name']} (員工編號: {staff['employee_id']})" for staff in on_shift] or ["• 尚無排班"]
+    text = f"📅 {day:%m月%d日}({WEEKDAYS[day.weekday()][1]}) {shift_id} 排班\n"
+    if shift:
+        text += f"⏰ {shift['start_time']}-{shift['end_time']}\n"
+    text += f"\n【值班人員】{len(on_shift)} 人\n" + "\n".join(lines)
+    text += f"\n\n【當天其他同仁】\n• 可支援：{free} 人\n• 請假：{on_leave} 人"
+    return text
+
+
+@dataclass
+class _MonthSnapshot:
+    """一個月份（延伸到完整週）內全部員工的排班與已核准請假"""
+    start: str
+    end: str
+    loaded_at: float
+    schedules: Dict[str, List[dict]] = field(default_factory=dict)  # staff_id -> 排班
+    leaves: Dict[str, List[dict]] = field(default_factory=dict)     # staff_id -> 請假
+    stale: Set[str] = field(default_factory=set)                     # 資料已異動、需重新讀取的員工
+    rendered: Dict[str, Tuple[date, str]] = field(default_factory=dict)  # staff_id -> (查詢日, 訊息)
+    calendar: Optional[MonthCalendar] = None                         # 排班查詢用，資料異動時重建
+    brand_masks: Dict[str, int] = field(default_factory=dict)        # 品牌 -> 月曆中的員工序號位元集合
+
+
+@dataclass
+class _Load:
+    """進行中的讀取（員工名單或某月份）；讀取期間異動的員工記在 stale，換上後仍視為需重新讀取"""
+    done: threading.Event = field(default_factory=threading.Event)
+    stale: Set[str] = field(default_factory=set)
+
+
+DIRECTORY = "staff"  # _loading 中員工名單的鍵（月份以 (年, 月) 為鍵）
+
+
+class MyScheduleCache:
+    """
+    每月排班快照 + 每位員工已組好的訊息
+
+    同一個月份只批次讀取一次（之後每 ttl 秒重新讀取以反映其他 worker 的寫入），
+    尚未綁定的 LINE 帳號以索引查詢單筆，結果同樣保留 ttl 秒。
+    資料存取層的讀取都在鎖外進行，完成後才在鎖內換上；同一份資料同時只有一個執行緒讀取，
+    重新讀取期間其他查詢沿用舊資料，尚無資料時等待該次讀取完成。
+    """
+
+    def __init__(self, repository, ttl: float = DEFAULT_TTL, max_months: int = DEFAULT_MAX_MONTHS,
+                 clock=time.monotonic):
+        self.repository = repository
+        self.ttl = ttl
+        self.max_months = max(1, max_months)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._months: "OrderedDict[Tuple[int, int], _MonthSnapshot]" = OrderedDict()
+        self._loading: Dict[object, _Load] = {}  # DIRECTORY 或 (年, 月) -> 進行中的讀取
+        self._staff_by_line: Optional[Dict[str, dict]] = None
+        self._staff_by_id: Dict[str, dict] = {}  # 全部在職員工（排班查詢顯示姓名）
+        self._staff_loaded_at = 0.0
+        self._unbound: Dict[str, float] = {}  # line_user_id -> 到期時間
+        self.hits = 0
+        self.renders = 0
+        self.month_loads = 0
+        self.staff_refreshes = 0
+        self.directory_loads = 0
+        self.lookups = 0
+
+    def render(self, line_user_id: str, today: Optional[date] = None) -> Optional[str]:
+        """組出個人排班訊息；LINE 帳號未綁定在職員工時回傳 None"""
+        today = today or date.today()
+        staff = self._resolve(line_user_id)
+        if staff is None:
+            return None
+        snapshot = self._month(today.year, today.month)
+        with self._lock:
+            cached = snapshot.rendered.get(staff['id'])
+            if cached is not None and cached[0] == today:
+                self.hits += 1
+                return cached[1]
+        self._refresh(snapshot, [staff['id']])
+        with self._lock:
+            text = render_my_schedule(staff, snapshot.schedules.get(staff['id'], []),
+                                      snapshot.leaves.get(staff['id'], []), today)
+            # 組訊息前又有異動時不保留，下次查詢重新讀取
+            if staff['id'] not in snapshot.stale:
+                snapshot.rendered[staff['id']] = (today, text)
+            self.renders += 1
+            return text
+
+    def render_shift(self, line_user_id: str, day: date, shift_id: str) -> Optional[str]:
+        """組出查詢者所屬品牌某天某班別的值班人員；LINE 帳號未綁定在職員工時回傳 None"""
+        staff = self._resolve(line_user_id)
+        if staff is None:
+            return None
+        snapshot = self._month(day.year, day.month)
+        self._refresh(snapshot)
+        with self._lock:
+            month_calendar = self._calendar(snapshot, day.year, day.month)
+            brand = snapshot.brand_masks.get(staff['brand_id'])
+            if brand is None:
+                brand = snapshot.brand_masks[staff['brand_id']] = sum(
+                    1 << month_calendar.add_staff(s['id'])
+                    for s in self._staff_by_id.values() if s['brand_id'] == staff['brand_id']
+                )
+            on_shift = [self._staff_by_id[staff_id]
+                        for staff_id in month_calendar.members(month_calendar.on_shift(day, shift_id) & brand)]
+            return render_shift_roster(day, shift_id, on_shift, popcount(month_calendar.free(day) & brand),
+                                       popcount(month_calendar.on_leave(day) & brand))
+
+    def invalidate(self, staff_id: str):
+        """員工的排班或請假異動：下次查詢時只重新讀取該員工的資料"""
+        with self._lock:
+            for snapshot in self._months.values():
+                snapshot.stale.add(staff_id)
+                snapshot.rendered.pop(staff_id, None)
+                snapshot.calendar = None
+            for key, load in self._loading.items():
+                if key != DIRECTORY:
+                    load.stale.add(staff_id)
+
+    def invalidate_staff(self, staff_id: str):
+        """員工資料異動（綁定帳號、可用時數等）：下次查詢時重新讀取員工名單"""
+        with self._lock:
+            self._staff_by_line = None
+            for snapshot in self._months.values():
+                snapshot.rendered.pop(staff_id, None)
+                snapshot.calendar = None
+            if DIRECTORY in self._loading:
+                self._loading[DIRECTORY].stale.add(staff_id)
+
+    def _load_directory(self):
+        """員工名單超過 ttl 或有異動時重新讀取"""
+        while True:
+            with self._lock:
+                now = self._clock()
+                if self._staff_by_line is not None and now - self._staff_loaded_at < self.ttl:
+                    return
+                load = self._loading.get(DIRECTORY)
+                if load is None:
+                    load = self._loading[DIRECTORY] = _Load()
+                    break
+                if self._staff_by_line is not None:
+                    return  # 其他執行緒正在重新讀取，先用舊名單
+            load.done.wait()
+
+        rows = None
+        try:
+            rows = self.repository.list("staff")
+        finally:
+            with self._lock:
+                del self._loading[DIRECTORY]
+                if rows is not None:
+                    self._staff_by_id = {s['id']: s for s in rows if s['is_active']}
+                    self._staff_by_line = {s['line_user_id']: s for s in self._staff_by_id.values()
+                                           if s['line_user_id']}
+                    for snapshot in self._months.values():
+                        snapshot.calendar = None
+                    # 讀取期間員工資料又有異動：下次查詢再讀一次
+                    self._staff_loaded_at = now if not load.stale else float('-inf')
+                    self._unbound.clear()
+                    self.directory_loads += 1
+            load.done.set()
+
+    def _resolve(self, line_user_id: str) -> Optional[dict]:
+        self._load_directory()
+        with self._lock:
+            now = self._clock()
+            staff = (self._staff_by_line or {}).get(line_user_id)
+            if staff is not None:
+                return staff
+            expires = self._unbound.get(line_user_id)
+            if expires is not None and expires > now:
+                return None
+            self.lookups += 1
+        # 名單讀取後才綁定的帳號（可能由其他 worker 寫入）
+        staff = self.repository.find_staff_by_line_user(line_user_id)
+        with self._lock:
+            if staff is None or not staff['is_active']:
+                self._unbound[line_user_id] = now + self.ttl
+                return None
+            if self._staff_by_line is not None:
+                self._staff_by_line[line_user_id] = staff
+            self._staff_by_id.setdefault(staff['id'], staff)
+            return staff
+
+    def _month(self, year: int, month: int) -> _MonthSnapshot:
+        key = (year, month)
+        while True:
+            with self._lock:
+                snapshot = self._months.get(key)
+                now = self._clock()
+                if snapshot is not None and now - snapshot.loaded_at < self.ttl:
+                    self._months.move_to_end(key)
+                    return snapshot
+                load = self._loading.get(key)
+                if load is None:
+                    load = self._loading[key] = _Load()
+                    break
+                if snapshot is not None:
+                    return snapshot  # 其他執行緒正在重新讀取，先用舊快照
+            load.done.wait()
+
+        loaded = None
+        try:
+            loaded = self._load_month(year, month, now)
+        finally:
+            with self._lock:
+                del self._loading[key]
+                if loaded is not None:
+                    loaded.stale |= load.stale
+                    self._months[key] = loaded
+                    self._months.move_to_end(key)
+                    while len(self._months) > self.max_months:
+                        self._months.popitem(last=False)
+                    self.month_loads += 1
+            load.done.set()
+        return loaded
+
+    def _load_month(self, year: int, month: int, now: float) -> _MonthSnapshot:
+        start, end = month_span(year, month)
+        snapshot = _MonthSnapshot(start.isoformat(), end.isoformat(), now)
+        for schedule in self.repository.list_schedules(date_from=snapshot.start, date_to=snapshot.end):
+            snapshot.schedules.setdefault(schedule['staff_id'], []).append(schedule)
+        lookback = (start - timedelta(days=LEAVE_LOOKBACK_DAYS)).isoformat()
+        for leave in self.repository.list_leave_requests(status='approved', date_from=lookback):
+            if _overlaps(leave, snapshot.start, snapshot.end):
+                snapshot.leaves.setdefault(leave['staff_id'], []).append(leave)
+        return snapshot
+
+    def _calendar(self, snapshot: _MonthSnapshot, year: int, month: int) -> MonthCalendar:
+        """快照中該月份的位元集合月曆（在職員工全部列入，才能算出誰有空）"""
+        if snapshot.calendar is None:
+            snapshot.calendar = MonthCalendar.from_rows(
+                year, month,
+                (row for rows in snapshot.schedules.values() for row in rows),
+                (leave for leaves in snapshot.leaves.values() for leave in leaves),
+                staff_ids=self._staff_by_id,
+            )
+            snapshot.brand_masks.clear()
+        return snapshot.calendar
+
+    def _refresh(self, snapshot: _MonthSnapshot, staff_ids: Optional[List[str]] = None):
+        """在鎖外重新讀取快照中已異動的員工（staff_ids 未指定時為全部），逐一在鎖內換上"""
+        with self._lock:
+            pending = [staff_id for staff_id in (staff_ids if staff_ids is not None else snapshot.stale)
+                       if staff_id in snapshot.stale]
+            snapshot.stale.difference_update(pending)
+        for index, staff_id in enumerate(pending):
+            try:
+                schedules = self.repository.list_schedules(
+                    staff_id=staff_id, date_from=snapshot.start, date_to=snapshot.end
+                )
+                leaves = [
+                    leave for leave in self.repository.list_leave_requests(staff_id=staff_id, status='approved')
+                    if _overlaps(leave, snapshot.start, snapshot.end)
+                ]
+            except BaseException:
+                with self._lock:
+                    snapshot.stale.update(pending[index:])
+                raise
+            with self._lock:
+                snapshot.schedules[staff_id] = schedules
+                snapshot.leaves[staff_id] = leaves
+                snapshot.rendered.pop(staff_id, None)
+                snapshot.calendar = None
+                self.staff_refreshes += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "ttl_seconds": self.ttl,
+                "months": [f"{year}-{month:02d}" for year, month in self._months],
+                "staff": len(self._staff_by_line or {}),
+                "hits": self.hits,
+                "renders": self.renders,
+                "month_loads": self.month_loads,
+                "staff_refreshes": self.staff_refreshes,
+                "directory_loads": self.directory_loads,
+                "lookups": self.lookups,
+            }
+
+
+def create_my_schedule_cache(repository) -> MyScheduleCache:
+    """建立個人排班快取；MY_SCHEDULE_CACHE_TTL 調整快照保留秒數"""
+    return MyScheduleCache(repository, float(os.getenv("MY_SCHEDULE_CACHE_TTL", DEFAULT_TTL)))
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LINE 推播佇列
+推播先寫入 SQLite 日誌再由背景 worker 送出：以 token bucket 控制速率，
+遇到 429 / 5xx / 連線錯誤時以指數退避重試，並以 X-Line-Retry-Key 避免重複傳送；
+worker 對日誌的讀寫在專用執行緒中執行，不阻塞事件迴圈
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from line_bot.batcher import Push, plan_pushes
+
+DEFAULT_JOURNAL_PATH = "push_queue.db"
+DEFAULT_RATE = 100.0          # 每秒請求數
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_BASE_DELAY = 1.0      # 秒
+DEFAULT_MAX_DELAY = 300.0
+LEASE_SECONDS = 60            # 送出中的工作超過此時間未完成（例如行程中斷）即重新排入
+POLL_INTERVAL = 1.0
+RETENTION_SECONDS = 7 * 86400
+
+ENDPOINTS = {"push": "/message/push", "multicast": "/message/multicast"}
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS push_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    retry_key TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_push_jobs_due ON push_jobs(status, next_attempt_at, id)
+"""
+
+
+def _message_dict(message: Any) -> dict:
+    return message if isinstance(message, dict) else message.as_json_dict()
+
+
+class PushJournal:
+    """
+    推播工作的 SQLite 日誌（WAL 模式）
+
+    工作狀態：pending -> sending -> sent / failed；sending 帶有租約，
+    租約到期仍未完成的工作會再被取出，因此行程重啟後不會遺失推播。
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        conn = self._connection()
+        for statement in JOURNAL_SCHEMA.split(';'):
+            conn.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # 每個執行緒各自一個連線；check_same_thread=False 只為了讓 close() 可在其他執行緒關閉
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, cached_statements=64,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def enqueue(self, jobs: Iterable[Tuple[str, dict]]) -> int:
+        """寫入 (kind, payload) 工作；每筆工作配發固定的 retry key，重試時沿用"""
+        now = time.time()
+        rows = [(kind, json.dumps(payload, ensure_ascii=False), str(uuid.uuid4()), now, now, now)
+                for kind, payload in jobs]
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO push_jobs (kind, payload, retry_key, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def claim(self) -> Optional[dict]:
+        """取出一筆到期的工作並標記為送出中（單一語句，多個 worker / 行程間不會重複取出）"""
+        now = time.time()
+        row = self._connection().execute(
+            "UPDATE push_jobs SET status = 'sending', attempts = attempts + 1, "
+            "next_attempt_at = ?, updated_at = ? "
+            "WHERE id = (SELECT id FROM push_jobs WHERE status IN ('pending', 'sending') "
+            "AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT 1) "
+            "RETURNING id, kind, payload, retry_key, attempts",
+            (now + LEASE_SECONDS, now, now)
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, payload, retry_key, attempts = row
+        return {"id": job_id, "kind": kind, "payload": json.loads(payload),
+                "retry_key": retry_key, "attempts": attempts}
+
+    def next_due(self) -> Optional[float]:
+        """最早到期的工作時間，沒有待送工作時回傳 None"""
+        return self._connection().execute(
+            "SELECT MIN(next_attempt_at) FROM push_jobs WHERE status IN ('pending', 'sending')"
+        ).fetchone()[0]
+
+    def _finish(self, job_id: int, status: str, next_attempt_at: float, error: Optional[str]):
+        now = time.time()
+        self._connection().execute(
+            "UPDATE push_jobs SET status = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+            (status, next_attempt_at, error, now, job_id)
+        )
+
+    def complete(self, job_id: int):
+        self._finish(job_id, 'sent', 0, None)
+
+    def retry(self, job_id: int, delay: float, error: str):
+        self._finish(job_id, 'pending', time.time() + delay, error)
+
+    def fail(self, job_id: int, error: str):
+        self._finish(job_id, 'failed', 0, error)
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._connection().execute(
+            "SELECT status, COUNT(*) FROM push_jobs GROUP BY status"
+        ).fetchall())
+
+    def purge(self, older_than: float):
+        """刪除已完成且超過保留期限的工作"""
+        self._connection().execute(
+            "DELETE FROM push_jobs WHERE status IN ('sent', 'failed') AND updated_at < ?", (older_than,)
+        )
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class TokenBucket:
+    """非同步 token bucket：平均每秒 rate 個請求，最多累積 capacity 個"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float):
+        """收到 429 時暫停發放（所有 worker 共用）"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = min(self._tokens, 0.0)
+
+    def refund(self):
+        """退回一個沒有用到的 token"""
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+class PushQueue:
+    """
+    持久化的 LINE 推播佇列
+
+    enqueue_pushes() 可在任何執行緒呼叫（寫入日誌後喚醒 worker），事件迴圈中改用 aenqueue_pushes()；
+    worker 在 start() 所在的事件迴圈中執行，共用同一個 token bucket 與 AsyncLineClient，
+    日誌操作交給單一專用執行緒。
+    """
+
+    def __init__(self, journal: PushJournal, client,
+                 rate: float = DEFAULT_RATE,
+                 workers: int = DEFAULT_WORKERS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.journal = journal
+        self.client = client
+        self.bucket = TokenBucket(rate)
+        self.worker_count = max(1, workers)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._journal_thread: Optional[ThreadPoolExecutor] = None
+
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.throttled = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._journal_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="push-journal")
+        await self._journal(self.journal.purge, time.time() - RETENTION_SECONDS)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._journal_thread is not None:
+            # 等待已送出的日誌寫入完成
+            await asyncio.to_thread(self._journal_thread.shutdown)
+            self._journal_thread = None
+
+    async def _journal(self, method, *args):
+        """在日誌專用執行緒執行 PushJournal 的方法"""
+        return await self._loop.run_in_executor(self._journal_thread, method, *args)
+
+    def enqueue(self, jobs: Iterable[Tuple[str, dict]]) -> int:
+        count = self.journal.enqueue(jobs)
+        if self._loop is not None and count:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return count
+
+    def enqueue_pushes(self, pushes: Iterable[Push]) -> int:
+        """
+        排入推播；內容相同的訊息先合併為 Multicast
+
+        Returns:
+            排入的 API 請求數
+        """
+        jobs = []
+        for kind, to, messages in plan_pushes(pushes):
+            jobs.append((kind, {"to": to, "messages": [_message_dict(m) for m in messages]}))
+        return self.enqueue(jobs)
+
+    async def aenqueue_pushes(self, pushes: Iterable[Push]) -> int:
+        """在事件迴圈中排入推播（寫入日誌移到執行緒）"""
+        return await asyncio.to_thread(self.enqueue_pushes, list(pushes))
+
+    async def _wait_for_work(self):
+        due = await self._journal(self.journal.next_due)
+        timeout = POLL_INTERVAL if due is None else min(POLL_INTERVAL, max(0.0, due - time.time()))
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self):
+        while True:
+            # 先取得 token 再取出工作：429 暫停期間不持有租約，租約不會在送出前到期而被其他 worker 重複送出
+            await self.bucket.acquire()
+            job = await self._journal(self.journal.claim)
+            if job is None:
+                self.bucket.refund()
+                await self._wait_for_work()
+                continue
+            try:
+                await self._deliver(job)
+            except Exception as e:
+                print(f"Error delivering LINE push job {job['id']}: {e}")
+                await self._retry(job, None, str(e))
+
+    async def _retry(self, job: dict, retry_after: Optional[float], error: str):
+        if job["attempts"] >= self.max_attempts:
+            self.failed += 1
+            await self._journal(self.journal.fail, job["id"], error)
+            print(f"LINE push job {job['id']} failed after {job['attempts']} attempts: {error}")
+            return
+        # 指數退避加隨機抖動；伺服器有指定 Retry-After 時以較長者為準
+        delay = min(self.max_delay, self.base_delay * 2 ** (job["attempts"] - 1))
+        delay = max(delay * random.uniform(0.5, 1.0), retry_after or 0.0)
+        self.retried += 1
+        await self._journal(self.journal.retry, job["id"], delay, error)
+
+    async def _deliver(self, job: dict):
+        try:
+            response = await self.client.send(ENDPOINTS[job["kind"]], job["payload"], retry_key=job["retry_key"])
+        except httpx.HTTPError as e:
+            await self._retry(job, None, f"{type(e).__name__}: {e}")
+            return
+
+        status = response.status_code
+        # 409：同一個 retry key 先前已被 LINE 接受（例如回應在途中遺失），視為已送出
+        if status == 200 or (status == 409 and "x-line-accepted-request-id" in response.headers):
+            self.sent += 1
+            await self._journal(self.journal.complete, job["id"])
+        elif status == 429 or status >= 500:
+            retry_after = _retry_after(response)
+            if status == 429:
+                self.throttled += 1
+                self.bucket.pause(retry_after or self.base_delay)
+            await self._retry(job, retry_after, f"{status}: {response.text[:200]}")
+        else:
+            self.failed += 1
+            await self._journal(self.journal.fail, job["id"], f"{status}: {response.text[:200]}")
+            print(f"LINE push job {job['id']} rejected: {status} - {response.text}")
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.worker_count,
+            "rate_per_second": self.bucket.rate,
+            "jobs": self.journal.counts(),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "throttled": self.throttled,
+        }
+
+
+def create_push_queue(client, path: Optional[str] = None) -> PushQueue:
+    """依環境變數 PUSH_QUEUE_PATH / LINE_PUSH_RATE / LINE_PUSH_WORKERS / LINE_PUSH_MAX_ATTEMPTS 建立推播佇列"""
+    return PushQueue(
+        PushJournal(path or os.getenv("PUSH_QUEUE_PATH", DEFAULT_JOURNAL_PATH)),
+        client,
+        rate=float(os.getenv("LINE_PUSH_RATE", DEFAULT_RATE)),
+        workers=int(os.getenv("LINE_PUSH_WORKERS", DEFAULT_WORKERS)),
+        max_attempts=int(os.getenv("LINE_PUSH_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+    )
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+關鍵字回覆（不需查詢資料的簡易 LINE Bot）
+"""
+
+
+def basic_reply(user_message: str) -> str:
+    """依訊息內容產生回覆"""
+    if "你好" in user_message or "hi" in user_message.lower():
+        return "您好！歡迎使用百貨櫃姐排班系統！\n\n📋 主選單：\n1. 排班查詢\n2. 請假申請\n3. 設定更新\n\n請輸入您需要的服務！"
+    elif "排班" in user_message:
+        return "📊 排班查詢\n\n請選擇：\n• 今日排班\n• 本週排班\n• 本月排班\n\n請輸入您想查詢的時間範圍！"
+    elif "請假" in user_message:
+        return "📝 請假申請\n\n請提供：\n• 請假日期\n• 請假類型\n• 請假原因\n\n我們會為您處理申請！"
+    else:
+        return f"收到您的訊息：{user_message}\n\n📋 主選單：\n1. 排班查詢\n2. 請假申請\n3. 設定更新\n\n請輸入您需要的服務！"
+
+
+def smart_reply(user_message: str) -> str:
+    """處理用戶訊息並返回回覆（較精確的關鍵字比對）"""
+    # 清理訊息（移除前後空格）
+    message = user_message.strip()
+
+    # 歡迎訊息
+    if message in ["你好", "hi", "Hi", "HI", "hello", "Hello", "您好"]:
+        return """🎉 歡迎使用百貨櫃姐排班系統！
+
+📋 主選單：
+1️⃣ 排班查詢
+2️⃣ 請假申請
+3️⃣ 設定更新
+
+請輸入您需要的服務，或直接說明需求！"""
+
+    # 本週排班（必須在排班之前檢查）
+    elif "本週" in message or "這週" in message:
+        return """📅 本週排班查詢
+
+週一：張小櫃 早班，李小姐 晚班
+週二：李小姐 早班，張小櫃 晚班
+週三：張小櫃 早班，李小姐 晚班
+週四：李小姐 早班，張小櫃 晚班
+週五：張小櫃 早班，李小姐 晚班
+
+💡 週末輪休安排"""
+
+    # 今日排班（必須在排班之前檢查）
+    elif "今日" in message or "今天" in message:
+        return """📅 今日排班查詢
+
+👤 張小櫃：早班 09:00-17:00
+👤 李小姐：晚班 13:00-21:00
+
+💡 如需修改請聯繫主管"""
+
+    # 本月排班（必須在排班之前檢查）
+    elif "本月" in message or "這月" in message:
+        return """📅 本月排班查詢
+
+1月排班總覽：
+✅ 張小櫃：15天早班，10天晚班，5天休息
+✅ 李小姐：10天早班，15天晚班，5天休息
+
+💡 詳細排班表請查詢具體日期"""
+
+    # 排班相關（放在最後）
+    elif "排班" in message:
+        return """📊 排班查詢
+
+請選擇查詢範圍：
+• 今日排班
+• 本週排班
+• 本月排班
+• 個人排班
+
+請告訴我您想查詢的時間範圍！"""
+
+    # 請假相關
+    elif "請假" in message:
+        return """📝 請假申請
+
+請提供以下資訊：
+📅 請假日期
+🏷️ 請假類型
+📝 請假原因
+
+例如：請假 2026/01/20 事假 身體不適"""
+
+    # 預設回覆
+    else:
+        return f"""🔔 收到您的訊息：「{message}」
+
+📋 我可以協助您：
+1️⃣ 排班查詢 - 請說「排班」
+2️⃣ 請假申請 - 請說「請假」
+3️⃣ 今日排班 - 請說「今日排班」
+4️⃣ 本週排班 - 請說「本週排班」
+5️⃣ 本月排班 - 請說「本月排班」
+
+請直接輸入關鍵字，我會為您處理！"""
+
+
+REPLY_BUILDERS = {"basic": basic_reply, "smart": smart_reply}
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LINE Webhook 簽名驗證
+直接對原始請求位元組計算 HMAC-SHA256（邊接收邊計算），以 hmac.compare_digest 比對，
+並只解析一次 JSON，解析結果放在 request.state.line_payload 供路由使用
+"""
+
+import hmac
+import json
+import base64
+import hashlib
+from typing import Iterable, Optional
+
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024  # LINE webhook 實際大小遠低於此
+SIGNATURE_HEADER = b"x-line-signature"
+
+
+def compute_signature(channel_secret: str, body: bytes) -> str:
+    """LINE 簽名：HMAC-SHA256 摘要的 Base64 編碼"""
+    digest = hmac.new(channel_secret.encode("utf-8"), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def verify_signature(channel_secret: str, body: bytes, signature: str) -> bool:
+    """以固定時間比對簽名"""
+    return hmac.compare_digest(compute_signature(channel_secret, body).encode("ascii"),
+                               signature.encode("utf-8"))
+
+
+async def _send_error(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode("ascii"))]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class LineSignatureMiddleware:
+    """
+    Webhook 路徑的 ASGI 中介層
+
+    - Content-Length 超過上限時不讀取本體直接回應 413，未標示長度時在累積超過上限時中止
+    - 每個區塊到達時即更新 HMAC，不需先組合本體再計算
+    - 驗證通過後解析一次 JSON 放入 request.state.line_payload，
+      並保留原始本體供仍需 await request.body() 的路由讀取
+    - channel_secret 為空時略過驗證（與原本未設定密鑰時的行為相同）
+    """
+
+    def __init__(self, app, channel_secret: Optional[str],
+                 paths: Iterable[str] = ("/webhook/line",),
+                 max_body_size: int = DEFAULT_MAX_BODY_SIZE):
+        self.app = app
+        self.secret = channel_secret.encode("utf-8") if channel_secret else None
+        self.paths = frozenset(paths)
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        signature = b""
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if not value.isdigit() or int(value) > self.max_body_size:
+                    await _send_error(send, 413, "Request body too large")
+                    return
+            elif name == SIGNATURE_HEADER:
+                signature = value
+
+        mac = hmac.new(self.secret, digestmod=hashlib.sha256) if self.secret else None
+        chunks, size, more = [], 0, True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            more = message.get("more_body", False)
+            size += len(chunk)
+            if size > self.max_body_size:
+                await _send_error(send, 413, "Request body too large")
+                return
+            if chunk:
+                chunks.append(chunk)
+                if mac is not None:
+                    mac.update(chunk)
+
+        if mac is not None and not hmac.compare_digest(base64.b64encode(mac.digest()), signature):
+            await _send_error(send, 400, "Invalid signature")
+            return
+
+        body = b"".join(chunks)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            await _send_error(send, 400, "Invalid JSON body")
+            return
+        if not isinstance(payload, dict):
+            await _send_error(send, 400, "Invalid webhook payload")
+            return
+        scope.setdefault("state", {})["line_payload"] = payload
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, replay, send)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LINE 對話狀態儲存
+每筆狀態有到期時間，記憶體版以 LRU 淘汰並限制筆數與總大小；
+SQLite 版可讓對話在重啟後延續，並由同一主機上的多個 worker 共用
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+DEFAULT_TTL = 1800                   # 秒；放棄的請假流程 30 分鐘後失效
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_STATE_PATH = "conversation_states.db"
+# 每寫入幾次清除一次過期狀態
+SWEEP_INTERVAL = 1000
+
+
+class StateStore:
+    """對話狀態介面；狀態為可 JSON 序列化的 dict，取出的是複本，修改後需再 set"""
+
+    def get(self, user_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def set(self, user_id: str, state: dict, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, user_id: str):
+        raise NotImplementedError
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.get(user_id) is not None
+
+    def close(self):
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """
+    行程內 TTL + LRU 狀態儲存
+
+    get / set / delete 皆為 O(1)；超過 max_entries 筆或 max_bytes（以 JSON 長度估算）時
+    淘汰最久未使用的狀態，過期狀態在讀取時或定期清除時移除。
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        # user_id -> (序列化後的狀態, 到期時間)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def _remove(self, user_id: str):
+        data, _ = self._entries.pop(user_id)
+        self._bytes -= len(data)
+
+    def get(self, user_id):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                self._remove(user_id)
+                self.expired += 1
+                return None
+            self._entries.move_to_end(user_id)
+            return json.loads(entry[0])
+
+    def set(self, user_id, state, ttl=None):
+        data = json.dumps(state, ensure_ascii=False)
+        if len(data) > self.max_bytes:
+            raise ValueError(f"Conversation state too large: {len(data)} bytes")
+        now = time.time()
+        with self._lock:
+            if user_id in self._entries:
+                self._remove(user_id)
+            self._entries[user_id] = (data, now + (ttl or self.ttl))
+            self._bytes += len(data)
+            self._writes += 1
+            if self._writes % SWEEP_INTERVAL == 0:
+                self._sweep(now)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evicted += 1
+
+    def _sweep(self, now: float):
+        for user_id in [u for u, (_, expires) in self._entries.items() if expires <= now]:
+            self._remove(user_id)
+            self.expired += 1
+
+    def delete(self, user_id):
+        with self._lock:
+            if user_id in self._entries:
+                self._remove(user_id)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "evicted": self.evicted, "expired": self.expired}
+
+
+class SQLiteStateStore(StateStore):
+    """
+    SQLite 狀態儲存（WAL 模式），以 user_id 主鍵查詢
+
+    定期清除過期狀態；筆數超過 max_entries 時刪除最久未更新的狀態。
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS conversation_states ("
+            "user_id TEXT PRIMARY KEY, state TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # 每個執行緒各自一個連線；check_same_thread=False 只為了讓 close() 可在其他執行緒關閉
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, user_id):
+        row = self._connection().execute(
+            "SELECT state FROM conversation_states WHERE user_id = ? AND expires_at > ?",
+            (user_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, user_id, state, ttl=None):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO conversation_states (user_id, state, expires_at, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET state = excluded.state, "
+            "expires_at = excluded.expires_at, updated_at = excluded.updated_at",
+            (user_id, json.dumps(state, ensure_ascii=False), now + (ttl or self.ttl), now)
+        )
+        with self._writes_lock:
+            self._writes += 1
+            sweep = self._writes % SWEEP_INTERVAL == 0
+        if sweep:
+            self._sweep(conn, now)
+
+    def _sweep(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM conversation_states WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM conversation_states WHERE user_id IN ("
+            "SELECT user_id FROM conversation_states ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def delete(self, user_id):
+        self._connection().execute("DELETE FROM conversation_states WHERE user_id = ?", (user_id,))
+
+    def metrics(self) -> dict:
+        count, = self._connection().execute(
+            "SELECT COUNT(*) FROM conversation_states WHERE expires_at > ?", (time.time(),)
+        ).fetchone()
+        return {"entries": count}
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_state_store(backend: Optional[str] = None) -> StateStore:
+    """
+    建立對話狀態儲存
+
+    Args:
+        backend: 'memory' 或 'sqlite'，預設讀取環境變數 STATE_STORE；
+            STATE_TTL / STATE_MAX_ENTRIES / STATE_MAX_BYTES / STATE_STORE_PATH 調整上限與檔案位置
+    """
+    backend = backend or os.getenv("STATE_STORE", "memory")
+    ttl = float(os.getenv("STATE_TTL", DEFAULT_TTL))
+    max_entries = int(os.getenv("STATE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    if backend == 'memory':
+        return MemoryStateStore(ttl, max_entries, int(os.getenv("STATE_MAX_BYTES", DEFAULT_MAX_BYTES)))
+    if backend == 'sqlite':
+        return SQLiteStateStore(os.getenv("STATE_STORE_PATH", DEFAULT_STATE_PATH), ttl, max_entries)
+    raise ValueError(f"Unknown state store: {backend}")
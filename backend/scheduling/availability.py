@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+位元集合排班月曆
+一個月份內的 (員工, 日期, 班別) 布林值以 Python int 位元集合表示：
+每位員工一個「日 × 班別」位元集合（第 d × 班別數 + s 位元為第 d 天的第 s 個班別，
+d 由 0 起算）與兩個「日」位元集合（上班日、請假日）；另外每天維護以員工序號為位元的
+集合，「3/14 晚班有誰、誰有空」「某人本月休幾天」都只需幾個位元運算與 popcount
+"""
+
+import calendar
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from scheduling.shifts import SHIFT_TYPES
+
+
+def popcount(bits: int) -> int:
+    """位元集合中 1 的個數"""
+    return bits.bit_count()
+
+
+def bit_positions(bits: int) -> List[int]:
+    """由低到高列出位元集合中為 1 的位置"""
+    # 以二進位字串走訪比逐一取出最低位元快（員工數百人時約兩倍）
+    return [i for i, c in enumerate(bin(bits)[:1:-1]) if c == '1']
+
+
+def run_below(bits: int, position: int) -> int:
+    """緊接在 position 之前（不含 position）的連續 1 長度"""
+    return position - (~bits & ((1 << position) - 1)).bit_length()
+
+
+def run_through(bits: int, position: int) -> int:
+    """包含 position 的連續 1 長度（position 本身視為 1）"""
+    high = (bits >> position) | 1
+    below = ~bits & ((1 << position) - 1)
+    return position - below.bit_length() + (~high & (high + 1)).bit_length() - 1
+
+
+def runs(bits: int) -> List[Tuple[int, int]]:
+    """位元集合中各段連續 1 的 (起始位置, 長度)，依位置排序"""
+    result = []
+    while bits:
+        start = (bits & -bits).bit_length() - 1
+        shifted = bits >> start
+        length = (~shifted & (shifted + 1)).bit_length() - 1
+        result.append((start, length))
+        bits &= ~(((1 << length) - 1) << start)
+    return result
+
+
+class MonthCalendar:
+    """
+    一個月份的排班與請假位元集合
+
+    同一員工同一天只記一個班別（與排班資料表的唯一約束相同）；
+    不在 shift_ids 內的班別只記為上班日，不佔班別位元。
+    """
+
+    def __init__(self, year: int, month: int, shift_ids: Sequence[str] = tuple(SHIFT_TYPES),
+                 staff_ids: Iterable[str] = ()):
+        self.year = year
+        self.month = month
+        self.days = calendar.monthrange(year, month)[1]
+        self.shift_ids = list(shift_ids)
+        self.slots = len(self.shift_ids)
+        self._slot = {shift_id: s for s, shift_id in enumerate(self.shift_ids)}
+        # 班別 -> 每天該班別位元（與員工的「日 × 班別」集合取交集即為該班別的班）
+        self._columns = [sum(1 << (d * self.slots + s) for d in range(self.days)) for s in range(self.slots)]
+
+        self.staff_ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.assigned: List[int] = []     # 員工序號 -> 日 × 班別
+        self.worked: List[int] = []       # 員工序號 -> 上班日
+        self.leave: List[int] = []        # 員工序號 -> 請假日
+        self.all_staff = 0                # 全部員工序號
+        self._on_shift = [[0] * self.slots for _ in range(self.days)]  # [日][班別] -> 員工序號
+        self._on_day = [0] * self.days                                  # [日] -> 上班的員工序號
+        self._on_leave = [0] * self.days                                # [日] -> 請假的員工序號
+        for staff_id in staff_ids:
+            self.add_staff(staff_id)
+
+    # ------------------------------------------------------------------
+    # 建立
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_rows(cls, year: int, month: int, schedules: Iterable[dict], leaves: Iterable[dict] = (),
+                  shift_ids: Sequence[str] = tuple(SHIFT_TYPES),
+                  staff_ids: Iterable[str] = ()) -> 'MonthCalendar':
+        """由 schedules / leave_requests 資料列建立（只計 scheduled 的排班與傳入的請假）"""
+        month_calendar = cls(year, month, shift_ids, staff_ids)
+        for row in schedules:
+            if row['status'] == 'scheduled':
+                day = month_calendar.day_index(date.fromisoformat(row['schedule_date']))
+                if day is not None:
+                    month_calendar._set(month_calendar.add_staff(row['staff_id']), day, row['shift_type_id'])
+        for leave in leaves:
+            try:
+                start, end = date.fromisoformat(leave['start_date']), date.fromisoformat(leave['end_date'])
+            except ValueError:
+                continue
+            month_calendar.add_leave_range(leave['staff_id'], start, end)
+        return month_calendar
+
+    @classmethod
+    def from_schedules(cls, year: int, month: int, schedules: Iterable,
+                       leave_days: Optional[Dict[str, Iterable[date]]] = None,
+                       shift_ids: Sequence[str] = tuple(SHIFT_TYPES),
+                       staff_ids: Iterable[str] = ()) -> 'MonthCalendar':
+        """由規則檢查器的 Schedule 建立；leave_days 為 員工 ID -> 請假日期"""
+        month_calendar = cls(year, month, shift_ids, staff_ids)
+        for schedule in schedules:
+            if schedule.status == 'scheduled':
+                day = month_calendar.day_index(schedule.schedule_date)
+                if day is not None:
+                    month_calendar._set(month_calendar.add_staff(schedule.staff_id), day, schedule.shift_type)
+        for staff_id, days in (leave_days or {}).items():
+            for day in days:
+                month_calendar.add_leave(staff_id, day)
+        return month_calendar
+
+    def add_staff(self, staff_id: str) -> int:
+        """登錄員工，回傳員工序號"""
+        i = self._index.get(staff_id)
+        if i is None:
+            i = self._index[staff_id] = len(self.staff_ids)
+            self.staff_ids.append(staff_id)
+            self.assigned.append(0)
+            self.worked.append(0)
+            self.leave.append(0)
+            self.all_staff |= 1 << i
+        return i
+
+    def day_index(self, day: date) -> Optional[int]:
+        """日期在本月的位置（0 起算），不在本月時為 None"""
+        if day.year != self.year or day.month != self.month:
+            return None
+        return day.day - 1
+
+    # ------------------------------------------------------------------
+    # 異動
+    # ------------------------------------------------------------------
+
+    def assign(self, staff_id: str, day: date, shift_id: str):
+        """排班（同一天已有班時改為新班別）"""
+        d = self.day_index(day)
+        if d is None:
+            raise ValueError(f"{day} is not in {self.year}-{self.month:02d}")
+        i = self.add_staff(staff_id)
+        self._clear(i, d)
+        self._set(i, d, shift_id)
+
+    def unassign(self, staff_id: str, day: date):
+        i, d = self._index.get(staff_id), self.day_index(day)
+        if i is not None and d is not None:
+            self._clear(i, d)
+
+    def add_leave(self, staff_id: str, day: date):
+        d = self.day_index(day)
+        if d is not None:
+            i = self.add_staff(staff_id)
+            self.leave[i] |= 1 << d
+            self._on_leave[d] |= 1 << i
+
+    def add_leave_range(self, staff_id: str, start: date, end: date):
+        """請假期間中落在本月的日期"""
+        first = max(start, date(self.year, self.month, 1))
+        last = min(end, date(self.year, self.month, self.days))
+        day = first
+        while day <= last:
+            self.add_leave(staff_id, day)
+            day += timedelta(days=1)
+
+    def _set(self, i: int, d: int, shift_id: str):
+        if self.worked[i] >> d & 1:
+            return
+        self.worked[i] |= 1 << d
+        self._on_day[d] |= 1 << i
+        s = self._slot.get(shift_id)
+        if s is not None:
+            self.assigned[i] |= 1 << (d * self.slots + s)
+            self._on_shift[d][s] |= 1 << i
+
+    def _clear(self, i: int, d: int):
+        if not self.worked[i] >> d & 1:
+            return
+        self.worked[i] &= ~(1 << d)
+        self._on_day[d] &= ~(1 << i)
+        day_slots = ((1 << self.slots) - 1) << (d * self.slots)
+        for s in bit_positions((self.assigned[i] & day_slots) >> (d * self.slots)):
+            self._on_shift[d][s] &= ~(1 << i)
+        self.assigned[i] &= ~day_slots
+
+    # ------------------------------------------------------------------
+    # 單一員工
+    # ------------------------------------------------------------------
+
+    def work_days(self, staff_id: str) -> int:
+        i = self._index.get(staff_id)
+        return popcount(self.worked[i]) if i is not None else 0
+
+    def rest_days(self, staff_id: str) -> int:
+        """休息天數（與規則檢查器相同：當月天數減去上班日數）"""
+        return self.days - self.work_days(staff_id)
+
+    def leave_days(self, staff_id: str) -> int:
+        i = self._index.get(staff_id)
+        return popcount(self.leave[i]) if i is not None else 0
+
+    def shift_count(self, staff_id: str, shift_id: str) -> int:
+        """本月排了幾次該班別"""
+        i, s = self._index.get(staff_id), self._slot.get(shift_id)
+        return popcount(self.assigned[i] & self._columns[s]) if i is not None and s is not None else 0
+
+    def shift_on(self, staff_id: str, day: date) -> Optional[str]:
+        """當天的班別；未排班或班別不在 shift_ids 內時為 None"""
+        i, d = self._index.get(staff_id), self.day_index(day)
+        if i is None or d is None:
+            return None
+        day_bits = self.assigned[i] >> (d * self.slots) & ((1 << self.slots) - 1)
+        return self.shift_ids[day_bits.bit_length() - 1] if day_bits else None
+
+    def work_runs(self, staff_id: str) -> List[Tuple[date, date]]:
+        """連續上班區段的 (起始日, 結束日)"""
+        i = self._index.get(staff_id)
+        if i is None:
+            return []
+        return [(date(self.year, self.month, start + 1), date(self.year, self.month, start + length))
+                for start, length in runs(self.worked[i])]
+
+    def longest_run(self, staff_id: str) -> int:
+        i = self._index.get(staff_id)
+        return max((length for _, length in runs(self.worked[i])), default=0) if i is not None else 0
+
+    # ------------------------------------------------------------------
+    # 跨員工
+    # ------------------------------------------------------------------
+
+    def members(self, bits: int) -> List[str]:
+        """員工序號位元集合 -> 員工 ID"""
+        return [self.staff_ids[i] for i in bit_positions(bits)]
+
+    def on_shift(self, day: date, shift_id: str) -> int:
+        """當天該班別的員工序號位元集合"""
+        d, s = self.day_index(day), self._slot.get(shift_id)
+        return self._on_shift[d][s] if d is not None and s is not None else 0
+
+    def free(self, day: date) -> int:
+        """當天沒有排班也沒有請假的員工序號位元集合（一天只排一班，任何班別都可補）"""
+        d = self.day_index(day)
+        if d is None:
+            return 0
+        return self.all_staff & ~(self._on_day[d] | self._on_leave[d])
+
+    def on_leave(self, day: date) -> int:
+        d = self.day_index(day)
+        return self._on_leave[d] if d is not None else 0
+
+    def staff_on(self, day: date, shift_id: str) -> List[str]:
+        return self.members(self.on_shift(day, shift_id))
+
+    def free_staff(self, day: date) -> List[str]:
+        return self.members(self.free(day))
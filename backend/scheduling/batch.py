@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分區批次排班
+把全店一個月的排班問題依品牌或專櫃切成互不相交的分區，
+以多行程依分區大小由大到小排程求解，完成一個分區就回傳一個結果
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from scheduling.partition import PARTITION_KEYS, rules_for_brands
+from scheduling.roster import DEFAULT_TIME_BUDGET, RosterProblem, RosterResult, RosterSolver
+
+# 行程池的子行程由 initializer 取得全部分區（fork 時直接繼承，不必序列化）
+_worker_partitions: Dict[str, 'RosterPartition'] = {}
+
+
+@dataclass
+class RosterPartition:
+    """單一分區（品牌或專櫃）的排班問題"""
+    key: str
+    problem: RosterProblem
+
+    @property
+    def size(self) -> int:
+        """排程順序依據：員工數 × 天數"""
+        return len(self.problem.staff) * self.problem.days
+
+
+def partition_problem(problem: RosterProblem,
+                      partition_by: str = 'brand',
+                      store_of: Optional[Dict[str, str]] = None) -> List[RosterPartition]:
+    """
+    將整月排班問題切成互不相交的分區
+
+    人力分組不會跨品牌（或專櫃），每班人數等規則在分區內計算；
+    品牌專屬規則只套用到該品牌的分區。
+
+    Args:
+        partition_by: 'brand' 依員工所屬品牌，'store' 依 store_of 對照的專櫃
+        store_of: 員工 ID -> 專櫃 ID（partition_by='store' 時必填）
+
+    Returns:
+        依分區鍵排序的分區列表；不屬於任何專櫃的員工歸入鍵為 '' 的分區
+    """
+    if partition_by not in PARTITION_KEYS:
+        raise ValueError(f"Unknown partition key: {partition_by}")
+    if partition_by == 'store' and store_of is None:
+        raise ValueError("store_of is required when partitioning by store")
+
+    staff_by_key: Dict[str, list] = {}
+    key_of: Dict[str, str] = {}
+    for staff in problem.staff:
+        key = (staff.brand_id if partition_by == 'brand' else store_of.get(staff.id, '')) or ''
+        key_of[staff.id] = key
+        staff_by_key.setdefault(key, []).append(staff)
+
+    fixed: Dict[str, list] = {}
+    for assignment in problem.fixed:
+        key = key_of.get(assignment[0])
+        if key is not None:
+            fixed.setdefault(key, []).append(assignment)
+
+    partitions = []
+    for key in sorted(staff_by_key):
+        staff_list = staff_by_key[key]
+        staff_ids = {s.id for s in staff_list}
+        partitions.append(RosterPartition(key, RosterProblem(
+            year=problem.year,
+            month=problem.month,
+            staff=staff_list,
+            rules=rules_for_brands(problem.rules, (s.brand_id for s in staff_list)),
+            shift_hours=problem.shift_hours,
+            leave_days={i: days for i, days in problem.leave_days.items() if i in staff_ids},
+            fixed=fixed.get(key, []),
+            carry_in={i: run for i, run in problem.carry_in.items() if i in staff_ids},
+            demand=problem.demand,
+        )))
+    return partitions
+
+
+def _init_worker(partitions: Dict[str, RosterPartition]):
+    global _worker_partitions
+    _worker_partitions = partitions
+
+
+def _solve_partition(key: str, time_budget: float, seed: int) -> RosterResult:
+    return RosterSolver(_worker_partitions[key].problem, seed).solve(time_budget)
+
+
+def _solve_problem(problem: RosterProblem, time_budget: float, seed: int) -> RosterResult:
+    return RosterSolver(problem, seed).solve(time_budget)
+
+
+def solve_partitions(partitions: List[RosterPartition],
+                     time_budget: float = DEFAULT_TIME_BUDGET,
+                     seed: int = 0,
+                     max_workers: Optional[int] = None,
+                     cancelled: Optional[Callable[[], bool]] = None,
+                     executor: Optional[Executor] = None
+                     ) -> Iterator[Tuple[RosterPartition, RosterResult]]:
+    """
+    依大小由大到小求解各分區，依完成順序逐一產出結果
+
+    大的分區先送出，減少最後只剩單一大分區在跑的情況；
+    每個分區的結果只由自己的問題與 seed 決定，與行程數及完成先後無關。
+
+    Args:
+        time_budget: 每個分區的時間上限（秒）
+        max_workers: 行程數，預設為 CPU 核心數；1 且未提供 executor 時在本行程依序求解
+        cancelled: 回傳 True 時不再送出新的分區，已在執行的分區完成後停止
+        executor: 共用的行程池（伺服器使用，各分區的問題序列化送出）；未提供時建立暫時的
+            fork 行程池，只適合單一執行緒的程式
+    """
+    cancelled = cancelled or (lambda: False)
+    order = sorted(partitions, key=lambda p: (-p.size, p.key))
+    workers = min(max_workers or os.cpu_count() or 1, len(order))
+
+    if executor is not None:
+        yield from _solve_on(order, workers, cancelled,
+                             lambda p: executor.submit(_solve_problem, p.problem, time_budget, seed))
+        return
+
+    if workers <= 1:
+        for partition in order:
+            if cancelled():
+                return
+            yield partition, RosterSolver(partition.problem, seed).solve(time_budget)
+        return
+
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if fork else None)
+    by_key = {p.key: p for p in order}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(by_key,)) as pool:
+        yield from _solve_on(order, workers, cancelled,
+                             lambda p: pool.submit(_solve_partition, p.key, time_budget, seed))
+
+
+def _solve_on(order: List[RosterPartition], workers: int, cancelled: Callable[[], bool],
+              submit_one: Callable[[RosterPartition], Future]
+              ) -> Iterator[Tuple[RosterPartition, RosterResult]]:
+    """依 order 送出分區，最多 workers × 2 個同時在行程池中，依完成順序產出"""
+    pending = iter(order)
+    running = {}
+
+    def submit():
+        # 只保持每個行程一個分區在排隊，取消時不必等待大量已送出的分區
+        while len(running) < workers * 2 and not cancelled():
+            partition = next(pending, None)
+            if partition is None:
+                return
+            running[submit_one(partition)] = partition
+
+    try:
+        submit()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: running[f].key):
+                yield running.pop(future), future.result()
+            submit()
+    finally:
+        # 共用行程池不會隨之關閉，提前結束時取消尚未開始的分區
+        for future in running:
+            future.cancel()
+
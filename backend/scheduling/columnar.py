@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班欄式資料與向量化規則檢查器
+將排班轉為 NumPy 陣列後以整批運算檢查所有規則，供全櫃位月度檢查使用
+"""
+
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+
+from scheduling.validator import (
+    Schedule, Staff, SchedulingRule, Violation,
+    find_rule, _min_staff_violation, _rest_days_violation,
+    _working_hours_violation, _consecutive_days_violation, _duplicate_violation,
+)
+
+# date.toordinal() 與 numpy datetime64 (1970-01-01 起算) 的換算差
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class ScheduleMatrix:
+    """
+    排班欄式資料
+
+    每筆排班拆成平行陣列（員工索引、日期序數、班別代碼、時數、狀態），
+    另外建立已排班的 員工 × 日期 佔用矩陣。員工索引依 staff_list 順序編號，
+    不在 staff_list 中的員工接在後面。
+    """
+
+    def __init__(self, schedules: List[Schedule], staff_list: List[Staff]):
+        self.staff_ids: List[str] = []
+        self.staff_index: Dict[str, int] = {}
+        staff_index = self.staff_index
+        for staff in staff_list:
+            if staff.id not in staff_index:
+                staff_index[staff.id] = len(self.staff_ids)
+                self.staff_ids.append(staff.id)
+        self.known_staff_count = len(self.staff_ids)
+
+        self.shift_types: List[str] = []
+        shift_codes: Dict[str, int] = {}
+        self.statuses: List[str] = []
+        status_codes: Dict[str, int] = {}
+
+        count = len(schedules)
+        self.schedule_ids: List[str] = [''] * count
+        self.staff = np.empty(count, dtype=np.int64)
+        self.day = np.empty(count, dtype=np.int64)
+        self.shift = np.empty(count, dtype=np.int64)
+        self.duration = np.empty(count, dtype=np.int64)
+        self.status = np.empty(count, dtype=np.int64)
+
+        # 唯一需要逐筆存取屬性的地方，之後的檢查都是陣列運算
+        for i, schedule in enumerate(schedules):
+            self.schedule_ids[i] = schedule.id
+
+            index = staff_index.get(schedule.staff_id)
+            if index is None:
+                index = staff_index[schedule.staff_id] = len(self.staff_ids)
+                self.staff_ids.append(schedule.staff_id)
+            self.staff[i] = index
+
+            code = shift_codes.get(schedule.shift_type)
+            if code is None:
+                code = shift_codes[schedule.shift_type] = len(self.shift_types)
+                self.shift_types.append(schedule.shift_type)
+            self.shift[i] = code
+
+            code = status_codes.get(schedule.status)
+            if code is None:
+                code = status_codes[schedule.status] = len(self.statuses)
+                self.statuses.append(schedule.status)
+            self.status[i] = code
+
+            self.day[i] = schedule.schedule_date.toordinal()
+            self.duration[i] = schedule.duration_hours
+
+        scheduled_code = status_codes.get('scheduled', -1)
+        self.scheduled = self.status == scheduled_code
+
+        self.first_day = int(self.day.min()) if count else 0
+        self.day_count = int(self.day.max()) - self.first_day + 1 if count else 0
+
+        # 已排班的 員工 × 日期 佔用矩陣
+        self.occupancy = np.zeros((len(self.staff_ids), self.day_count), dtype=bool)
+        self.occupancy[self.staff[self.scheduled], self.day[self.scheduled] - self.first_day] = True
+
+    def __len__(self) -> int:
+        return len(self.schedule_ids)
+
+    def month_codes(self) -> np.ndarray:
+        """每筆排班的月份代碼（1970 年 1 月起算的月數）"""
+        return (self.day - _EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def _month_length(month_codes: np.ndarray) -> np.ndarray:
+    """月份代碼對應的當月天數"""
+    first = month_codes.astype('datetime64[M]').astype('datetime64[D]')
+    following = (month_codes + 1).astype('datetime64[M]').astype('datetime64[D]')
+    return (following - first).astype(np.int64)
+
+
+def _year_month(month_code: int):
+    return 1970 + month_code // 12, month_code % 12 + 1
+
+
+class VectorizedScheduleValidator:
+    """
+    向量化排班規則檢查器
+
+    與 ScheduleValidator 介面相同，輸出的違規列表（含順序）也相同。
+    假設 staff_list 中的員工 ID 不重複；不支援跨批次的連續工作追蹤 (run_tracker)。
+    """
+
+    def __init__(self):
+        self.violations: List[Violation] = []
+
+    def validate_schedule(self,
+                          schedules: List[Schedule],
+                          staff_list: List[Staff],
+                          rules: List[SchedulingRule]) -> List[Violation]:
+        """檢查排班是否符合所有規則，回傳違規列表"""
+        return self.validate_matrix(ScheduleMatrix(schedules, staff_list), staff_list, rules)
+
+    def validate_matrix(self,
+                        matrix: ScheduleMatrix,
+                        staff_list: List[Staff],
+                        rules: List[SchedulingRule]) -> List[Violation]:
+        """以已建立的欄式資料檢查所有規則"""
+        self.violations = []
+        if not len(matrix):
+            return self.violations
+
+        # 員工索引 -> 員工資料（staff_list 中第一次出現者）
+        staff_by_index: Dict[int, Staff] = {}
+        for staff in staff_list:
+            staff_by_index.setdefault(matrix.staff_index[staff.id], staff)
+
+        self._check_min_staff_per_shift(matrix, rules)
+        self._check_monthly_rules(matrix, staff_by_index, rules)
+        self._check_consecutive_working_days(matrix, staff_by_index, rules)
+        self._check_duplicate_schedule(matrix)
+
+        return self.violations
+
+    def _check_min_staff_per_shift(self, matrix: ScheduleMatrix, rules: List[SchedulingRule]):
+        """檢查每班最少人數規則：以 bincount 計算每個 (日期, 班別) 的不重複人數"""
+        min_staff_rule = find_rule(rules, 'min_staff_per_shift')
+        if not min_staff_rule:
+            return
+
+        rows = np.flatnonzero(matrix.scheduled)
+        if not rows.size:
+            return
+
+        group_key = (matrix.day[rows] - matrix.first_day) * len(matrix.shift_types) + matrix.shift[rows]
+        _, first_row, group = np.unique(group_key, return_index=True, return_inverse=True)
+        group = group.ravel()
+
+        # 同一員工在同一班只算一次
+        pair_key = group * len(matrix.staff_ids) + matrix.staff[rows]
+        unique_pairs = np.unique(pair_key)
+        staff_count = np.bincount(unique_pairs // len(matrix.staff_ids), minlength=first_row.size)
+
+        violating = np.flatnonzero(staff_count < min_staff_rule.rule_value)
+        # 依各班組第一次出現的順序輸出
+        for g in violating[np.argsort(first_row[violating], kind='stable')]:
+            row = rows[first_row[g]]
+            self.violations.append(_min_staff_violation(
+                min_staff_rule,
+                matrix.schedule_ids[row],
+                date.fromordinal(int(matrix.day[row])),
+                matrix.shift_types[matrix.shift[row]],
+                int(staff_count[g])
+            ))
+
+    def _check_monthly_rules(self, matrix: ScheduleMatrix, staff_by_index: Dict[int, Staff],
+                             rules: List[SchedulingRule]):
+        """檢查每月最少休息天數與最多工作時數：以 (員工, 月份) 分組加總"""
+        rest_days_rule = find_rule(rules, 'min_rest_days')
+        max_hours_rule = find_rule(rules, 'max_monthly_hours')
+        if not rest_days_rule and not max_hours_rule:
+            return
+
+        rows = np.flatnonzero(matrix.scheduled)
+        if not rows.size:
+            return
+
+        months = matrix.month_codes()[rows]
+        first_month = int(months.min())
+        month_span = int(months.max()) - first_month + 1
+        staff = matrix.staff[rows]
+
+        group_key = staff * month_span + (months - first_month)
+        _, first_row, group = np.unique(group_key, return_index=True, return_inverse=True)
+        group = group.ravel()
+        group_staff = staff[first_row]
+        group_month = months[first_row]
+
+        # 依 staff_list 順序，再依各月份第一次出現的順序輸出
+        order = np.lexsort((first_row, group_staff))
+        known = group_staff[order] < matrix.known_staff_count
+        order = order[known]
+
+        if rest_days_rule:
+            day_key = group * matrix.day_count + (matrix.day[rows] - matrix.first_day)
+            work_days = np.bincount(np.unique(day_key) // matrix.day_count, minlength=first_row.size)
+            rest_days = _month_length(group_month) - work_days
+            min_rest = np.array(
+                [staff_by_index[i].min_rest_days_per_month if i in staff_by_index else 0
+                 for i in range(matrix.known_staff_count)] + [0],
+                dtype=np.int64
+            )
+            thresholds = min_rest[np.minimum(group_staff, matrix.known_staff_count)]
+            for g in order[(rest_days < thresholds)[order]]:
+                year, month = _year_month(int(group_month[g]))
+                self.violations.append(_rest_days_violation(
+                    rest_days_rule, staff_by_index[int(group_staff[g])], year, month, int(rest_days[g])
+                ))
+
+        if max_hours_rule:
+            total_hours = np.bincount(group, weights=matrix.duration[rows], minlength=first_row.size)
+            total_hours = np.rint(total_hours).astype(np.int64)
+            for g in order[(total_hours > max_hours_rule.rule_value)[order]]:
+                year, month = _year_month(int(group_month[g]))
+                self.violations.append(_working_hours_violation(
+                    max_hours_rule, staff_by_index[int(group_staff[g])], year, month, int(total_hours[g])
+                ))
+
+    def _check_consecutive_working_days(self, matrix: ScheduleMatrix, staff_by_index: Dict[int, Staff],
+                                        rules: List[SchedulingRule]):
+        """檢查連續工作天數限制：在佔用矩陣上做 run-length，每個超限區段回報一次"""
+        consecutive_rule = find_rule(rules, 'max_consecutive_days')
+        if not consecutive_rule:
+            return
+
+        occupancy = matrix.occupancy[:matrix.known_staff_count].astype(np.int8)
+        padded = np.pad(occupancy, ((0, 0), (1, 1)))
+        edges = np.diff(padded, axis=1)
+        # 依列優先順序取出，起點與終點會逐一對應（先員工、再日期）
+        start_rows, start_days = np.nonzero(edges == 1)
+        _, end_days = np.nonzero(edges == -1)
+        lengths = end_days - start_days
+
+        for g in np.flatnonzero(lengths > consecutive_rule.rule_value):
+            staff = staff_by_index.get(int(start_rows[g]))
+            if staff is None:
+                continue
+            self.violations.append(_consecutive_days_violation(
+                consecutive_rule,
+                staff,
+                date.fromordinal(matrix.first_day + int(start_days[g])),
+                date.fromordinal(matrix.first_day + int(end_days[g]) - 1)
+            ))
+
+    def _check_duplicate_schedule(self, matrix: ScheduleMatrix):
+        """檢查重複排班：排序 (員工, 日期) 鍵後比較相鄰差值"""
+        key = matrix.staff * matrix.day_count + (matrix.day - matrix.first_day)
+        order = np.argsort(key, kind='stable')
+        repeated = order[1:][np.diff(key[order]) == 0]
+        for row in np.sort(repeated):
+            self.violations.append(_duplicate_violation(
+                matrix.schedule_ids[row], date.fromordinal(int(matrix.day[row]))
+            ))
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多起點平行排班搜尋
+以不同 seed 在多個行程同時執行貪婪建構 + 區域搜尋，行程間以具名共享記憶體中的
+單一數值交換目前最佳的目標值，目標值下界已比最佳值差的起點提前放棄；
+最後依 (目標值, seed 順序) 挑出最佳結果，與各起點完成的先後無關
+"""
+
+import os
+import math
+import time
+import struct
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence
+
+from scheduling.roster import DEFAULT_TIME_BUDGET, RosterProblem, RosterResult, RosterSolver
+
+DEFAULT_STARTS = 4
+
+# 行程池的子行程由 initializer 取得問題（fork 時直接繼承，不必序列化）
+_worker_problem: Optional[RosterProblem] = None
+
+
+class Incumbent:
+    """本行程內依序執行的起點共用的最佳目標值"""
+
+    def __init__(self):
+        self.value = math.inf
+
+    def offer(self, objective: float):
+        """目標值比目前的最佳值好時寫入"""
+        if objective < self.value:
+            self.value = objective
+
+
+class SharedIncumbent:
+    """
+    跨行程共用的最佳目標值（具名共享記憶體中的一個 double）
+
+    以名稱序列化，可傳給任何啟動方式建立的行程池（包括長駐的共用行程池）。
+    寫入不加鎖：值一定是某個起點達到過的目標值，同時寫入時最多偏高，
+    只會讓起點少放棄，不會讓可能勝出的起點被放棄。
+    """
+
+    _FORMAT = 'd'
+
+    def __init__(self, name: Optional[str] = None):
+        self._owner = name is None
+        if self._owner:
+            self._memory = shared_memory.SharedMemory(create=True, size=struct.calcsize(self._FORMAT))
+            struct.pack_into(self._FORMAT, self._memory.buf, 0, math.inf)
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+
+    def __getstate__(self):
+        return self._memory.name
+
+    def __setstate__(self, name: str):
+        self.__init__(name)
+
+    @property
+    def value(self) -> float:
+        return struct.unpack_from(self._FORMAT, self._memory.buf, 0)[0]
+
+    def offer(self, objective: float):
+        if objective < self.value:
+            struct.pack_into(self._FORMAT, self._memory.buf, 0, objective)
+
+    def close(self):
+        """關閉對應；建立者另外釋放共享記憶體"""
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+@dataclass
+class StartSummary:
+    """單一起點的搜尋結果摘要"""
+    seed: int
+    objective: float
+    missing: int
+    iterations: int
+    elapsed: float
+    abandoned: bool
+
+
+@dataclass
+class MultiStartResult:
+    """多起點搜尋結果"""
+    best: RosterResult
+    seed: int                                                          # 最佳結果的 seed
+    starts: List[StartSummary] = field(default_factory=list)          # 依 seeds 順序
+    workers: int = 1
+    elapsed: float = 0.0
+
+    def summary(self) -> dict:
+        completed = [s.objective for s in self.starts if not s.abandoned]
+        return {
+            "starts": len(self.starts),
+            "workers": self.workers,
+            "best_seed": self.seed,
+            "best_objective": self.best.objective,
+            "mean_objective": round(sum(completed) / len(completed), 3) if completed else None,
+            "abandoned": sum(1 for s in self.starts if s.abandoned),
+            "elapsed_ms": round(self.elapsed * 1000, 2),
+        }
+
+
+def _init_worker(problem: RosterProblem):
+    global _worker_problem
+    _worker_problem = problem
+
+
+def _solve_start(seed: int, time_budget: float, incumbent: SharedIncumbent) -> RosterResult:
+    try:
+        return RosterSolver(_worker_problem, seed).solve(time_budget, incumbent)
+    finally:
+        incumbent.close()
+
+
+def _solve_problem(problem: RosterProblem, seed: int, time_budget: float,
+                   incumbent: SharedIncumbent) -> RosterResult:
+    try:
+        return RosterSolver(problem, seed).solve(time_budget, incumbent)
+    finally:
+        incumbent.close()
+
+
+def _pick_best(results: List[RosterResult]) -> int:
+    """目標值最小者；相同時取 seeds 中較前面的，已放棄的起點只在全部放棄時才列入"""
+    candidates = [k for k, result in enumerate(results) if not result.abandoned] or range(len(results))
+    return min(candidates, key=lambda k: (results[k].objective, k))
+
+
+def generate_roster_multistart(problem: RosterProblem,
+                               seeds: Optional[Sequence[int]] = None,
+                               starts: int = DEFAULT_STARTS,
+                               time_budget: float = DEFAULT_TIME_BUDGET,
+                               max_workers: Optional[int] = None,
+                               executor: Optional[Executor] = None) -> MultiStartResult:
+    """
+    多起點產生一個月的排班
+
+    各起點在時間預算內收斂（通常如此）時，相同的 seeds 得到相同的最佳結果，與行程數無關；
+    共用最佳值只會讓目標值下界已比最佳值差（不可能勝出）的起點提早結束。
+
+    Args:
+        problem: 員工、規則、班別時數、請假與既有排班
+        seeds: 各起點的亂數種子，預設為 0..starts-1
+        starts: 未指定 seeds 時的起點數
+        time_budget: 每個起點的時間上限（秒）
+        max_workers: 行程數，預設為 CPU 核心數；1 且未提供 executor 時在本行程依序執行
+        executor: 共用的行程池（伺服器使用，問題序列化送出）；未提供時建立暫時的 fork 行程池，
+            只適合單一執行緒的程式
+
+    Returns:
+        最佳結果與各起點的摘要
+    """
+    seeds = list(seeds) if seeds is not None else list(range(starts))
+    if not seeds:
+        raise ValueError("At least one seed is required")
+    workers = min(max_workers or os.cpu_count() or 1, len(seeds))
+    started = time.perf_counter()
+
+    if workers <= 1 and executor is None:
+        incumbent = Incumbent()
+        results = [RosterSolver(problem, seed).solve(time_budget, incumbent) for seed in seeds]
+    else:
+        shared = SharedIncumbent()
+        try:
+            if executor is not None:
+                futures = [executor.submit(_solve_problem, problem, seed, time_budget, shared) for seed in seeds]
+                results = [future.result() for future in futures]
+            else:
+                fork = 'fork' in multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if fork else None)
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                         initializer=_init_worker, initargs=(problem,)) as pool:
+                    futures = [pool.submit(_solve_start, seed, time_budget, shared) for seed in seeds]
+                    results = [future.result() for future in futures]
+        finally:
+            shared.close()
+
+    best = _pick_best(results)
+    return MultiStartResult(
+        best=results[best],
+        seed=seeds[best],
+        starts=[
+            StartSummary(seed, result.objective, sum(result.shortfall.values()),
+                         result.iterations, result.elapsed, result.abandoned)
+            for seed, result in zip(seeds, results)
+        ],
+        workers=workers,
+        elapsed=time.perf_counter() - started,
+    )
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分區平行排班檢查
+依品牌或專櫃切分排班、員工與規則，以多行程平行檢查後依固定順序合併結果
+"""
+
+import os
+import itertools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from scheduling.validator import Schedule, Staff, SchedulingRule, Violation, create_validator
+
+PARTITION_KEYS = ('brand', 'store')
+
+# 分區數或排班筆數低於此值時直接在本行程檢查，避免行程啟動成本
+MIN_PARALLEL_SCHEDULES = 5000
+
+# 以 fork 建立的子行程直接繼承分區資料，不必逐筆序列化送出
+_inherited_shards: Dict[int, List['ValidationShard']] = {}
+_inherited_tokens = itertools.count()
+
+
+@dataclass
+class ValidationShard:
+    """單一分區的檢查資料"""
+    key: str
+    schedules: List[Schedule] = field(default_factory=list)
+    staff_list: List[Staff] = field(default_factory=list)
+    rules: List[SchedulingRule] = field(default_factory=list)
+
+
+def store_assignments(stores: Iterable[dict]) -> Dict[str, str]:
+    """
+    由 stores 資料表的列建立 員工 ID -> 專櫃 ID 對照
+
+    Args:
+        stores: 含 id 與 staff (員工 ID 陣列) 欄位的專櫃資料
+    """
+    assignments = {}
+    for store in stores:
+        for staff_id in store.get('staff') or []:
+            assignments.setdefault(staff_id, store['id'])
+    return assignments
+
+
+def rules_for_brands(rules: List[SchedulingRule], brand_ids: Iterable[str]) -> List[SchedulingRule]:
+    """適用於指定品牌的規則，品牌專屬規則優先於全店通用規則"""
+    brand_ids = set(brand_ids)
+    specific = [r for r in rules if r.brand_id is not None and r.brand_id in brand_ids]
+    general = [r for r in rules if r.brand_id is None]
+    return specific + general
+
+
+def partition(schedules: List[Schedule],
+              staff_list: List[Staff],
+              rules: List[SchedulingRule],
+              partition_by: str = 'brand',
+              store_of: Optional[Dict[str, str]] = None) -> List[ValidationShard]:
+    """
+    將檢查資料切成互不相交的分區
+
+    Args:
+        partition_by: 'brand' 依員工所屬品牌，'store' 依 store_of 對照的專櫃
+        store_of: 員工 ID -> 專櫃 ID（partition_by='store' 時必填）
+
+    Returns:
+        依分區鍵排序的分區列表；不屬於任何分區的員工歸入鍵為 '' 的分區
+    """
+    if partition_by not in PARTITION_KEYS:
+        raise ValueError(f"Unknown partition key: {partition_by}")
+    if partition_by == 'store' and store_of is None:
+        raise ValueError("store_of is required when partitioning by store")
+
+    shard_of_staff: Dict[str, str] = {}
+    shards: Dict[str, ValidationShard] = {}
+    for staff in staff_list:
+        key = staff.brand_id if partition_by == 'brand' else store_of.get(staff.id, '')
+        key = key or ''
+        shard_of_staff.setdefault(staff.id, key)
+        shards.setdefault(key, ValidationShard(key)).staff_list.append(staff)
+
+    for schedule in schedules:
+        key = shard_of_staff.get(schedule.staff_id, '')
+        shards.setdefault(key, ValidationShard(key)).schedules.append(schedule)
+
+    for shard in shards.values():
+        shard.rules = rules_for_brands(rules, (s.brand_id for s in shard.staff_list))
+
+    return [shards[key] for key in sorted(shards)]
+
+
+def _validate_shard(shard: ValidationShard, engine: str) -> List[Violation]:
+    return create_validator(engine).validate_schedule(shard.schedules, shard.staff_list, shard.rules)
+
+
+def _validate_inherited_shard(token: int, index: int, engine: str) -> List[Violation]:
+    return _validate_shard(_inherited_shards[token][index], engine)
+
+
+def _largest_first(shards: List[ValidationShard]) -> List[int]:
+    """大的分區先送出，減少最後只剩單一大分區在跑的情況"""
+    return sorted(range(len(shards)), key=lambda i: -len(shards[i].schedules))
+
+
+def _run_on_executor(executor: Executor, shards: List[ValidationShard], engine: str) -> List[List[Violation]]:
+    """以共用的 Executor 檢查各分區（分區資料序列化送出），回傳依分區順序排列的結果"""
+    futures = {i: executor.submit(_validate_shard, shards[i], engine) for i in _largest_first(shards)}
+    return [futures[i].result() for i in range(len(shards))]
+
+
+def _run_in_pool(shards: List[ValidationShard], workers: int, engine: str) -> List[List[Violation]]:
+    """
+    以暫時的行程池檢查各分區，回傳依分區順序排列的結果
+
+    只適合單一執行緒的程式（例如命令列工具）；伺服器應傳入共用的 executor，
+    不要從多執行緒的行程 fork
+    """
+    order = _largest_first(shards)
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork') if fork else None
+
+    token = next(_inherited_tokens)
+    if fork:
+        _inherited_shards[token] = shards
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=context) as pool:
+            if fork:
+                futures = [(i, pool.submit(_validate_inherited_shard, token, i, engine)) for i in order]
+            else:
+                futures = [(i, pool.submit(_validate_shard, shards[i], engine)) for i in order]
+            by_index = {i: future.result() for i, future in futures}
+    finally:
+        _inherited_shards.pop(token, None)
+    return [by_index[i] for i in range(len(shards))]
+
+
+def validate_partitioned(schedules: List[Schedule],
+                         staff_list: List[Staff],
+                         rules: List[SchedulingRule],
+                         partition_by: str = 'brand',
+                         store_of: Optional[Dict[str, str]] = None,
+                         max_workers: Optional[int] = None,
+                         engine: str = 'python',
+                         executor: Optional[Executor] = None) -> List[Violation]:
+    """
+    分區平行檢查排班
+
+    人力分組不會跨品牌（或專櫃），因此每班人數等規則在分區內檢查；
+    規則依 brand_id 套用到對應分區。結果依分區鍵排序後合併，
+    與各分區完成的先後以及是否平行無關（max_workers=1 時在本行程依序檢查，結果相同）。
+
+    Args:
+        schedules: 排班列表
+        staff_list: 員工列表
+        rules: 排班規則列表（brand_id 為 None 者適用所有分區）
+        partition_by: 'brand' 或 'store'
+        store_of: 員工 ID -> 專櫃 ID
+        max_workers: 行程數，預設為 CPU 核心數
+        engine: 各分區使用的檢查引擎
+        executor: 共用的 Executor（伺服器使用）；未提供時建立暫時的行程池
+
+    Returns:
+        違規列表
+    """
+    shards = partition(schedules, staff_list, rules, partition_by, store_of)
+    workers = max_workers or os.cpu_count() or 1
+
+    if executor is None and (workers == 1 or len(shards) < 2 or len(schedules) < MIN_PARALLEL_SCHEDULES):
+        results = [_validate_shard(shard, engine) for shard in shards]
+    elif executor is not None:
+        results = _run_on_executor(executor, shards, engine)
+    else:
+        results = _run_in_pool(shards, workers, engine)
+
+    return [violation for shard_violations in results for violation in shard_violations]
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自動排班引擎
+依員工可用時數、每月最少休息天數、已核准請假與排班規則
+(min_staff_per_shift / min_rest_days / max_monthly_hours / max_consecutive_days)
+產生一個月的排班：先以貪婪法逐日補滿各班人數，再於時間預算內以區域搜尋
+補足缺額並平均分配工時
+"""
+
+import calendar
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Set, Tuple
+
+from scheduling.availability import MonthCalendar, bit_positions, run_below, run_through
+from scheduling.shifts import DEFAULT_SHIFT_HOURS
+from scheduling.validator import Schedule, SchedulingRule, Staff, find_rule
+
+DEFAULT_TIME_BUDGET = 1.5  # 秒
+DEFAULT_REPAIR_BUDGET = 0.3  # 秒；核准請假後局部重排
+# 目標函數中每缺一人的權重，遠大於工時分配不均的成本
+SHORTFALL_WEIGHT = 1000
+# 連續多少次嘗試都沒有改善就提前結束
+MAX_STALLED_MOVES = 2000
+
+# (員工 ID, 日期, 班別 ID)
+Assignment = Tuple[str, date, str]
+
+
+@dataclass
+class RosterProblem:
+    """一個月份、一組員工（通常是同一個品牌或專櫃）的排班需求"""
+    year: int
+    month: int
+    staff: List[Staff]
+    rules: List[SchedulingRule]
+    shift_hours: Dict[str, int]                                        # 班別 ID -> 時數
+    leave_days: Dict[str, Set[date]] = field(default_factory=dict)     # 員工 ID -> 已核准請假日期
+    fixed: List[Assignment] = field(default_factory=list)              # 既有排班，排班時不變動
+    carry_in: Dict[str, int] = field(default_factory=dict)             # 員工 ID -> 上月底已連續工作天數
+    demand: Dict[Tuple[date, str], int] = field(default_factory=dict)  # 個別班的需求人數，預設依 min_staff_per_shift
+
+    @property
+    def days(self) -> int:
+        return calendar.monthrange(self.year, self.month)[1]
+
+
+@dataclass
+class RosterResult:
+    """排班結果"""
+    assignments: List[Assignment]                                      # 新排的班（不含 fixed）
+    shortfall: Dict[Tuple[date, str], int]                             # 仍然缺人的班 -> 缺額
+    hours: Dict[str, int]                                              # 員工 ID -> 當月總工時（含 fixed）
+    objective: float
+    iterations: int
+    elapsed: float
+    abandoned: bool = False                                            # 多起點搜尋中落後而提前放棄
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.shortfall
+
+    def to_schedules(self, shift_hours: Dict[str, int], id_prefix: str = 'roster') -> List[Schedule]:
+        """轉為規則檢查器使用的排班"""
+        return [
+            Schedule(id=f"{id_prefix}_{n}", staff_id=staff_id, shift_type=shift_id, schedule_date=day,
+                     duration_hours=shift_hours[shift_id])
+            for n, (staff_id, day, shift_id) in enumerate(self.assignments)
+        ]
+
+    def to_calendar(self, problem: 'RosterProblem') -> MonthCalendar:
+        """新排的班、既有排班（problem.fixed）與請假的位元集合月曆"""
+        month_calendar = MonthCalendar(problem.year, problem.month, list(problem.shift_hours),
+                                       (s.id for s in problem.staff))
+        for staff_id, day, shift_id in list(problem.fixed) + self.assignments:
+            month_calendar.assign(staff_id, day, shift_id)
+        for staff_id, days in problem.leave_days.items():
+            for day in days:
+                month_calendar.add_leave(staff_id, day)
+        return month_calendar
+
+
+@dataclass
+class RosterRepair:
+    """局部重排結果：相對於既有排班的最小異動"""
+    removed: List[Assignment]                                          # 刪除的班（含與請假衝突的班）
+    added: List[Assignment]                                            # 新增的班
+    shortfall: Dict[Tuple[date, str], int]                             # 重排後仍缺人的班
+    iterations: int
+    elapsed: float
+
+    @property
+    def changes(self) -> int:
+        return len(self.removed) + len(self.added)
+
+
+class RosterSolver:
+    """
+    貪婪建構 + 區域搜尋
+
+    員工層級的限制（請假、一天一班、工時上限、休息天數、連續工作天數）在每一步都維持成立，
+    只有各班人數允許不足；目標函數為 缺額 × SHORTFALL_WEIGHT + Σ(工時 / 可用時數)² × 100。
+    相同的問題與 seed 會得到相同的結果（時間預算內完成時）。
+    """
+
+    def __init__(self, problem: RosterProblem, seed: int = 0):
+        self.problem = problem
+        self.rng = random.Random(seed)
+        self.day_count = days = problem.days
+        self.dates = [date(problem.year, problem.month, d + 1) for d in range(days)]
+        self.shift_ids = list(problem.shift_hours)
+        self.shift_hours = [problem.shift_hours[s] for s in self.shift_ids]
+        self.staff = [s for s in problem.staff if s.is_active]
+        self.staff_ids = [s.id for s in self.staff]
+        staff_count = len(self.staff)
+
+        rules = problem.rules
+        min_staff = find_rule(rules, 'min_staff_per_shift')
+        max_hours = find_rule(rules, 'max_monthly_hours')
+        rest_rule = find_rule(rules, 'min_rest_days')
+        consecutive = find_rule(rules, 'max_consecutive_days')
+
+        default_need = min_staff.rule_value if min_staff else 1
+        self.need = [[problem.demand.get((day, shift_id), default_need) for shift_id in self.shift_ids]
+                     for day in self.dates]
+        self.cap = [min(s.monthly_available_hours, max_hours.rule_value) if max_hours else s.monthly_available_hours
+                    for s in self.staff]
+        self.max_days = [days - s.min_rest_days_per_month if rest_rule else days for s in self.staff]
+        self.max_run = consecutive.rule_value if consecutive else None
+        self.carry_in = [problem.carry_in.get(s.id, 0) for s in self.staff]
+
+        self._staff_index = index = {staff_id: i for i, staff_id in enumerate(self.staff_ids)}
+        self._day_index = day_index = {day: d for d, day in enumerate(self.dates)}
+        self._shift_index = shift_index = {shift_id: s for s, shift_id in enumerate(self.shift_ids)}
+        # 每位員工的請假日與上班日位元集合（第 d 位元為第 d 天）
+        self.leave_bits = [0] * staff_count
+        for staff_id, leave_days in problem.leave_days.items():
+            i = index.get(staff_id)
+            if i is None:
+                continue
+            for day in leave_days:
+                d = day_index.get(day)
+                if d is not None:
+                    self.leave_bits[i] |= 1 << d
+        # 上班日位元集合前面接上上個月底已連續工作的天數（carry_in 個 1），
+        # 第 d 天在第 d + carry_in 位元，連續工作天數可直接由位元運算求出
+        self.busy = [(1 << c) - 1 for c in self.carry_in]
+        # 每天不能再排班（已上班或請假）的員工位元集合（第 i 位元為第 i 位員工）
+        self.all_staff = (1 << staff_count) - 1
+        self.unavailable = [0] * days
+        for i, bits in enumerate(self.leave_bits):
+            for d in bit_positions(bits):
+                self.unavailable[d] |= 1 << i
+
+        # 目前狀態：work[i][d] 為班別索引或 -1
+        self.work = [[-1] * days for _ in range(staff_count)]
+        self.fixed = [[False] * days for _ in range(staff_count)]
+        self.hours = [0] * staff_count
+        self.work_days = [0] * staff_count
+        self.crew: List[List[List[int]]] = [[[] for _ in self.shift_ids] for _ in range(days)]
+        for staff_id, day, shift_id in problem.fixed:
+            i, d, s = index.get(staff_id), day_index.get(day), shift_index.get(shift_id)
+            if i is None or d is None or self.work[i][d] != -1:
+                continue
+            if s is None:
+                # 未列入排班的班別：只計入該員工的工時與工作日
+                self.work[i][d] = len(self.shift_ids)
+                self.hours[i] += problem.shift_hours.get(shift_id, DEFAULT_SHIFT_HOURS)
+                self.work_days[i] += 1
+                self.busy[i] |= 1 << (d + self.carry_in[i])
+                self.unavailable[d] |= 1 << i
+            else:
+                self._assign(i, d, s)
+            self.fixed[i][d] = True
+        self.iterations = 0
+        self.abandoned = False
+
+    # ------------------------------------------------------------------
+    # 狀態與限制
+    # ------------------------------------------------------------------
+
+    def _assign(self, i: int, d: int, s: int):
+        self.work[i][d] = s
+        self.hours[i] += self.shift_hours[s]
+        self.work_days[i] += 1
+        self.busy[i] |= 1 << (d + self.carry_in[i])
+        self.unavailable[d] |= 1 << i
+        self.crew[d][s].append(i)
+
+    def _unassign(self, i: int, d: int):
+        s = self.work[i][d]
+        self.work[i][d] = -1
+        self.hours[i] -= self.shift_hours[s]
+        self.work_days[i] -= 1
+        self.busy[i] &= ~(1 << (d + self.carry_in[i]))
+        if not self.leave_bits[i] >> d & 1:
+            self.unavailable[d] &= ~(1 << i)
+        self.crew[d][s].remove(i)
+
+    def can_assign(self, i: int, d: int, s: int) -> bool:
+        return not self.unavailable[d] >> i & 1 and self._fits(i, d, s)
+
+    def _fits(self, i: int, d: int, s: int) -> bool:
+        """當天有空的員工是否還能排入 (d, s)：工時、休息天數與連續工作天數"""
+        if self.hours[i] + self.shift_hours[s] > self.cap[i] or self.work_days[i] >= self.max_days[i]:
+            return False
+        # 若 d 當天上班，包含 d 的連續工作天數
+        return self.max_run is None or run_through(self.busy[i], d + self.carry_in[i]) <= self.max_run
+
+    def shortfall(self, d: int, s: int) -> int:
+        return max(0, self.need[d][s] - len(self.crew[d][s]))
+
+    def load(self, i: int) -> float:
+        return self.hours[i] / self.cap[i] if self.cap[i] > 0 else 1.0
+
+    def objective(self) -> float:
+        missing = sum(self.shortfall(d, s) for d in range(self.day_count) for s in range(len(self.shift_ids)))
+        return missing * SHORTFALL_WEIGHT + sum(self.load(i) ** 2 for i in range(len(self.staff))) * 100
+
+    def lower_bound(self) -> float:
+        """
+        之後的搜尋所能達到的目標值下界
+
+        缺額只能靠補人減少：每補一人全體工作日加一、工時至少加最短班別時數（平均工時不改變總和），
+        因此剩餘的工作日與工時容量限制了還能補上的人數；工時總和只增不減，
+        且 Σ(工時 / 可用時數)² ≥ (Σ工時)² / Σ可用時數²
+        """
+        missing = sum(self.shortfall(d, s) for d in range(self.day_count) for s in range(len(self.shift_ids)))
+        days_left = sum(max(0, m - w) for m, w in zip(self.max_days, self.work_days))
+        hours_left = sum(max(0, c - h) for c, h in zip(self.cap, self.hours))
+        fills = min(days_left, hours_left // min(self.shift_hours)) if self.shift_hours else 0
+        capped = [(c, h) for c, h in zip(self.cap, self.hours) if c > 0]
+        load = (sum(h for _, h in capped) ** 2 / sum(c * c for c, _ in capped) if capped else 0.0)
+        load += len(self.cap) - len(capped)
+        return max(0, missing - fills) * SHORTFALL_WEIGHT + load * 100
+
+    def _candidates(self, d: int, s: int) -> List[int]:
+        """可排入 (d, s) 的員工，工時比例低、目前連續工作天數短者優先"""
+        free = self.all_staff & ~self.unavailable[d]
+        candidates = [i for i in bit_positions(free) if self._fits(i, d, s)]
+        # 目前連續工作天數：d 之前的連續上班日（含上個月底）
+        candidates.sort(key=lambda i: (self.load(i) + self.shift_hours[s] / max(self.cap[i], 1),
+                                       run_below(self.busy[i], d + self.carry_in[i]), self.rng.random()))
+        return candidates
+
+    # ------------------------------------------------------------------
+    # 貪婪建構
+    # ------------------------------------------------------------------
+
+    def construct(self):
+        """逐日補滿各班人數；同一天先排時數長的班"""
+        order = sorted(range(len(self.shift_ids)), key=lambda s: -self.shift_hours[s])
+        for d in range(self.day_count):
+            for s in order:
+                missing = self.shortfall(d, s)
+                if missing:
+                    for i in self._candidates(d, s)[:missing]:
+                        self._assign(i, d, s)
+
+    # ------------------------------------------------------------------
+    # 區域搜尋
+    # ------------------------------------------------------------------
+
+    def _fill(self, d: int, s: int) -> bool:
+        """直接補人，或先把某位員工的另一個班交給別人，再讓他補上 (d, s)"""
+        candidates = self._candidates(d, s)
+        if candidates:
+            self._assign(candidates[0], d, s)
+            return True
+
+        staff_order = list(range(len(self.staff)))
+        self.rng.shuffle(staff_order)
+        for i in staff_order:
+            if self.work[i][d] != -1 or self.leave_bits[i] >> d & 1:
+                continue
+            own = [d2 for d2 in range(self.day_count) if self.work[i][d2] != -1 and not self.fixed[i][d2]
+                   and self.work[i][d2] < len(self.shift_ids)]
+            self.rng.shuffle(own)
+            for d2 in own:
+                s2 = self.work[i][d2]
+                self._unassign(i, d2)
+                if self.can_assign(i, d, s):
+                    replacement = [j for j in self._candidates(d2, s2) if j != i]
+                    if replacement:
+                        self._assign(replacement[0], d2, s2)
+                        self._assign(i, d, s)
+                        return True
+                self._assign(i, d2, s2)
+        return False
+
+    def _balance(self) -> bool:
+        """把工時比例最高者的一個班交給比例較低且可以接手的員工"""
+        staff_count = len(self.staff)
+        if staff_count < 2:
+            return False
+        # 從工時比例最高的幾位中隨機挑選，避免一直卡在無法交出班的同一人
+        i = self.rng.choice(sorted(range(staff_count), key=self.load)[-3:])
+        own = [d for d in range(self.day_count) if self.work[i][d] != -1 and not self.fixed[i][d]
+               and self.work[i][d] < len(self.shift_ids)]
+        if not own:
+            return False
+        d = self.rng.choice(own)
+        s = self.work[i][d]
+        hours = self.shift_hours[s]
+        before_i = self.load(i)
+        self._unassign(i, d)
+        for j in self._candidates(d, s):
+            if j == i:
+                continue
+            before_j = self.load(j)
+            after_j = (self.hours[j] + hours) / max(self.cap[j], 1)
+            # 平方和下降才交換
+            if self.load(i) ** 2 + after_j ** 2 < before_i ** 2 + before_j ** 2 - 1e-9:
+                self._assign(j, d, s)
+                return True
+        self._assign(i, d, s)
+        return False
+
+    def improve(self, deadline: float, incumbent=None):
+        """
+        在期限內補足缺額，之後平均分配工時
+
+        Args:
+            incumbent: 多起點搜尋共用的最佳目標值（具有 value 與 offer()，見 scheduling.multistart）；
+                缺額補足時提供目前的目標值（之後只會下降），缺額卡住且目標值下界
+                (lower_bound) 已比最佳值差時放棄此起點；放棄的起點不可能勝出，最佳結果不受影響
+        """
+        shifts = range(len(self.shift_ids))
+        stuck: Set[Tuple[int, int]] = set()
+        stalled = 0
+        covered = False
+        while time.perf_counter() < deadline and stalled < MAX_STALLED_MOVES:
+            self.iterations += 1
+            open_slots = [(d, s) for d in range(self.day_count) for s in shifts
+                          if self.shortfall(d, s) and (d, s) not in stuck]
+            if open_slots:
+                d, s = self.rng.choice(open_slots)
+                if self._fill(d, s):
+                    stalled = 0
+                    stuck.clear()
+                else:
+                    stuck.add((d, s))
+                continue
+            if incumbent is not None:
+                if stuck and self.lower_bound() > incumbent.value:
+                    # 繼續搜尋也追不上其他起點已達到的目標值
+                    self.abandoned = True
+                    break
+                if not stuck and not covered:
+                    covered = True
+                    incumbent.offer(self.objective())
+            if self._balance():
+                stalled = 0
+                stuck.clear()
+            else:
+                stalled += 1
+
+    # ------------------------------------------------------------------
+    # 局部重排
+    # ------------------------------------------------------------------
+
+    def warm_start(self, assignments: List[Assignment]) -> List[Assignment]:
+        """
+        以既有排班為起點（之後可被搜尋調整），回傳因請假或同日重複而移除的班
+
+        不屬於本問題的員工、日期或班別直接略過。
+        """
+        dropped = []
+        for staff_id, day, shift_id in assignments:
+            i, d = self._staff_index.get(staff_id), self._day_index.get(day)
+            s = self._shift_index.get(shift_id)
+            if i is None or d is None or s is None:
+                continue
+            if self.work[i][d] != -1 or self.leave_bits[i] >> d & 1:
+                dropped.append((staff_id, day, shift_id))
+            else:
+                self._assign(i, d, s)
+        return dropped
+
+    def repair(self, current: List[Assignment], deadline: float) -> RosterRepair:
+        """
+        由既有排班出發，只補回因請假而空出的班
+
+        problem.fixed 以外的既有排班（current）構成可調整的鄰域，
+        搜尋只會更動其中的班，因此異動範圍限於受影響日期附近。
+        """
+        started = time.perf_counter()
+        dropped = self.warm_start(current)
+        kept = set(self._movable())
+        slots = sorted({(self._day_index[day], self._shift_index[shift_id]) for _, day, shift_id in dropped})
+
+        stuck: Set[Tuple[int, int]] = set()
+        while time.perf_counter() < deadline:
+            open_slots = [slot for slot in slots if self.shortfall(*slot) and slot not in stuck]
+            if not open_slots:
+                break
+            self.iterations += 1
+            if self._fill(*open_slots[0]):
+                stuck.clear()
+            else:
+                stuck.add(open_slots[0])
+
+        after = set(self._movable())
+        return RosterRepair(
+            removed=dropped + sorted(kept - after),
+            added=sorted(after - kept),
+            shortfall={(self.dates[d], self.shift_ids[s]): self.shortfall(d, s)
+                       for d, s in slots if self.shortfall(d, s)},
+            iterations=self.iterations,
+            elapsed=time.perf_counter() - started,
+        )
+
+    def _movable(self) -> List[Assignment]:
+        return [
+            (self.staff_ids[i], self.dates[d], self.shift_ids[self.work[i][d]])
+            for d in range(self.day_count) for i in range(len(self.staff))
+            if self.work[i][d] != -1 and not self.fixed[i][d]
+        ]
+
+    def result(self, elapsed: float) -> RosterResult:
+        shortfall = {
+            (self.dates[d], self.shift_ids[s]): self.shortfall(d, s)
+            for d in range(self.day_count) for s in range(len(self.shift_ids)) if self.shortfall(d, s)
+        }
+        return RosterResult(
+            assignments=self._movable(),
+            shortfall=shortfall,
+            hours=dict(zip(self.staff_ids, self.hours)),
+            objective=round(self.objective(), 3),
+            iterations=self.iterations,
+            elapsed=elapsed,
+        )
+
+    def solve(self, time_budget: float = DEFAULT_TIME_BUDGET, incumbent=None) -> RosterResult:
+        started = time.perf_counter()
+        self.construct()
+        self.improve(started + time_budget, incumbent)
+        result = self.result(time.perf_counter() - started)
+        result.abandoned = self.abandoned
+        if incumbent is not None and not self.abandoned:
+            incumbent.offer(result.objective)
+        return result
+
+
+def generate_roster(problem: RosterProblem, time_budget: float = DEFAULT_TIME_BUDGET,
+                    seed: int = 0) -> RosterResult:
+    """
+    產生一個月的排班
+
+    Args:
+        problem: 員工、規則、班別時數、請假與既有排班
+        time_budget: 區域搜尋的時間上限（秒），缺額補足且工時已平均時會提前結束
+        seed: 亂數種子，相同種子得到相同結果
+
+    Returns:
+        新排的班、仍缺人的班與各員工工時
+    """
+    return RosterSolver(problem, seed).solve(time_budget)
+
+
+def repair_roster(problem: RosterProblem, current: List[Assignment],
+                  time_budget: float = DEFAULT_REPAIR_BUDGET, seed: int = 0) -> RosterRepair:
+    """
+    核准請假後局部重排
+
+    Args:
+        problem: 含新請假的排班問題；problem.fixed 為不可更動的排班
+        current: 可調整的既有排班（通常是請假日期前後幾天），與請假衝突者會被移除
+        time_budget: 時間上限（秒），空出的班補回或確定補不回時提前結束
+        seed: 亂數種子
+
+    Returns:
+        最小異動（刪除與新增的班）與仍然缺人的班
+    """
+    solver = RosterSolver(problem, seed)
+    return solver.repair(current, time.perf_counter() + time_budget)
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+班別定義
+REST API、規則檢查與 LINE Bot 共用的預設班別與時數
+"""
+
+# 班別資料 (對應 shift_types 資料表的預設班別)
+SHIFT_TYPES = {
+    "早班": {"name": "早班", "start_time": "09:00", "end_time": "17:00", "duration_hours": 8},
+    "晚班": {"name": "晚班", "start_time": "13:00", "end_time": "21:00", "duration_hours": 8},
+    "全日班": {"name": "全日班", "start_time": "09:00", "end_time": "21:00", "duration_hours": 12},
+}
+# 未定義的班別以此時數計算
+DEFAULT_SHIFT_HOURS = 8
+
+
+def shift_hours(shift_type_id: str) -> int:
+    shift = SHIFT_TYPES.get(shift_type_id)
+    return shift["duration_hours"] if shift else DEFAULT_SHIFT_HOURS
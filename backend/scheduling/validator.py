@@ -0,0 +1,748 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+百貨櫃姐排班系統 - 排班規則檢查器
+用於自動檢查排班是否違反店鋪規則
+"""
+
+import calendar
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+
+from scheduling.availability import popcount
+
+
+@dataclass
+class Staff:
+    """專櫃人員資料"""
+    id: str
+    employee_id: str
+    name: str
+    brand_id: str
+    monthly_available_hours: int = 160
+    min_rest_days_per_month: int = 8
+    is_active: bool = True
+
+
+@dataclass
+class Schedule:
+    """排班資料"""
+    id: str
+    staff_id: str
+    shift_type: str
+    schedule_date: date
+    duration_hours: int
+    status: str = 'scheduled'
+
+
+@dataclass
+class SchedulingRule:
+    """排班規則"""
+    id: str
+    rule_name: str
+    rule_type: str
+    rule_value: int
+    description: str
+    brand_id: Optional[str] = None  # 適用品牌，None 表示全店通用
+
+
+@dataclass
+class Violation:
+    """排班衝突"""
+    schedule_id: str
+    rule_id: str
+    violation_type: str
+    description: str
+    severity: str = 'warning'
+    start_date: Optional[date] = None  # 區段型違規（連續工作）的起訖日期
+    end_date: Optional[date] = None
+
+
+@dataclass
+class ValidationDelta:
+    """增量檢查結果：本次異動新增與解除的違規"""
+    appeared: List[Violation] = field(default_factory=list)
+    cleared: List[Violation] = field(default_factory=list)
+
+
+@dataclass
+class WorkRun:
+    """連續工作區段"""
+    staff_id: str
+    start_date: date
+    end_date: date
+
+    @property
+    def days(self) -> int:
+        return (self.end_date - self.start_date).days + 1
+
+
+def find_work_runs(staff_id: str, work_dates: List[date]) -> List[WorkRun]:
+    """將排序後不重複的工作日期切成連續工作區段"""
+    runs: List[WorkRun] = []
+    for work_date in work_dates:
+        if runs and (work_date - runs[-1].end_date).days == 1:
+            runs[-1].end_date = work_date
+        else:
+            runs.append(WorkRun(staff_id, work_date, work_date))
+    return runs
+
+
+def _days_in_month(year: int, month: int) -> int:
+    """計算該月天數"""
+    return calendar.monthrange(year, month)[1]
+
+
+def find_rule(rules: List[SchedulingRule], rule_type: str) -> Optional[SchedulingRule]:
+    """取得指定類型的第一條規則"""
+    return next((r for r in rules if r.rule_type == rule_type), None)
+
+
+def _min_staff_violation(rule: SchedulingRule, schedule_id: str, schedule_date: date,
+                         shift_type: str, staff_count: int) -> Violation:
+    return Violation(
+        schedule_id=schedule_id,
+        rule_id=rule.id,
+        violation_type='min_staff_violation',
+        description=f'{schedule_date} {shift_type} 只有 {staff_count} 人，少於規定的 {rule.rule_value} 人',
+        severity='error'
+    )
+
+
+def _rest_days_violation(rule: SchedulingRule, staff: Staff, year: int, month: int,
+                         rest_days: int) -> Violation:
+    return Violation(
+        schedule_id='',  # 這是整體規則違規，不特定到某個排班
+        rule_id=rule.id,
+        violation_type='insufficient_rest_days',
+        description=f'{staff.name} 在 {year}年{month}月 只休息 {rest_days} 天，少於規定的 {staff.min_rest_days_per_month} 天',
+        severity='error'
+    )
+
+
+def _working_hours_violation(rule: SchedulingRule, staff: Staff, year: int, month: int,
+                             total_hours: int) -> Violation:
+    return Violation(
+        schedule_id='',
+        rule_id=rule.id,
+        violation_type='excessive_working_hours',
+        description=f'{staff.name} 在 {year}年{month}月 工作時數 {total_hours} 小時，超過規定的 {rule.rule_value} 小時',
+        severity='error'
+    )
+
+
+def _consecutive_days_violation(rule: SchedulingRule, staff: Staff, start_date: date, end_date: date) -> Violation:
+    consecutive_count = (end_date - start_date).days + 1
+    return Violation(
+        schedule_id='',
+        rule_id=rule.id,
+        violation_type='excessive_consecutive_days',
+        description=f'{staff.name} 於 {start_date} 至 {end_date} 連續工作 {consecutive_count} 天，超過規定的 {rule.rule_value} 天',
+        severity='warning',
+        start_date=start_date,
+        end_date=end_date
+    )
+
+
+def _duplicate_violation(schedule_id: str, schedule_date: date) -> Violation:
+    return Violation(
+        schedule_id=schedule_id,
+        rule_id='',
+        violation_type='duplicate_schedule',
+        description=f'員工在 {schedule_date} 有重複排班',
+        severity='error'
+    )
+
+
+class ConsecutiveRunTracker:
+    """
+    連續工作區段追蹤器
+
+    每個超過上限的區段只回報一次（含起訖日期）。逐月分批檢查時，
+    碰到檢查期間最後一天的區段視為尚未結束，保留為該員工的 trailing run；
+    下一批若從隔天接續工作就延續同一區段，因此跨月的連續工作也能偵測，
+    且不需重新載入上個月的資料。全部批次結束後呼叫 flush() 取得仍未回報的區段。
+    """
+
+    def __init__(self):
+        self.trailing_runs: Dict[str, WorkRun] = {}
+        self._staff: Dict[str, Staff] = {}
+        self._rule: Optional[SchedulingRule] = None
+
+    def check(self,
+              staff_work_dates: Dict[str, List[date]],
+              staff_list: List[Staff],
+              rule: SchedulingRule,
+              period_end: Optional[date] = None) -> List[Violation]:
+        """
+        檢查一批工作日期
+
+        Args:
+            staff_work_dates: 員工 ID -> 排序後不重複的工作日期
+            staff_list: 員工列表
+            rule: 連續工作天數規則
+            period_end: 本批檢查期間的最後一天；None 表示沒有後續批次，所有區段都已結束
+
+        Returns:
+            本批已結束且超過上限的區段違規
+        """
+        self._rule = rule
+        violations: List[Violation] = []
+        for staff in staff_list:
+            self._staff[staff.id] = staff
+            runs = find_work_runs(staff.id, staff_work_dates.get(staff.id, []))
+
+            trailing = self.trailing_runs.pop(staff.id, None)
+            if trailing is not None:
+                if runs and (runs[0].start_date - trailing.end_date).days == 1:
+                    runs[0].start_date = trailing.start_date
+                else:
+                    runs.insert(0, trailing)
+
+            if runs and period_end is not None and runs[-1].end_date >= period_end:
+                self.trailing_runs[staff.id] = runs.pop()
+
+            violations.extend(self._over_limit(runs))
+        return violations
+
+    def flush(self) -> List[Violation]:
+        """回報所有尚未結束的區段並清空狀態"""
+        runs = list(self.trailing_runs.values())
+        self.trailing_runs.clear()
+        return self._over_limit(runs)
+
+    def _over_limit(self, runs: List[WorkRun]) -> List[Violation]:
+        if self._rule is None:
+            return []
+        return [
+            _consecutive_days_violation(self._rule, self._staff[run.staff_id], run.start_date, run.end_date)
+            for run in runs if run.days > self._rule.rule_value
+        ]
+
+
+class ScheduleValidator:
+    """排班規則檢查器"""
+
+    def __init__(self, run_tracker: Optional[ConsecutiveRunTracker] = None):
+        self.violations: List[Violation] = []
+        # 逐月串流檢查時傳入同一個追蹤器，連續工作區段會跨批次延續
+        self.run_tracker = run_tracker
+
+    def validate_schedule(self,
+                         schedules: List[Schedule],
+                         staff_list: List[Staff],
+                         rules: List[SchedulingRule],
+                         period_end: Optional[date] = None) -> List[Violation]:
+        """
+        檢查排班是否符合所有規則
+
+        Args:
+            schedules: 排班列表
+            staff_list: 員工列表
+            rules: 排班規則列表
+            period_end: 串流檢查時本批期間的最後一天（需搭配 run_tracker）
+
+        Returns:
+            違規列表
+        """
+        self.violations = []
+
+        # 檢查各種規則
+        self._check_min_staff_per_shift(schedules, rules)
+        self._check_monthly_rest_days(schedules, staff_list, rules)
+        self._check_monthly_working_hours(schedules, staff_list, rules)
+        self._check_consecutive_working_days(schedules, staff_list, rules, period_end)
+        self._check_duplicate_schedule(schedules)
+
+        return self.violations
+
+    def _check_min_staff_per_shift(self, schedules: List[Schedule], rules: List[SchedulingRule]):
+        """檢查每班最少人數規則"""
+        min_staff_rule = find_rule(rules, 'min_staff_per_shift')
+        if not min_staff_rule:
+            return
+
+        # 按日期和班別分組統計人數
+        shift_groups = {}
+        for schedule in schedules:
+            if schedule.status != 'scheduled':
+                continue
+
+            key = (schedule.schedule_date, schedule.shift_type)
+            if key not in shift_groups:
+                shift_groups[key] = []
+            shift_groups[key].append(schedule)
+
+        # 檢查每個班組的人數
+        for (schedule_date, shift_type), shift_schedules in shift_groups.items():
+            staff_count = len(set(s.staff_id for s in shift_schedules))
+            if staff_count < min_staff_rule.rule_value:
+                self.violations.append(_min_staff_violation(
+                    min_staff_rule, shift_schedules[0].id, schedule_date, shift_type, staff_count
+                ))
+
+    def _check_monthly_rest_days(self, schedules: List[Schedule], staff_list: List[Staff], rules: List[SchedulingRule]):
+        """檢查每月最少休息天數"""
+        rest_days_rule = find_rule(rules, 'min_rest_days')
+        if not rest_days_rule:
+            return
+
+        # 按員工索引各月份的工作日位元集合（第 d - 1 位元為 d 日）: 員工 ID -> {(年, 月): 位元集合}
+        staff_monthly_work: Dict[str, Dict[Tuple[int, int], int]] = {}
+        for schedule in schedules:
+            if schedule.status != 'scheduled':
+                continue
+
+            months = staff_monthly_work.setdefault(schedule.staff_id, {})
+            month_key = (schedule.schedule_date.year, schedule.schedule_date.month)
+            months[month_key] = months.get(month_key, 0) | 1 << (schedule.schedule_date.day - 1)
+
+        # 檢查每個員工的休息天數，只走訪該員工自己的月份
+        for staff in staff_list:
+            for (year, month), work_days in staff_monthly_work.get(staff.id, {}).items():
+                rest_days = _days_in_month(year, month) - popcount(work_days)
+
+                if rest_days < staff.min_rest_days_per_month:
+                    self.violations.append(_rest_days_violation(rest_days_rule, staff, year, month, rest_days))
+
+    def _check_monthly_working_hours(self, schedules: List[Schedule], staff_list: List[Staff], rules: List[SchedulingRule]):
+        """檢查每月最多工作時數"""
+        max_hours_rule = find_rule(rules, 'max_monthly_hours')
+        if not max_hours_rule:
+            return
+
+        # 按員工索引各月份的工作時數: 員工 ID -> {(年, 月): 時數}
+        staff_monthly_hours: Dict[str, Dict[Tuple[int, int], int]] = {}
+        for schedule in schedules:
+            if schedule.status != 'scheduled':
+                continue
+
+            months = staff_monthly_hours.setdefault(schedule.staff_id, {})
+            month_key = (schedule.schedule_date.year, schedule.schedule_date.month)
+            months[month_key] = months.get(month_key, 0) + schedule.duration_hours
+
+        # 檢查每個員工的工作時數，只走訪該員工自己的月份
+        for staff in staff_list:
+            for (year, month), total_hours in staff_monthly_hours.get(staff.id, {}).items():
+                if total_hours > max_hours_rule.rule_value:
+                    self.violations.append(_working_hours_violation(max_hours_rule, staff, year, month, total_hours))
+
+    def _check_consecutive_working_days(self, schedules: List[Schedule], staff_list: List[Staff],
+                                        rules: List[SchedulingRule], period_end: Optional[date] = None):
+        """檢查連續工作天數限制，每個超過上限的區段回報一次"""
+        consecutive_rule = find_rule(rules, 'max_consecutive_days')
+        if not consecutive_rule:
+            return
+
+        # 按員工整理排班日期
+        staff_schedules = {}
+        for schedule in schedules:
+            if schedule.status != 'scheduled':
+                continue
+
+            if schedule.staff_id not in staff_schedules:
+                staff_schedules[schedule.staff_id] = set()
+            staff_schedules[schedule.staff_id].add(schedule.schedule_date)
+
+        staff_work_dates = {staff_id: sorted(dates) for staff_id, dates in staff_schedules.items()}
+        if self.run_tracker is None:
+            tracker = ConsecutiveRunTracker()
+            self.violations.extend(tracker.check(staff_work_dates, staff_list, consecutive_rule))
+        else:
+            self.violations.extend(
+                self.run_tracker.check(staff_work_dates, staff_list, consecutive_rule, period_end)
+            )
+
+    def _check_duplicate_schedule(self, schedules: List[Schedule]):
+        """檢查重複排班"""
+        staff_schedule_map = {}
+
+        for schedule in schedules:
+            key = (schedule.staff_id, schedule.schedule_date)
+            if key in staff_schedule_map:
+                self.violations.append(_duplicate_violation(schedule.id, schedule.schedule_date))
+            else:
+                staff_schedule_map[key] = schedule
+
+
+VALIDATOR_ENGINES = ('python', 'numpy')
+
+
+def create_validator(engine: str = 'python'):
+    """
+    建立排班規則檢查器
+
+    Args:
+        engine: 'python' 為逐筆檢查；'numpy' 為向量化檢查（需安裝 numpy），
+                兩者輸出相同的違規列表
+
+    Returns:
+        具有 validate_schedule() 的檢查器
+    """
+    if engine == 'python':
+        return ScheduleValidator()
+    if engine == 'numpy':
+        from scheduling.columnar import VectorizedScheduleValidator
+        return VectorizedScheduleValidator()
+    raise ValueError(f"Unknown validator engine: {engine}")
+
+
+# 違規範圍 (scope) 的種類，每個範圍對應一組可獨立重算的違規
+_SCOPE_MIN_STAFF = 'min_staff'
+_SCOPE_REST_DAYS = 'rest_days'
+_SCOPE_HOURS = 'hours'
+_SCOPE_CONSECUTIVE = 'consecutive'
+_SCOPE_DUPLICATE = 'duplicate'
+
+
+def _violation_key(violation: Violation) -> Tuple[str, str, str, str, str]:
+    return (violation.schedule_id, violation.rule_id, violation.violation_type,
+            violation.description, violation.severity)
+
+
+def _subtract_violations(violations: List[Violation], other: List[Violation]) -> List[Violation]:
+    remaining = Counter(_violation_key(v) for v in other)
+    result = []
+    for violation in violations:
+        key = _violation_key(violation)
+        if remaining[key]:
+            remaining[key] -= 1
+        else:
+            result.append(violation)
+    return result
+
+
+class IncrementalScheduleValidator:
+    """
+    增量排班規則檢查器
+
+    維護各規則所需的分組統計（每日班別人數、每人每月工作日與時數、
+    每人排序後的工作日期），新增/刪除/修改排班時只重算受影響的
+    (日期, 班別)、(員工, 月份) 與連續工作區段，成本為 O(受影響筆數)。
+    違規判定與 ScheduleValidator 相同，但 violations 的順序，以及人數不足與
+    重複排班違規所標記的排班 ID（取決於輸入順序）不保證一致。
+    """
+
+    def __init__(self, staff_list: Iterable[Staff] = (), rules: Iterable[SchedulingRule] = ()):
+        self._staff: Dict[str, Staff] = {s.id: s for s in staff_list}
+        self._rules: List[SchedulingRule] = list(rules)
+        self._schedules: Dict[str, Schedule] = {}
+
+        # (日期, 班別) -> {排班 ID: 員工 ID}，保留加入順序
+        self._shift_groups: Dict[Tuple[date, str], Dict[str, str]] = {}
+        # (日期, 班別) -> {員工 ID: 排班數}
+        self._shift_staff: Dict[Tuple[date, str], Dict[str, int]] = {}
+        # (員工 ID, 年, 月) -> {工作日期: 排班數}
+        self._monthly_work: Dict[Tuple[str, int, int], Dict[date, int]] = {}
+        # (員工 ID, 年, 月) -> 工作時數
+        self._monthly_hours: Dict[Tuple[str, int, int], int] = {}
+        # 員工 ID -> 排序後不重複的工作日期
+        self._work_dates: Dict[str, List[date]] = {}
+        # (員工 ID, 日期) -> 排班 ID 列表（含所有狀態，用於重複排班檢查）
+        self._slots: Dict[Tuple[str, date], List[str]] = {}
+
+        # 範圍 -> 該範圍目前的違規
+        self._violations: Dict[tuple, List[Violation]] = {}
+
+    # ------------------------------------------------------------------
+    # 公開介面
+    # ------------------------------------------------------------------
+
+    @property
+    def violations(self) -> List[Violation]:
+        """目前所有違規"""
+        return [v for scope_violations in self._violations.values() for v in scope_violations]
+
+    def load(self, schedules: Iterable[Schedule]) -> List[Violation]:
+        """以完整排班重建狀態，回傳所有違規"""
+        self._clear_state()
+        for schedule in schedules:
+            self._insert(schedule)
+        self._recompute_all()
+        return self.violations
+
+    def set_staff(self, staff_list: Iterable[Staff]) -> ValidationDelta:
+        """更新員工資料（影響所有員工相關規則，會全部重算）"""
+        self._staff = {s.id: s for s in staff_list}
+        return self._recompute_all()
+
+    def set_rules(self, rules: Iterable[SchedulingRule]) -> ValidationDelta:
+        """更新排班規則（會全部重算）"""
+        self._rules = list(rules)
+        return self._recompute_all()
+
+    def add(self, schedule: Schedule) -> ValidationDelta:
+        """新增一筆排班"""
+        return self.apply(added=[schedule])
+
+    def remove(self, schedule_id: str) -> ValidationDelta:
+        """刪除一筆排班"""
+        return self.apply(removed=[schedule_id])
+
+    def update(self, schedule: Schedule) -> ValidationDelta:
+        """修改一筆排班（以 ID 對應）"""
+        return self.apply(updated=[schedule])
+
+    def apply(self,
+              added: Iterable[Schedule] = (),
+              removed: Iterable[str] = (),
+              updated: Iterable[Schedule] = ()) -> ValidationDelta:
+        """
+        套用一批異動並只重算受影響的範圍
+
+        Args:
+            added: 新增的排班
+            removed: 刪除的排班 ID
+            updated: 修改後的排班（ID 需已存在）
+
+        Returns:
+            本次異動新增 (appeared) 與解除 (cleared) 的違規
+        """
+        removals: List[Schedule] = []
+        for schedule_id in removed:
+            if schedule_id in self._schedules:
+                removals.append(self._schedules[schedule_id])
+        insertions: List[Schedule] = []
+        for schedule in list(added) + list(updated):
+            if schedule.id in self._schedules:
+                removals.append(self._schedules[schedule.id])
+            insertions.append(schedule)
+
+        touched = removals + insertions
+        scopes: Set[tuple] = set()
+        consecutive_dates: Dict[str, Set[date]] = {}
+        for schedule in touched:
+            scopes.update(self._scopes_for(schedule))
+            if schedule.status == 'scheduled':
+                consecutive_dates.setdefault(schedule.staff_id, set()).add(schedule.schedule_date)
+
+        # 異動前的連續工作區段也需清除
+        for staff_id, dates in consecutive_dates.items():
+            for scope in self._consecutive_region(staff_id, dates):
+                scopes.add(scope)
+
+        for schedule in removals:
+            self._discard(schedule)
+        for schedule in insertions:
+            self._insert(schedule)
+
+        for staff_id, dates in consecutive_dates.items():
+            for scope in self._consecutive_region(staff_id, dates):
+                scopes.add(scope)
+
+        return self._refresh(scopes)
+
+    # ------------------------------------------------------------------
+    # 狀態維護
+    # ------------------------------------------------------------------
+
+    def _clear_state(self):
+        self._schedules.clear()
+        self._shift_groups.clear()
+        self._shift_staff.clear()
+        self._monthly_work.clear()
+        self._monthly_hours.clear()
+        self._work_dates.clear()
+        self._slots.clear()
+        self._violations.clear()
+
+    def _insert(self, schedule: Schedule):
+        if schedule.id in self._schedules:
+            self._discard(self._schedules[schedule.id])
+        self._schedules[schedule.id] = schedule
+        self._slots.setdefault((schedule.staff_id, schedule.schedule_date), []).append(schedule.id)
+
+        if schedule.status != 'scheduled':
+            return
+
+        shift_key = (schedule.schedule_date, schedule.shift_type)
+        self._shift_groups.setdefault(shift_key, {})[schedule.id] = schedule.staff_id
+        shift_staff = self._shift_staff.setdefault(shift_key, {})
+        shift_staff[schedule.staff_id] = shift_staff.get(schedule.staff_id, 0) + 1
+
+        month_key = (schedule.staff_id, schedule.schedule_date.year, schedule.schedule_date.month)
+        work_days = self._monthly_work.setdefault(month_key, {})
+        if schedule.schedule_date not in work_days:
+            insort(self._work_dates.setdefault(schedule.staff_id, []), schedule.schedule_date)
+        work_days[schedule.schedule_date] = work_days.get(schedule.schedule_date, 0) + 1
+        self._monthly_hours[month_key] = self._monthly_hours.get(month_key, 0) + schedule.duration_hours
+
+    def _discard(self, schedule: Schedule):
+        if self._schedules.get(schedule.id) is not schedule:
+            return
+        del self._schedules[schedule.id]
+
+        slot_key = (schedule.staff_id, schedule.schedule_date)
+        slot = self._slots[slot_key]
+        slot.remove(schedule.id)
+        if not slot:
+            del self._slots[slot_key]
+
+        if schedule.status != 'scheduled':
+            return
+
+        shift_key = (schedule.schedule_date, schedule.shift_type)
+        group = self._shift_groups[shift_key]
+        del group[schedule.id]
+        if not group:
+            del self._shift_groups[shift_key]
+        shift_staff = self._shift_staff[shift_key]
+        shift_staff[schedule.staff_id] -= 1
+        if not shift_staff[schedule.staff_id]:
+            del shift_staff[schedule.staff_id]
+        if not shift_staff:
+            del self._shift_staff[shift_key]
+
+        month_key = (schedule.staff_id, schedule.schedule_date.year, schedule.schedule_date.month)
+        work_days = self._monthly_work[month_key]
+        work_days[schedule.schedule_date] -= 1
+        if not work_days[schedule.schedule_date]:
+            del work_days[schedule.schedule_date]
+            dates = self._work_dates[schedule.staff_id]
+            del dates[bisect_left(dates, schedule.schedule_date)]
+            if not dates:
+                del self._work_dates[schedule.staff_id]
+        self._monthly_hours[month_key] -= schedule.duration_hours
+        if not work_days:
+            del self._monthly_work[month_key]
+            del self._monthly_hours[month_key]
+
+    # ------------------------------------------------------------------
+    # 範圍計算
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _scopes_for(schedule: Schedule) -> List[tuple]:
+        scopes = [(_SCOPE_DUPLICATE, schedule.staff_id, schedule.schedule_date)]
+        if schedule.status == 'scheduled':
+            month = (schedule.staff_id, schedule.schedule_date.year, schedule.schedule_date.month)
+            scopes.append((_SCOPE_MIN_STAFF, schedule.schedule_date, schedule.shift_type))
+            scopes.append((_SCOPE_REST_DAYS,) + month)
+            scopes.append((_SCOPE_HOURS,) + month)
+        return scopes
+
+    def _run_bounds(self, staff_id: str, day: date) -> Optional[Tuple[int, int]]:
+        """回傳包含 day 的連續工作區段在排序日期列表中的索引範圍"""
+        dates = self._work_dates.get(staff_id)
+        if not dates:
+            return None
+        i = bisect_left(dates, day)
+        if i == len(dates) or dates[i] != day:
+            return None
+        start = i
+        while start > 0 and (dates[start] - dates[start - 1]).days == 1:
+            start -= 1
+        end = i
+        while end + 1 < len(dates) and (dates[end + 1] - dates[end]).days == 1:
+            end += 1
+        return start, end
+
+    def _consecutive_region(self, staff_id: str, days: Set[date]) -> Set[tuple]:
+        """與指定日期相鄰的連續工作區段（以區段起始日為範圍）"""
+        scopes = set()
+        dates = self._work_dates.get(staff_id, [])
+        one_day = timedelta(days=1)
+        for day in days:
+            for probe in (day - one_day, day, day + one_day):
+                bounds = self._run_bounds(staff_id, probe)
+                if bounds is not None:
+                    scopes.add((_SCOPE_CONSECUTIVE, staff_id, dates[bounds[0]]))
+        return scopes
+
+    # ------------------------------------------------------------------
+    # 違規重算
+    # ------------------------------------------------------------------
+
+    def _all_scopes(self) -> Set[tuple]:
+        scopes = set(self._violations)
+        for shift_key in self._shift_groups:
+            scopes.add((_SCOPE_MIN_STAFF,) + shift_key)
+        for month_key in self._monthly_work:
+            scopes.add((_SCOPE_REST_DAYS,) + month_key)
+            scopes.add((_SCOPE_HOURS,) + month_key)
+        for staff_id, dates in self._work_dates.items():
+            for run in find_work_runs(staff_id, dates):
+                scopes.add((_SCOPE_CONSECUTIVE, staff_id, run.start_date))
+        for slot_key, ids in self._slots.items():
+            if len(ids) > 1:
+                scopes.add((_SCOPE_DUPLICATE,) + slot_key)
+        return scopes
+
+    def _recompute_all(self) -> ValidationDelta:
+        return self._refresh(self._all_scopes())
+
+    def _refresh(self, scopes: Set[tuple]) -> ValidationDelta:
+        old_violations: List[Violation] = []
+        new_violations: List[Violation] = []
+        for scope in scopes:
+            new = self._compute_scope(scope)
+            old_violations.extend(self._violations.pop(scope, []))
+            if new:
+                self._violations[scope] = new
+                new_violations.extend(new)
+
+        # 以多重集合比較，同一違規只是換了範圍（例如連續區段位移）不算異動
+        return ValidationDelta(
+            appeared=_subtract_violations(new_violations, old_violations),
+            cleared=_subtract_violations(old_violations, new_violations),
+        )
+
+    def _compute_scope(self, scope: tuple) -> List[Violation]:
+        kind = scope[0]
+
+        if kind == _SCOPE_MIN_STAFF:
+            rule = find_rule(self._rules, 'min_staff_per_shift')
+            shift_key = scope[1:]
+            group = self._shift_groups.get(shift_key)
+            if not rule or not group:
+                return []
+            staff_count = len(self._shift_staff[shift_key])
+            if staff_count >= rule.rule_value:
+                return []
+            return [_min_staff_violation(rule, next(iter(group)), shift_key[0], shift_key[1], staff_count)]
+
+        if kind == _SCOPE_REST_DAYS:
+            rule = find_rule(self._rules, 'min_rest_days')
+            staff_id, year, month = scope[1:]
+            staff = self._staff.get(staff_id)
+            work_days = self._monthly_work.get((staff_id, year, month))
+            if not rule or not staff or not work_days:
+                return []
+            rest_days = _days_in_month(year, month) - len(work_days)
+            if rest_days >= staff.min_rest_days_per_month:
+                return []
+            return [_rest_days_violation(rule, staff, year, month, rest_days)]
+
+        if kind == _SCOPE_HOURS:
+            rule = find_rule(self._rules, 'max_monthly_hours')
+            staff_id, year, month = scope[1:]
+            staff = self._staff.get(staff_id)
+            month_key = (staff_id, year, month)
+            if not rule or not staff or month_key not in self._monthly_hours:
+                return []
+            total_hours = self._monthly_hours[month_key]
+            if total_hours <= rule.rule_value:
+                return []
+            return [_working_hours_violation(rule, staff, year, month, total_hours)]
+
+        if kind == _SCOPE_CONSECUTIVE:
+            rule = find_rule(self._rules, 'max_consecutive_days')
+            staff_id, start_date = scope[1:]
+            staff = self._staff.get(staff_id)
+            bounds = self._run_bounds(staff_id, start_date)
+            if not rule or not staff or bounds is None:
+                return []
+            dates = self._work_dates[staff_id]
+            # 範圍只在該日仍是區段起點時有效
+            if dates[bounds[0]] != start_date or bounds[1] - bounds[0] + 1 <= rule.rule_value:
+                return []
+            return [_consecutive_days_violation(rule, staff, start_date, dates[bounds[1]])]
+
+        if kind == _SCOPE_DUPLICATE:
+            ids = self._slots.get(scope[1:], [])
+            return [_duplicate_violation(schedule_id, scope[2]) for schedule_id in ids[1:]]
+
+        return []
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料 ID 配發
+每張資料表各自配發不重複的 ID：遞增序號，或依時間排序的 UUIDv7
+"""
+
+import os
+import time
+import uuid
+import secrets
+import threading
+from typing import Iterable, Optional
+
+# 環境變數 ID_STRATEGY 選擇配發方式
+ID_STRATEGIES = ('sequence', 'uuid7')
+DEFAULT_ID_STRATEGY = 'sequence'
+
+
+def sequence_number(prefix: str, item_id: Optional[str]) -> Optional[int]:
+    """取出 prefix_N 格式 ID 的序號，其他格式回傳 None"""
+    head, sep, tail = (item_id or "").rpartition("_")
+    if sep and head == prefix and tail.isdigit():
+        return int(tail)
+    return None
+
+
+class SequentialIdAllocator:
+    """
+    遞增序號 ID（例如 staff_1, staff_2, ...）
+
+    以既有 ID 的最大序號為起點，刪除資料後也不會重複配發；以鎖保護，
+    可在多執行緒下同時呼叫。
+    """
+
+    def __init__(self, prefix: str, existing_ids: Iterable[str] = ()):
+        self.prefix = prefix
+        self._last = 0
+        self._lock = threading.Lock()
+        for item_id in existing_ids:
+            self.observe(item_id)
+
+    def observe(self, item_id: str):
+        """登記外部寫入的 ID，之後配發的序號一定比它大"""
+        number = sequence_number(self.prefix, item_id)
+        if number is not None:
+            with self._lock:
+                self._last = max(self._last, number)
+
+    def next_id(self) -> str:
+        with self._lock:
+            self._last += 1
+            return f"{self.prefix}_{self._last}"
+
+
+class TimeOrderedIdAllocator:
+    """
+    UUIDv7 ID（例如 schedule_0192f1c4-...）
+
+    前 48 位元為毫秒時間戳，同一毫秒內以 12 位元計數器遞增，
+    因此字串排序即為建立順序，新資料永遠接在排序索引的尾端。
+    """
+
+    def __init__(self, prefix: str, existing_ids: Iterable[str] = ()):
+        self.prefix = prefix
+        self._last_ms = 0
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def observe(self, item_id: str):
+        pass
+
+    def _next_uuid(self) -> uuid.UUID:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._counter = secrets.randbits(11)
+            else:
+                # 時鐘未前進（或倒退）時沿用上一個時間戳並遞增計數器
+                self._counter += 1
+                if self._counter > 0xFFF:
+                    self._last_ms += 1
+                    self._counter = 0
+            ms, counter = self._last_ms, self._counter
+
+        value = (ms & 0xFFFF_FFFF_FFFF) << 80
+        value |= 0x7 << 76
+        value |= counter << 64
+        value |= 0b10 << 62
+        value |= secrets.randbits(62)
+        return uuid.UUID(int=value)
+
+    def next_id(self) -> str:
+        return f"{self.prefix}_{self._next_uuid()}"
+
+
+def create_id_allocator(prefix: str, existing_ids: Iterable[str] = (), strategy: str = None):
+    """
+    建立 ID 配發器
+
+    Args:
+        prefix: ID 前綴（資料表名稱）
+        existing_ids: 既有 ID，用來避開已使用的序號
+        strategy: 'sequence' 或 'uuid7'，預設讀取環境變數 ID_STRATEGY
+    """
+    strategy = strategy or os.getenv("ID_STRATEGY", DEFAULT_ID_STRATEGY)
+    if strategy == 'sequence':
+        return SequentialIdAllocator(prefix, existing_ids)
+    if strategy == 'uuid7':
+        return TimeOrderedIdAllocator(prefix, existing_ids)
+    raise ValueError(f"Unknown ID strategy: {strategy}")
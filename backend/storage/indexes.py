@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+記憶體資料的次要索引
+提供排序鍵範圍查詢，避免每次查詢都掃描整張表
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+_entry_key = itemgetter(0)
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+class SortedIndex:
+    """以 (鍵, ID) 排序的索引，支援 bisect 範圍查詢"""
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def add(self, key: str, item_id: str):
+        """加入一筆索引"""
+        insort(self._entries, (key, item_id))
+
+    def remove(self, key: str, item_id: str):
+        """移除一筆索引（不存在時忽略）"""
+        entry = (key, item_id)
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def range(self, low: Optional[str] = None, high: Optional[str] = None,
+              after: Optional[Tuple[str, str]] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        查詢鍵介於 low 與 high 之間（含兩端）的 ID，依 (鍵, ID) 排序
+
+        Args:
+            low: 下限，None 表示不限
+            high: 上限，None 表示不限
+            after: 只回傳排在此 (鍵, ID) 之後的項目（分頁游標）
+            limit: 最多回傳筆數，None 表示不限
+        """
+        start = 0 if low is None else bisect_left(self._entries, low, key=_entry_key)
+        end = len(self._entries) if high is None else bisect_right(self._entries, high, key=_entry_key)
+        if after is not None:
+            start = max(start, bisect_right(self._entries, tuple(after)))
+        if limit is not None:
+            end = min(end, start + limit)
+        return [item_id for _, item_id in self._entries[start:end]]
+
+
+class HashIndex:
+    """鍵 -> ID 集合的索引"""
+
+    def __init__(self):
+        self._ids: Dict[str, Set[str]] = {}
+
+    def clear(self):
+        self._ids.clear()
+
+    def add(self, key: str, item_id: str):
+        self._ids.setdefault(key, set()).add(item_id)
+
+    def remove(self, key: str, item_id: str):
+        ids = self._ids.get(key)
+        if ids is None:
+            return
+        ids.discard(item_id)
+        if not ids:
+            del self._ids[key]
+
+    def get(self, key: str) -> Set[str]:
+        """指定鍵的 ID 集合（唯讀，請勿修改）"""
+        return self._ids.get(key, _EMPTY)
+
+    def count(self, key: str) -> int:
+        return len(self._ids.get(key, _EMPTY))
+
+
+class GroupedSortedIndex:
+    """依群組分開維護的排序索引，例如 員工 ID -> (排班日期, ID)"""
+
+    def __init__(self):
+        self._groups: Dict[str, SortedIndex] = {}
+
+    def clear(self):
+        self._groups.clear()
+
+    def add(self, group: str, key: str, item_id: str):
+        index = self._groups.get(group)
+        if index is None:
+            index = self._groups[group] = SortedIndex()
+        index.add(key, item_id)
+
+    def remove(self, group: str, key: str, item_id: str):
+        index = self._groups.get(group)
+        if index is None:
+            return
+        index.remove(key, item_id)
+        if not len(index):
+            del self._groups[group]
+
+    def range(self, group: str, low: Optional[str] = None, high: Optional[str] = None,
+              after: Optional[Tuple[str, str]] = None, limit: Optional[int] = None) -> List[str]:
+        """查詢群組內鍵介於 low 與 high 之間（含兩端）的 ID，參數同 SortedIndex.range"""
+        index = self._groups.get(group)
+        if index is None:
+            return []
+        return index.range(low, high, after, limit)
+
+    def count(self, group: str) -> int:
+        index = self._groups.get(group)
+        return len(index) if index is not None else 0
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列表 API 的游標分頁與欄位投影
+游標為排序鍵（例如 (schedule_date, id)）的不透明編碼，投影結果直接輸出為 dict
+"""
+
+import json
+import base64
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+# 單頁筆數上限
+MAX_PAGE_SIZE = 1000
+
+# 下一頁游標放在回應標頭，回應本體維持原本的陣列格式
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: Sequence[str]) -> str:
+    """將排序鍵編碼為不透明游標"""
+    raw = json.dumps(list(key), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple[str, ...]:
+    """
+    解碼游標
+
+    Args:
+        cursor: encode_cursor 產生的字串
+        size: 排序鍵欄位數
+
+    Raises:
+        ValueError: 游標格式錯誤
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(key, list) or len(key) != size or not all(isinstance(k, str) for k in key):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return tuple(key)
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    解析 fields=a,b,c 投影參數
+
+    Returns:
+        欄位列表（依模型欄位順序），未指定時回傳 None
+
+    Raises:
+        ValueError: 含有模型不存在的欄位
+    """
+    if not fields:
+        return None
+    allowed = list(allowed)
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [f for f in allowed if f in requested]
+
+
+def project(rows: Iterable[dict], fields: Sequence[str]) -> List[dict]:
+    """直接取出資料列的指定欄位，不經過模型驗證與序列化"""
+    return [{f: row.get(f) for f in fields} for row in rows]
+
+
+def split_page(rows: List[dict], limit: Optional[int],
+               sort_key: Callable[[dict], Tuple[str, ...]]) -> Tuple[List[dict], Optional[str]]:
+    """
+    切出一頁資料；查詢時應多取一筆（limit + 1）以判斷是否還有下一頁
+
+    Returns:
+        (本頁資料, 下一頁游標；沒有下一頁時為 None)
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort_key(rows[-1]))
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Supabase (PostgREST) 資料存取層
+以共用的 HTTP/2 連線池呼叫 PostgREST：批次寫入、Range 分頁並限制同時請求數
+"""
+
+import asyncio
+import functools
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from anyio.from_thread import start_blocking_portal
+
+from storage.repository import KEY_PURGE_INTERVAL, TABLES, ConflictError, Repository, TableSpec, _spec
+
+# 單次批次寫入的筆數與單頁讀取筆數
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_MAX_CONCURRENCY = 10
+
+# 冪等鍵資料表與資料版本號表（見 backend/database/schema.sql）
+KEYS_TABLE = "idempotency_keys"
+REVISIONS_TABLE = "revisions"
+
+_CONTENT_RANGE = re.compile(r"^(?:\d+-\d+|\*)/(\d+|\*)$")
+
+
+def _quote(value: str) -> str:
+    """PostgREST 邏輯運算式中的值一律加上雙引號，避免逗號與括號被誤判"""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _after(sort_column: str, after: Tuple[str, str]) -> str:
+    """(sort_column, id) > after 的 PostgREST 條件"""
+    key, item_id = after
+    return (f"({sort_column}.gt.{_quote(key)},"
+            f"and({sort_column}.eq.{_quote(key)},id.gt.{_quote(item_id)}))")
+
+
+class AsyncPostgRESTRepository:
+    """
+    非同步 PostgREST 存取層，方法與 Repository 相同但皆為 coroutine
+
+    同一個 AsyncClient 在所有請求間共用（keep-alive / HTTP/2 多工），
+    以 semaphore 限制同時送出的請求數。
+    """
+
+    is_new = False
+
+    def __init__(self, url: str, api_key: str,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 page_size: int = DEFAULT_PAGE_SIZE,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 timeout: float = 30.0):
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self._client = httpx.AsyncClient(
+            base_url=f"{url.rstrip('/')}/rest/v1",
+            headers={"apikey": api_key, "Authorization": f"Bearer {api_key}"},
+            http2=transport is None,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=timeout,
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._key_claims = 0
+
+    async def _request(self, method: str, table: str, params=None, json=None,
+                       headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        async with self._semaphore:
+            response = await self._client.request(method, f"/{table}", params=params, json=json, headers=headers)
+        if response.status_code == 409:
+            raise ConflictError(f"{table}: {response.text}")
+        response.raise_for_status()
+        return response
+
+    def _to_dict(self, spec: TableSpec, row: dict) -> dict:
+        return {c: row.get(c) for c in spec.columns}
+
+    async def _select(self, spec: TableSpec, params: List[Tuple[str, str]], order: str,
+                      limit: Optional[int]) -> List[dict]:
+        """依 order 排序查詢；limit 為 None 時以 Range 分頁並行讀取全部資料"""
+        params = [("select", ",".join(spec.columns)), *params, ("order", order)]
+        if limit is not None:
+            if limit <= 0:
+                return []
+            response = await self._request(
+                "GET", spec.name, params, headers={"Range-Unit": "items", "Range": f"0-{limit - 1}"}
+            )
+            return [self._to_dict(spec, row) for row in response.json()]
+
+        # 第一頁同時取得總筆數，其餘頁面並行讀取
+        first = await self._request("GET", spec.name, params, headers={
+            "Range-Unit": "items", "Range": f"0-{self.page_size - 1}", "Prefer": "count=exact"
+        })
+        rows = first.json()
+        total = self._total(first)
+        if total is not None and total > len(rows):
+            pages = await asyncio.gather(*(
+                self._request("GET", spec.name, params, headers={
+                    "Range-Unit": "items", "Range": f"{start}-{start + self.page_size - 1}"
+                })
+                for start in range(self.page_size, total, self.page_size)
+            ))
+            for page in pages:
+                rows.extend(page.json())
+        return [self._to_dict(spec, row) for row in rows]
+
+    @staticmethod
+    def _total(response: httpx.Response) -> Optional[int]:
+        match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+        if match and match.group(1) != "*":
+            return int(match.group(1))
+        return None
+
+    async def get(self, table, item_id):
+        spec = _spec(table)
+        response = await self._request("GET", table, [("select", ",".join(spec.columns)), ("id", f"eq.{item_id}")])
+        rows = response.json()
+        return self._to_dict(spec, rows[0]) if rows else None
+
+    async def list(self, table, after=None, limit=None):
+        params = [("id", f"gt.{after[0]}")] if after else []
+        return await self._select(_spec(table), params, "id.asc", limit)
+
+    async def insert(self, table, row):
+        spec = _spec(table)
+        body = {c: row.get(c) for c in spec.columns if c != 'id' or row.get('id') is not None}
+        response = await self._request("POST", table, json=[body], headers={"Prefer": "return=representation"})
+        return self._to_dict(spec, response.json()[0])
+
+    async def upsert(self, table, rows):
+        """
+        依 id 批次寫入：每批一個陣列請求，各批並行送出
+
+        各批分別提交，不是單一交易：任一批失敗時先取消並等待其他批次結束再拋出例外，
+        呼叫端看到例外時不會再有資料寫入，但已完成的批次會保留（可能只寫入一部分）
+        """
+        spec = _spec(table)
+        rows = [{c: row.get(c) for c in spec.columns} for row in rows]
+        with_id = [row for row in rows if row['id'] is not None]
+        without_id = [{c: v for c, v in row.items() if c != 'id'} for row in rows if row['id'] is None]
+
+        requests = []
+        for batch_rows, columns, prefer in (
+            (with_id, spec.columns, "resolution=merge-duplicates,return=minimal"),
+            (without_id, spec.columns[1:], "return=minimal"),
+        ):
+            for start in range(0, len(batch_rows), self.batch_size):
+                requests.append(self._request(
+                    "POST", table,
+                    params=[("columns", ",".join(columns))],
+                    json=batch_rows[start:start + self.batch_size],
+                    headers={"Prefer": prefer}
+                ))
+        tasks = [asyncio.ensure_future(request) for request in requests]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def update(self, table, item_id, row):
+        spec = _spec(table)
+        body = {c: row.get(c) for c in spec.columns[1:]}
+        response = await self._request(
+            "PATCH", table, params=[("id", f"eq.{item_id}")], json=body,
+            headers={"Prefer": "return=representation"}
+        )
+        rows = response.json()
+        if not rows:
+            return None
+        return self._to_dict(spec, rows[0])
+
+    async def delete(self, table, item_id):
+        spec = _spec(table)
+        response = await self._request(
+            "DELETE", table, params=[("id", f"eq.{item_id}")], headers={"Prefer": "return=representation"}
+        )
+        rows = response.json()
+        if not rows:
+            return None
+        return self._to_dict(spec, rows[0])
+
+    async def count(self, table, **equals):
+        spec = _spec(table)
+        unknown = set(equals).difference(spec.columns)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        params = [("select", "id")]
+        for column, value in sorted(equals.items()):
+            if isinstance(value, bool):
+                value = str(value).lower()
+            params.append((column, f"eq.{value}"))
+        response = await self._request("HEAD", table, params, headers={
+            "Range-Unit": "items", "Range": "0-0", "Prefer": "count=exact"
+        })
+        return self._total(response) or 0
+
+    async def find_staff_by_line_user(self, line_user_id):
+        rows = await self._select(TABLES['staff'], [("line_user_id", f"eq.{line_user_id}")], "id.asc", 1)
+        return rows[0] if rows else None
+
+    async def list_schedules(self, staff_id=None, date_from=None, date_to=None, after=None, limit=None):
+        params = []
+        if staff_id:
+            params.append(("staff_id", f"eq.{staff_id}"))
+        if date_from:
+            params.append(("schedule_date", f"gte.{date_from}"))
+        if date_to:
+            params.append(("schedule_date", f"lte.{date_to}"))
+        if after is not None:
+            params.append(("or", _after("schedule_date", after)))
+        return await self._select(TABLES['schedules'], params, "schedule_date.asc,id.asc", limit)
+
+    async def list_leave_requests(self, staff_id=None, status=None, date_from=None, date_to=None,
+                                  after=None, limit=None):
+        params = []
+        if staff_id:
+            params.append(("staff_id", f"eq.{staff_id}"))
+        if status:
+            params.append(("status", f"eq.{status}"))
+        if date_from:
+            params.append(("start_date", f"gte.{date_from}"))
+        if date_to:
+            params.append(("end_date", f"lte.{date_to}"))
+        if after is not None:
+            params.append(("or", _after("start_date", after)))
+        return await self._select(TABLES['leave_requests'], params, "start_date.asc,id.asc", limit)
+
+    async def revision(self, *tables):
+        """
+        由資料庫觸發程序維護的版本號（revisions 資料表），包含其他 worker 與直接寫入資料庫的異動；
+        每個寫入語句加一，分成多批的 upsert 會增加批數
+        """
+        names = [_spec(t).name for t in tables or TABLES]
+        response = await self._request("GET", REVISIONS_TABLE, [
+            ("select", "value"), ("name", f"in.({','.join(names)})")
+        ])
+        return sum(row["value"] for row in response.json())
+
+    async def _insert_key(self, key: str, expires_at: float) -> bool:
+        response = await self._request(
+            "POST", KEYS_TABLE, json=[{"key": key, "expires_at": expires_at}],
+            headers={"Prefer": "resolution=ignore-duplicates,return=representation"}
+        )
+        return bool(response.json())
+
+    async def claim_key(self, key, ttl):
+        now = time.time()
+        self._key_claims += 1
+        if self._key_claims % KEY_PURGE_INTERVAL == 0:
+            await self._request("DELETE", KEYS_TABLE, params=[("expires_at", f"lte.{now}")])
+        # 主鍵衝突時 ignore-duplicates 回傳空陣列；只有已過期的鍵才刪除後重新宣告
+        if await self._insert_key(key, now + ttl):
+            return True
+        expired = await self._request(
+            "DELETE", KEYS_TABLE, params=[("key", f"eq.{key}"), ("expires_at", f"lte.{now}")],
+            headers={"Prefer": "return=representation"}
+        )
+        return bool(expired.json()) and await self._insert_key(key, now + ttl)
+
+    async def release_key(self, key):
+        await self._request("DELETE", KEYS_TABLE, params=[("key", f"eq.{key}")])
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class BlockingRepository(Repository):
+    """
+    在同步程式碼（例如以 def 定義的 FastAPI 路由）中使用非同步存取層
+
+    所有呼叫都交給同一個背景事件迴圈執行，因此連線池與 semaphore 在所有執行緒間共用。
+    """
+
+    def __init__(self, repository: AsyncPostgRESTRepository):
+        self._repository = repository
+        self._portal_cm = start_blocking_portal()
+        self._portal = self._portal_cm.__enter__()
+        self.is_new = repository.is_new
+
+    def _call(self, method, *args, **kwargs):
+        return self._portal.call(functools.partial(method, *args, **kwargs))
+
+    def get(self, table, item_id):
+        return self._call(self._repository.get, table, item_id)
+
+    def list(self, table, after=None, limit=None):
+        return self._call(self._repository.list, table, after, limit)
+
+    def insert(self, table, row):
+        return self._call(self._repository.insert, table, row)
+
+    def upsert(self, table, rows: Iterable[dict]):
+        return self._call(self._repository.upsert, table, list(rows))
+
+    def update(self, table, item_id, row):
+        return self._call(self._repository.update, table, item_id, row)
+
+    def delete(self, table, item_id):
+        return self._call(self._repository.delete, table, item_id)
+
+    def count(self, table, **equals):
+        return self._call(self._repository.count, table, **equals)
+
+    def find_staff_by_line_user(self, line_user_id):
+        return self._call(self._repository.find_staff_by_line_user, line_user_id)
+
+    def list_schedules(self, staff_id=None, date_from=None, date_to=None, after=None, limit=None):
+        return self._call(self._repository.list_schedules, staff_id, date_from, date_to, after, limit)
+
+    def list_leave_requests(self, staff_id=None, status=None, date_from=None, date_to=None,
+                            after=None, limit=None):
+        return self._call(self._repository.list_leave_requests,
+                          staff_id, status, date_from, date_to, after, limit)
+
+    def revision(self, *tables):
+        return self._call(self._repository.revision, *tables)
+
+    def claim_key(self, key, ttl):
+        return self._call(self._repository.claim_key, key, ttl)
+
+    def release_key(self, key):
+        return self._call(self._repository.release_key, key)
+
+    def close(self):
+        self._call(self._repository.close)
+        self._portal_cm.__exit__(None, None, None)
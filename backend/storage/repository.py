@@ -0,0 +1,765 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料存取層
+API 透過 Repository 讀寫資料：InMemoryRepository 保存在行程記憶體，
+SQLiteRepository 以 WAL 模式寫入檔案，可供同一主機上的多個 worker 共用
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from storage.ids import create_id_allocator, sequence_number
+from storage.indexes import GroupedSortedIndex, HashIndex, SortedIndex
+
+STORAGE_BACKENDS = ('memory', 'sqlite', 'supabase')
+DEFAULT_SQLITE_PATH = 'scheduling.db'
+# 每宣告幾次冪等鍵清除一次過期的鍵
+KEY_PURGE_INTERVAL = 1000
+
+
+class ConflictError(Exception):
+    """違反主鍵或唯一約束（例如同一員工同一天重複排班）"""
+
+
+class _Unchanged(Exception):
+    """在 _write() 內拋出：沒有資料被異動，回滾交易且不遞增版本號"""
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """資料表欄位定義（欄位順序與 API 模型相同）"""
+    name: str
+    id_prefix: str
+    columns: Tuple[str, ...]
+    bool_columns: Tuple[str, ...] = ()
+    unique: Tuple[Tuple[str, ...], ...] = ()
+
+
+TABLES: Dict[str, TableSpec] = {spec.name: spec for spec in (
+    TableSpec(
+        'staff', 'staff',
+        ('id', 'employee_id', 'name', 'brand_id', 'phone', 'email', 'monthly_available_hours',
+         'min_rest_days_per_month', 'is_active', 'line_user_id'),
+        bool_columns=('is_active',),
+        unique=(('employee_id',),)
+    ),
+    TableSpec(
+        'schedules', 'schedule',
+        ('id', 'staff_id', 'shift_type_id', 'schedule_date', 'status', 'notes', 'created_by'),
+        unique=(('staff_id', 'schedule_date'),)
+    ),
+    TableSpec(
+        'scheduling_rules', 'rule',
+        ('id', 'brand_id', 'rule_name', 'rule_type', 'rule_value', 'description', 'is_active'),
+        bool_columns=('is_active',)
+    ),
+    TableSpec(
+        'leave_requests', 'leave',
+        ('id', 'staff_id', 'leave_type', 'start_date', 'end_date', 'reason', 'status',
+         'created_at', 'approved_by', 'approved_at')
+    ),
+)}
+
+
+def _spec(table: str) -> TableSpec:
+    try:
+        return TABLES[table]
+    except KeyError:
+        raise ValueError(f"Unknown table: {table}")
+
+
+class Repository:
+    """
+    資料存取介面，所有資料列皆為 dict
+
+    排班依 (schedule_date, id)、請假依 (start_date, id)、其餘資料表依 id 排序；
+    after 為分頁游標（上一頁最後一筆的排序鍵），limit 為最多回傳筆數。
+    """
+
+    # 本次開啟時才建立資料表（需要寫入範例資料）
+    is_new: bool = True
+
+    def get(self, table: str, item_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def list(self, table: str, after: Optional[Tuple[str]] = None,
+             limit: Optional[int] = None) -> List[dict]:
+        raise NotImplementedError
+
+    def insert(self, table: str, row: dict) -> dict:
+        """新增資料列，id 為空時自動配發；違反約束時拋出 ConflictError"""
+        raise NotImplementedError
+
+    def upsert(self, table: str, rows: Iterable[dict]):
+        """
+        依 id 批次新增或覆寫資料列；記憶體與 SQLite 全有全無，
+        Supabase 分批提交，失敗時可能已寫入一部分（見 AsyncPostgRESTRepository.upsert）
+        """
+        raise NotImplementedError
+
+    def update(self, table: str, item_id: str, row: dict) -> Optional[dict]:
+        """覆寫資料列，不存在時回傳 None"""
+        raise NotImplementedError
+
+    def delete(self, table: str, item_id: str) -> Optional[dict]:
+        """刪除資料列並回傳原資料，不存在時回傳 None"""
+        raise NotImplementedError
+
+    def count(self, table: str, **equals) -> int:
+        """計算欄位值符合條件的筆數"""
+        raise NotImplementedError
+
+    def find_staff_by_line_user(self, line_user_id: str) -> Optional[dict]:
+        """依 LINE User ID 查詢綁定的員工（有索引），未綁定時回傳 None"""
+        raise NotImplementedError
+
+    def list_schedules(self, staff_id: Optional[str] = None,
+                       date_from: Optional[str] = None, date_to: Optional[str] = None,
+                       after: Optional[Tuple[str, str]] = None,
+                       limit: Optional[int] = None) -> List[dict]:
+        raise NotImplementedError
+
+    def list_leave_requests(self, staff_id: Optional[str] = None, status: Optional[str] = None,
+                            date_from: Optional[str] = None, date_to: Optional[str] = None,
+                            after: Optional[Tuple[str, str]] = None,
+                            limit: Optional[int] = None) -> List[dict]:
+        raise NotImplementedError
+
+    def revision(self, *tables: str) -> int:
+        """
+        資料版本號：指定資料表每次寫入成功加一
+
+        同一個資料庫的其他 worker 寫入也會反映在版本號上，可用來判斷記憶體快取是否過期。
+        """
+        raise NotImplementedError
+
+    def claim_key(self, key: str, ttl: float) -> bool:
+        """
+        宣告冪等鍵（例如 webhook 事件 ID）
+
+        ttl 秒內第一次宣告回傳 True，重複宣告回傳 False；多個 worker 共用同一個資料庫時也成立。
+        """
+        raise NotImplementedError
+
+    def release_key(self, key: str):
+        """釋放冪等鍵，之後可再次宣告"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryRepository(Repository):
+    """行程內記憶體儲存，以次要索引支援排序與範圍查詢"""
+
+    def __init__(self, id_strategy: Optional[str] = None):
+        self._rows: Dict[str, Dict[str, dict]] = {table: {} for table in TABLES}
+        self._unique: Dict[str, Dict[Tuple[str, ...], Dict[tuple, str]]] = {
+            table: {columns: {} for columns in spec.unique} for table, spec in TABLES.items()
+        }
+        self._revisions: Dict[str, int] = {table: 0 for table in TABLES}
+        self._id_allocators = {
+            table: create_id_allocator(spec.id_prefix, strategy=id_strategy) for table, spec in TABLES.items()
+        }
+        self._lock = threading.RLock()
+        self._keys: Dict[str, float] = {}  # 冪等鍵 -> 到期時間
+        self._key_claims = 0
+
+        # 次要索引：寫入時同步維護，查詢成本為 O(log n + k)
+        self._id_index = {table: SortedIndex() for table in TABLES}  # (id, id)，供 list() 依 ID 分頁
+        self.schedule_date_index = SortedIndex()          # (schedule_date, id)
+        self.schedule_staff_index = GroupedSortedIndex()  # staff_id -> (schedule_date, id)
+        self.leave_status_index = HashIndex()             # status -> id
+        self.leave_staff_index = HashIndex()              # staff_id -> id
+        self.leave_start_index = SortedIndex()            # (start_date, id)
+        self.staff_line_index = HashIndex()               # line_user_id -> id
+
+    def _index(self, table: str, row: dict):
+        self._id_index[table].add(row['id'], row['id'])
+        for columns, owners in self._unique[table].items():
+            key = tuple(row.get(c) for c in columns)
+            if None not in key:
+                owners[key] = row['id']
+        if table == 'staff':
+            if row.get('line_user_id'):
+                self.staff_line_index.add(row['line_user_id'], row['id'])
+        elif table == 'schedules':
+            self.schedule_date_index.add(row['schedule_date'], row['id'])
+            self.schedule_staff_index.add(row['staff_id'], row['schedule_date'], row['id'])
+        elif table == 'leave_requests':
+            self.leave_status_index.add(row['status'], row['id'])
+            self.leave_staff_index.add(row['staff_id'], row['id'])
+            self.leave_start_index.add(row['start_date'], row['id'])
+
+    def _unindex(self, table: str, row: dict):
+        self._id_index[table].remove(row['id'], row['id'])
+        for columns, owners in self._unique[table].items():
+            key = tuple(row.get(c) for c in columns)
+            if owners.get(key) == row['id']:
+                del owners[key]
+        if table == 'staff':
+            if row.get('line_user_id'):
+                self.staff_line_index.remove(row['line_user_id'], row['id'])
+        elif table == 'schedules':
+            self.schedule_date_index.remove(row['schedule_date'], row['id'])
+            self.schedule_staff_index.remove(row['staff_id'], row['schedule_date'], row['id'])
+        elif table == 'leave_requests':
+            self.leave_status_index.remove(row['status'], row['id'])
+            self.leave_staff_index.remove(row['staff_id'], row['id'])
+            self.leave_start_index.remove(row['start_date'], row['id'])
+
+    def _check_unique(self, table: str, row: dict):
+        for columns, owners in self._unique[table].items():
+            key = tuple(row.get(c) for c in columns)
+            owner = owners.get(key)
+            if None not in key and owner is not None and owner != row['id']:
+                raise ConflictError(f"{table}: duplicate {', '.join(columns)}")
+
+    def _check_unique_batch(self, table: str, rows: List[dict]):
+        """
+        依序檢查整批資料的唯一約束，同一批的資料列之間也互相檢查；
+        結果與 SQLite 逐筆 upsert 相同（前面的資料列改掉的鍵可由後面的資料列使用）
+        """
+        stored = self._rows[table]
+        for columns, owners in self._unique[table].items():
+            pending: Dict[tuple, Optional[str]] = {}  # 本批寫到目前為止的 鍵 -> ID（None 表示已釋放）
+            latest: Dict[str, dict] = {}              # ID -> 本批最後寫入的資料列
+            for row in rows:
+                previous = latest.get(row['id'], stored.get(row['id']))
+                if previous is not None:
+                    old = tuple(previous.get(c) for c in columns)
+                    if pending.get(old, owners.get(old)) == row['id']:
+                        pending[old] = None
+                key = tuple(row.get(c) for c in columns)
+                if None not in key:
+                    owner = pending[key] if key in pending else owners.get(key)
+                    if owner is not None and owner != row['id']:
+                        raise ConflictError(f"{table}: duplicate {', '.join(columns)}")
+                    pending[key] = row['id']
+                latest[row['id']] = row
+
+    def _store(self, table: str, row: dict):
+        """寫入一筆（呼叫端需持有鎖並已檢查約束）"""
+        rows = self._rows[table]
+        previous = rows.get(row['id'])
+        if previous is not None:
+            self._unindex(table, previous)
+        rows[row['id']] = row
+        self._index(table, row)
+        self._id_allocators[table].observe(row['id'])
+
+    def get(self, table, item_id):
+        row = self._rows[_spec(table).name].get(item_id)
+        return dict(row) if row is not None else None
+
+    def list(self, table, after=None, limit=None):
+        name = _spec(table).name
+        with self._lock:
+            cursor = (after[0], after[0]) if after is not None else None
+            ids = self._id_index[name].range(after=cursor, limit=limit)
+            return [dict(self._rows[name][i]) for i in ids]
+
+    def insert(self, table, row):
+        spec = _spec(table)
+        row = {c: row.get(c) for c in spec.columns}
+        with self._lock:
+            if row['id'] is None:
+                row['id'] = self._id_allocators[table].next_id()
+            elif row['id'] in self._rows[table]:
+                raise ConflictError(f"{table}: duplicate id {row['id']}")
+            self._check_unique(table, row)
+            self._store(table, row)
+            self._revisions[table] += 1
+        return dict(row)
+
+    def upsert(self, table, rows):
+        spec = _spec(table)
+        rows = [{c: row.get(c) for c in spec.columns} for row in rows]
+        with self._lock:
+            for row in rows:
+                if row['id'] is None:
+                    row['id'] = self._id_allocators[table].next_id()
+            self._check_unique_batch(table, rows)
+            for row in rows:
+                self._store(table, row)
+            self._revisions[table] += 1
+
+    def update(self, table, item_id, row):
+        spec = _spec(table)
+        row = {c: row.get(c) for c in spec.columns}
+        row['id'] = item_id
+        with self._lock:
+            if item_id not in self._rows[table]:
+                return None
+            self._check_unique(table, row)
+            self._store(table, row)
+            self._revisions[table] += 1
+        return dict(row)
+
+    def delete(self, table, item_id):
+        _spec(table)
+        with self._lock:
+            row = self._rows[table].pop(item_id, None)
+            if row is None:
+                return None
+            self._unindex(table, row)
+            self._revisions[table] += 1
+        return row
+
+    def count(self, table, **equals):
+        spec = _spec(table)
+        if table == 'schedules' and set(equals) == {'schedule_date'}:
+            day = equals['schedule_date']
+            return len(self.schedule_date_index.range(day, day))
+        if table == 'leave_requests' and set(equals) == {'status'}:
+            return self.leave_status_index.count(equals['status'])
+        unknown = set(equals).difference(spec.columns)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        with self._lock:
+            rows = list(self._rows[table].values())
+        return sum(1 for r in rows if all(r[c] == v for c, v in equals.items()))
+
+    def find_staff_by_line_user(self, line_user_id):
+        with self._lock:
+            ids = sorted(self.staff_line_index.get(line_user_id))
+            return dict(self._rows['staff'][ids[0]]) if ids else None
+
+    def list_schedules(self, staff_id=None, date_from=None, date_to=None, after=None, limit=None):
+        with self._lock:
+            if staff_id:
+                ids = self.schedule_staff_index.range(staff_id, date_from or None, date_to or None, after, limit)
+            else:
+                ids = self.schedule_date_index.range(date_from or None, date_to or None, after, limit)
+            rows = self._rows['schedules']
+            return [dict(rows[i]) for i in ids]
+
+    def list_leave_requests(self, staff_id=None, status=None, date_from=None, date_to=None,
+                            after=None, limit=None):
+        with self._lock:
+            rows = self._rows['leave_requests']
+            # 從最精簡的索引取得候選，其餘條件只在候選上檢查
+            candidates = None
+            for key, index in ((staff_id, self.leave_staff_index), (status, self.leave_status_index)):
+                if key and (candidates is None or index.count(key) < len(candidates)):
+                    candidates = index.get(key)
+
+            if candidates is not None:
+                requests = sorted((rows[i] for i in candidates), key=lambda r: (r['start_date'], r['id']))
+            else:
+                requests = [rows[i] for i in self.leave_start_index.range(date_from or None, after=after)]
+
+            result = []
+            for r in requests:
+                if ((not staff_id or r['staff_id'] == staff_id)
+                        and (not status or r['status'] == status)
+                        and (not date_from or r['start_date'] >= date_from)
+                        and (not date_to or r['end_date'] <= date_to)
+                        and (after is None or (r['start_date'], r['id']) > tuple(after))):
+                    result.append(dict(r))
+                    if limit is not None and len(result) >= limit:
+                        break
+            return result
+
+    def revision(self, *tables):
+        return sum(self._revisions[_spec(t).name] for t in tables or TABLES)
+
+    def claim_key(self, key, ttl):
+        now = time.time()
+        with self._lock:
+            self._key_claims += 1
+            if self._key_claims % KEY_PURGE_INTERVAL == 0:
+                self._keys = {k: expires for k, expires in self._keys.items() if expires > now}
+            expires = self._keys.get(key)
+            if expires is not None and expires > now:
+                return False
+            self._keys[key] = now + ttl
+            return True
+
+    def release_key(self, key):
+        with self._lock:
+            self._keys.pop(key, None)
+
+
+# SQLite 資料表結構，對應 backend/database/schema.sql（UUID 以 TEXT、BOOLEAN 以 INTEGER 儲存）
+SQLITE_SCHEMA = """
+CREATE TABLE staff (
+    id TEXT PRIMARY KEY,
+    employee_id TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    brand_id TEXT,
+    phone TEXT,
+    email TEXT,
+    monthly_available_hours INTEGER DEFAULT 160,
+    min_rest_days_per_month INTEGER DEFAULT 8,
+    is_active INTEGER DEFAULT 1,
+    line_user_id TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE schedules (
+    id TEXT PRIMARY KEY,
+    staff_id TEXT REFERENCES staff(id),
+    shift_type_id TEXT,
+    schedule_date TEXT NOT NULL,
+    status TEXT DEFAULT 'scheduled',
+    notes TEXT,
+    created_by TEXT REFERENCES staff(id),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(staff_id, schedule_date)
+);
+
+CREATE TABLE scheduling_rules (
+    id TEXT PRIMARY KEY,
+    brand_id TEXT,
+    rule_name TEXT NOT NULL,
+    rule_type TEXT NOT NULL,
+    rule_value INTEGER NOT NULL,
+    description TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE leave_requests (
+    id TEXT PRIMARY KEY,
+    staff_id TEXT REFERENCES staff(id),
+    leave_type TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    reason TEXT,
+    status TEXT DEFAULT 'pending',
+    created_at TEXT,
+    approved_by TEXT,
+    approved_at TEXT,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_staff_brand_id ON staff(brand_id);
+CREATE INDEX idx_staff_employee_id ON staff(employee_id);
+CREATE INDEX idx_staff_line_user_id ON staff(line_user_id);
+CREATE INDEX idx_schedules_staff_id ON schedules(staff_id);
+CREATE INDEX idx_schedules_date ON schedules(schedule_date, id);
+CREATE INDEX idx_schedules_shift_type ON schedules(shift_type_id);
+CREATE INDEX idx_scheduling_rules_brand ON scheduling_rules(brand_id);
+CREATE INDEX idx_leave_requests_staff_id ON leave_requests(staff_id);
+CREATE INDEX idx_leave_requests_status ON leave_requests(status);
+CREATE INDEX idx_leave_requests_start_date ON leave_requests(start_date, id);
+
+-- 各資料表的寫入版本號與遞增 ID 序號
+CREATE TABLE revisions (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+CREATE TABLE id_sequences (
+    name TEXT PRIMARY KEY,
+    last INTEGER NOT NULL
+);
+"""
+
+# 既有資料庫開啟時補建的索引
+SQLITE_LATE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_staff_line_user_id ON staff(line_user_id)",
+)
+
+# 冪等鍵不屬於業務資料，既有資料庫開啟時也會補建
+SQLITE_KEYS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+)
+"""
+
+
+class SQLiteRepository(Repository):
+    """
+    SQLite 儲存（WAL 模式）
+
+    每個執行緒使用各自的連線；SQL 皆為固定字串加上 ? 參數，
+    由連線的 statement cache 重複使用已編譯的語句。
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, id_strategy: Optional[str] = None):
+        self.path = path
+        self.id_strategy = id_strategy or os.getenv("ID_STRATEGY", "sequence")
+        # uuid7 由行程內配發；sequence 由 id_sequences 資料表配發，多個 worker 也不會重複
+        self._id_allocators = {
+            table: create_id_allocator(spec.id_prefix, strategy=self.id_strategy)
+            for table, spec in TABLES.items()
+        } if self.id_strategy != 'sequence' else None
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._sql = {table: self._statements(spec) for table, spec in TABLES.items()}
+        self._key_claims = 0
+        self.is_new = self._create_schema()
+
+    @staticmethod
+    def _statements(spec: TableSpec) -> Dict[str, str]:
+        columns = ', '.join(spec.columns)
+        placeholders = ', '.join('?' for _ in spec.columns)
+        assignments = ', '.join(f"{c} = excluded.{c}" for c in spec.columns[1:])
+        return {
+            'select': f"SELECT {columns} FROM {spec.name} WHERE id = ?",
+            'list': f"SELECT {columns} FROM {spec.name} WHERE id > ? ORDER BY id LIMIT ?",
+            'insert': f"INSERT INTO {spec.name} ({columns}) VALUES ({placeholders})",
+            'upsert': (f"INSERT INTO {spec.name} ({columns}) VALUES ({placeholders}) "
+                       f"ON CONFLICT(id) DO UPDATE SET {assignments}, updated_at = CURRENT_TIMESTAMP"),
+            'update': (f"UPDATE {spec.name} SET {', '.join(f'{c} = ?' for c in spec.columns[1:])}, "
+                       f"updated_at = CURRENT_TIMESTAMP WHERE id = ?"),
+            'delete': f"DELETE FROM {spec.name} WHERE id = ? RETURNING {columns}",
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None：交易由 _write() 明確控制；每個執行緒各自一個連線，
+            # check_same_thread=False 只為了讓 close() 可在其他執行緒關閉
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, cached_statements=256,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _create_schema(self) -> bool:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'revisions'"
+            ).fetchone()
+            if not exists:
+                for statement in SQLITE_SCHEMA.split(';'):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.executemany("INSERT INTO revisions (name, value) VALUES (?, 0)", [(t,) for t in TABLES])
+            for statement in SQLITE_LATE_INDEXES:
+                conn.execute(statement)
+            conn.execute(SQLITE_KEYS_SCHEMA)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return not exists
+
+    @contextmanager
+    def _write(self, table: str):
+        """寫入交易：成功時一併遞增該資料表的版本號"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("UPDATE revisions SET value = value + 1 WHERE name = ?", (table,))
+            conn.execute("COMMIT")
+        except _Unchanged:
+            conn.execute("ROLLBACK")
+        except sqlite3.IntegrityError as e:
+            conn.execute("ROLLBACK")
+            raise ConflictError(f"{table}: {e}") from e
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _to_dict(self, spec: TableSpec, values) -> dict:
+        row = dict(zip(spec.columns, values))
+        for c in spec.bool_columns:
+            if row[c] is not None:
+                row[c] = bool(row[c])
+        return row
+
+    def _values(self, spec: TableSpec, row: dict) -> tuple:
+        return tuple(row.get(c) for c in spec.columns)
+
+    def _assign_id(self, conn: sqlite3.Connection, spec: TableSpec, row: dict):
+        if self._id_allocators is not None:
+            if row.get('id') is None:
+                row['id'] = self._id_allocators[spec.name].next_id()
+            return
+        if row.get('id') is None:
+            last = conn.execute(
+                "INSERT INTO id_sequences (name, last) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET last = last + 1 RETURNING last",
+                (spec.name,)
+            ).fetchone()[0]
+            row['id'] = f"{spec.id_prefix}_{last}"
+        else:
+            self._observe_id(conn, spec, row['id'])
+
+    def _observe_id(self, conn: sqlite3.Connection, spec: TableSpec, item_id: str):
+        number = sequence_number(spec.id_prefix, item_id)
+        if number is not None:
+            conn.execute(
+                "INSERT INTO id_sequences (name, last) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last = MAX(last, excluded.last)",
+                (spec.name, number)
+            )
+
+    def get(self, table, item_id):
+        spec = _spec(table)
+        values = self._connection().execute(self._sql[table]['select'], (item_id,)).fetchone()
+        return self._to_dict(spec, values) if values is not None else None
+
+    def list(self, table, after=None, limit=None):
+        spec = _spec(table)
+        cursor = self._connection().execute(
+            self._sql[table]['list'], (after[0] if after else '', -1 if limit is None else limit)
+        )
+        return [self._to_dict(spec, values) for values in cursor]
+
+    def insert(self, table, row):
+        spec = _spec(table)
+        row = {c: row.get(c) for c in spec.columns}
+        with self._write(table) as conn:
+            self._assign_id(conn, spec, row)
+            conn.execute(self._sql[table]['insert'], self._values(spec, row))
+        return row
+
+    def upsert(self, table, rows):
+        spec = _spec(table)
+        rows = [{c: row.get(c) for c in spec.columns} for row in rows]
+        with self._write(table) as conn:
+            for row in rows:
+                self._assign_id(conn, spec, row)
+            conn.executemany(self._sql[table]['upsert'], [self._values(spec, row) for row in rows])
+
+    def update(self, table, item_id, row):
+        spec = _spec(table)
+        row = {c: row.get(c) for c in spec.columns}
+        row['id'] = item_id
+        with self._write(table) as conn:
+            values = self._values(spec, row)
+            updated = conn.execute(self._sql[table]['update'], values[1:] + (item_id,)).rowcount
+            if not updated:
+                raise _Unchanged
+        return row if updated else None
+
+    def delete(self, table, item_id):
+        spec = _spec(table)
+        values = None
+        with self._write(table) as conn:
+            values = conn.execute(self._sql[table]['delete'], (item_id,)).fetchone()
+            if values is None:
+                raise _Unchanged
+        return self._to_dict(spec, values) if values is not None else None
+
+    def count(self, table, **equals):
+        spec = _spec(table)
+        unknown = set(equals).difference(spec.columns)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        columns = sorted(equals)
+        where = ' AND '.join(f"{c} = ?" for c in columns) or '1'
+        return self._connection().execute(
+            f"SELECT COUNT(*) FROM {spec.name} WHERE {where}", [equals[c] for c in columns]
+        ).fetchone()[0]
+
+    def _select(self, spec: TableSpec, conditions: List[Tuple[str, tuple]], order_by: str,
+                limit: Optional[int]) -> List[dict]:
+        where = ' AND '.join(sql for sql, _ in conditions) or '1'
+        params = [p for _, values in conditions for p in values]
+        params.append(-1 if limit is None else limit)
+        cursor = self._connection().execute(
+            f"SELECT {', '.join(spec.columns)} FROM {spec.name} WHERE {where} ORDER BY {order_by} LIMIT ?",
+            params
+        )
+        return [self._to_dict(spec, values) for values in cursor]
+
+    def list_schedules(self, staff_id=None, date_from=None, date_to=None, after=None, limit=None):
+        conditions = []
+        if staff_id:
+            conditions.append(("staff_id = ?", (staff_id,)))
+        if date_from:
+            conditions.append(("schedule_date >= ?", (date_from,)))
+        if date_to:
+            conditions.append(("schedule_date <= ?", (date_to,)))
+        if after is not None:
+            conditions.append(("(schedule_date, id) > (?, ?)", tuple(after)))
+        return self._select(TABLES['schedules'], conditions, "schedule_date, id", limit)
+
+    def find_staff_by_line_user(self, line_user_id):
+        rows = self._select(TABLES['staff'], [("line_user_id = ?", (line_user_id,))], "id", 1)
+        return rows[0] if rows else None
+
+    def list_leave_requests(self, staff_id=None, status=None, date_from=None, date_to=None,
+                            after=None, limit=None):
+        conditions = []
+        if staff_id:
+            conditions.append(("staff_id = ?", (staff_id,)))
+        if status:
+            conditions.append(("status = ?", (status,)))
+        if date_from:
+            conditions.append(("start_date >= ?", (date_from,)))
+        if date_to:
+            conditions.append(("end_date <= ?", (date_to,)))
+        if after is not None:
+            conditions.append(("(start_date, id) > (?, ?)", tuple(after)))
+        return self._select(TABLES['leave_requests'], conditions, "start_date, id", limit)
+
+    def revision(self, *tables):
+        names = [_spec(t).name for t in tables or TABLES]
+        placeholders = ', '.join('?' for _ in names)
+        return self._connection().execute(
+            f"SELECT COALESCE(SUM(value), 0) FROM revisions WHERE name IN ({placeholders})", names
+        ).fetchone()[0]
+
+    def claim_key(self, key, ttl):
+        now = time.time()
+        conn = self._connection()
+        self._key_claims += 1
+        if self._key_claims % KEY_PURGE_INTERVAL == 0:
+            conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+        # 單一語句即為原子操作：新鍵或已過期的鍵才會回傳資料列
+        claimed = conn.execute(
+            "INSERT INTO idempotency_keys (key, expires_at) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at "
+            "WHERE idempotency_keys.expires_at <= ? RETURNING key",
+            (key, now + ttl, now)
+        ).fetchall()
+        return bool(claimed)
+
+    def release_key(self, key):
+        self._connection().execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_repository(backend: Optional[str] = None, **options) -> Repository:
+    """
+    建立資料存取層
+
+    Args:
+        backend: 'memory'、'sqlite' 或 'supabase'，預設讀取環境變數 STORAGE_BACKEND
+        options: SQLite 可指定 path（預設讀取環境變數 SQLITE_PATH）；
+            Supabase 可指定 url、api_key、max_concurrency 等 AsyncPostgRESTRepository 參數
+    """
+    backend = backend or os.getenv("STORAGE_BACKEND", "memory")
+    if backend == 'memory':
+        return InMemoryRepository(**options)
+    if backend == 'sqlite':
+        options.setdefault('path', os.getenv("SQLITE_PATH", DEFAULT_SQLITE_PATH))
+        return SQLiteRepository(**options)
+    if backend == 'supabase':
+        from storage.postgrest import AsyncPostgRESTRepository, BlockingRepository
+        options.setdefault('url', os.getenv("SUPABASE_URL"))
+        options.setdefault('api_key', os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY"))
+        options.setdefault('max_concurrency', int(os.getenv("SUPABASE_MAX_CONCURRENCY", "10")))
+        return BlockingRepository(AsyncPostgRESTRepository(**options))
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+後端測試共用設定
+以 backend 為匯入根目錄（與 uvicorn 從 backend 啟動時相同），
+並可匯入 scripts 中的本機測試伺服器（postgrest_stub 等）
+"""
+
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_HERE, '..'))
+sys.path.append(os.path.join(_HERE, '..', '..', 'scripts'))
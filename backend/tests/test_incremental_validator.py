@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量檢查器與完整檢查器的一致性：同一串隨機異動後兩者的違規相同
+"""
+
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+from scheduling.validator import IncrementalScheduleValidator, Schedule, ScheduleValidator, SchedulingRule, Staff
+
+RULES = [
+    SchedulingRule("1", "每班最少人數", "min_staff_per_shift", 2, ""),
+    SchedulingRule("2", "每月最少休息天數", "min_rest_days", 8, ""),
+    SchedulingRule("3", "每月最多工作時數", "max_monthly_hours", 120, ""),
+    SchedulingRule("4", "連續工作天數限制", "max_consecutive_days", 4, ""),
+]
+# 跨月份，連續工作區段與每月統計都會跨越月底
+BASE_DATE = date(2024, 1, 20)
+
+
+def _key(violation):
+    return (violation.schedule_id, violation.rule_id, violation.violation_type,
+            violation.description, violation.severity)
+
+
+def _counts(violations):
+    """
+    違規的多重集合；人數不足與重複排班所標記的排班 ID 取決於輸入順序，比較時略過
+    """
+    return Counter(
+        ('',) + _key(v)[1:] if v.violation_type in ('min_staff_violation', 'duplicate_schedule') else _key(v)
+        for v in violations
+    )
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_incremental_matches_full_validation(seed):
+    rnd = random.Random(seed)
+    staff = [Staff(str(i), f"E{i}", f"員工{i}", "brand_1", 160, rnd.choice([5, 8, 12])) for i in range(6)]
+
+    def random_schedule(schedule_id):
+        # 員工 ID 6 不在員工列表中，檢查未知員工的排班
+        return Schedule(schedule_id, str(rnd.randrange(7)), rnd.choice(["早班", "晚班"]),
+                        BASE_DATE + timedelta(days=rnd.randrange(25)), rnd.choice([8, 12]),
+                        rnd.choice(["scheduled"] * 5 + ["absent"]))
+
+    current = {f"s{i}": random_schedule(f"s{i}") for i in range(40)}
+    incremental = IncrementalScheduleValidator(staff, RULES)
+    incremental.load(list(current.values()))
+
+    for step in range(600):
+        before = Counter(map(_key, incremental.violations))
+        op = rnd.random()
+        if op < 0.4 or not current:
+            schedule = random_schedule(f"n{step}")
+            current[schedule.id] = schedule
+            delta = incremental.add(schedule)
+        elif op < 0.7:
+            schedule_id = rnd.choice(sorted(current))
+            del current[schedule_id]
+            delta = incremental.remove(schedule_id)
+        else:
+            schedule_id = rnd.choice(sorted(current))
+            current[schedule_id] = random_schedule(schedule_id)
+            delta = incremental.update(current[schedule_id])
+
+        full = ScheduleValidator().validate_schedule(list(current.values()), staff, RULES)
+        assert _counts(incremental.violations) == _counts(full), f"step {step}"
+        after = Counter(map(_key, incremental.violations))
+        assert Counter(map(_key, delta.appeared)) == after - before, f"step {step}"
+        assert Counter(map(_key, delta.cleared)) == before - after, f"step {step}"
+
+
+def test_rule_and_staff_changes_recompute_everything():
+    rnd = random.Random(7)
+    staff = [Staff(str(i), f"E{i}", f"員工{i}", "brand_1") for i in range(4)]
+    schedules = [Schedule(f"s{i}", str(i % 4), "早班", BASE_DATE + timedelta(days=rnd.randrange(20)), 12)
+                 for i in range(60)]
+    incremental = IncrementalScheduleValidator(staff, RULES)
+    incremental.load(schedules)
+
+    rules = [SchedulingRule("4", "連續工作天數限制", "max_consecutive_days", 2, "")]
+    incremental.set_rules(rules)
+    assert _counts(incremental.violations) == _counts(ScheduleValidator().validate_schedule(schedules, staff, rules))
+
+    staff = staff[:2]
+    incremental.set_staff(staff)
+    assert _counts(incremental.violations) == _counts(ScheduleValidator().validate_schedule(schedules, staff, rules))
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多起點排班搜尋：目標值下界成立，最佳結果與行程數無關
+"""
+
+import time
+
+import pytest
+
+from benchmark_roster import generate_problem
+from app.process_pool import create_process_pool
+from scheduling.multistart import Incumbent, generate_roster_multistart
+from scheduling.roster import RosterProblem, RosterSolver
+from scheduling.validator import SchedulingRule, Staff
+
+# (員工數, 每班最少人數)：(16, 3) 的各起點收斂到不同的缺額
+PROBLEMS = [(12, 2), (16, 3), (20, 4)]
+
+
+def _best(result):
+    return result.seed, result.best.objective, sorted(result.best.assignments)
+
+
+@pytest.mark.parametrize("size", PROBLEMS)
+def test_lower_bound_never_exceeds_final_objective(size):
+    problem = generate_problem(*size)
+    for seed in range(3):
+        solver = RosterSolver(problem, seed)
+        solver.construct()
+        bounds = [solver.lower_bound()]
+        for _ in range(5):
+            solver.improve(time.perf_counter() + 0.01)
+            bounds.append(solver.lower_bound())
+        solver.improve(time.perf_counter() + 10)
+        assert max(bounds) <= solver.objective() + 1e-6
+
+
+@pytest.mark.parametrize("size", PROBLEMS)
+def test_best_result_does_not_depend_on_worker_count(size):
+    problem = generate_problem(*size)
+    sequential = generate_roster_multistart(problem, seeds=range(6), time_budget=10, max_workers=1)
+    parallel = generate_roster_multistart(problem, seeds=range(6), time_budget=10, max_workers=4)
+    assert parallel.workers == 4
+    assert _best(parallel) == _best(sequential)
+
+
+def test_shared_pool_matches_sequential_search():
+    problem = generate_problem(16, 3)
+    sequential = generate_roster_multistart(problem, seeds=range(4), time_budget=10, max_workers=1)
+    pool = create_process_pool(max_workers=2)
+    try:
+        pooled = generate_roster_multistart(problem, seeds=range(4), time_budget=10, executor=pool)
+    finally:
+        pool.shutdown()
+    assert _best(pooled) == _best(sequential)
+
+
+def _capacity_limited_problem():
+    """可用時數不足以補滿缺額的小問題：各起點卡在不同的缺額，較差的起點會被放棄"""
+    limits = [(80, 15), (60, 8), (40, 15), (80, 15), (80, 15), (60, 8)]
+    staff = [Staff(f"s{i}", f"E{i}", f"員工{i}", "b", hours, rest) for i, (hours, rest) in enumerate(limits)]
+    rules = [
+        SchedulingRule("1", "最少人數", "min_staff_per_shift", 1, ""),
+        SchedulingRule("2", "最少休假", "min_rest_days", 8, ""),
+    ]
+    return RosterProblem(2026, 2, staff, rules, {"早班": 4, "全日班": 12, "晚班": 8})
+
+
+def test_abandoned_start_could_not_have_won():
+    problem = _capacity_limited_problem()
+    finals = {seed: RosterSolver(problem, seed).solve(5).objective for seed in range(6)}
+    incumbent = Incumbent()
+    incumbent.offer(min(finals.values()))
+    abandoned = 0
+    for seed, objective in finals.items():
+        result = RosterSolver(problem, seed).solve(5, incumbent)
+        if result.abandoned:
+            abandoned += 1
+            assert objective > incumbent.value
+        else:
+            assert result.objective == objective
+    assert abandoned > 0
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+個人排班快取：讀取資料存取層時不持有鎖，同一月份同時只讀取一次
+"""
+
+import threading
+from datetime import date
+
+from line_bot.my_schedule import MyScheduleCache
+from storage.repository import InMemoryRepository
+
+TODAY = date(2026, 11, 10)
+
+
+class _GatedRepository(InMemoryRepository):
+    """整月批次讀取排班時停在閘門前，直到測試放行"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.month_reads = 0
+
+    def list_schedules(self, staff_id=None, date_from=None, date_to=None, after=None, limit=None):
+        if staff_id is None:
+            self.month_reads += 1
+            self.entered.set()
+            assert self.gate.wait(10)
+        return super().list_schedules(staff_id, date_from, date_to, after, limit)
+
+
+def _repository():
+    repo = _GatedRepository()
+    repo.upsert("staff", [
+        {"id": f"staff_{i}", "employee_id": f"E{i:03d}", "name": f"員工{i}", "brand_id": "brand_1",
+         "line_user_id": f"U{i}", "monthly_available_hours": 160, "min_rest_days_per_month": 8, "is_active": True}
+        for i in (1, 2)
+    ])
+    repo.insert("schedules", {"id": None, "staff_id": "staff_1", "shift_type_id": "早班",
+                              "schedule_date": "2026-11-10", "status": "scheduled"})
+    return repo
+
+
+def _render_in_thread(cache, line_user_id, results):
+    thread = threading.Thread(target=lambda: results.__setitem__(line_user_id, cache.render(line_user_id, TODAY)))
+    thread.start()
+    return thread
+
+
+def test_month_load_does_not_hold_lock_and_runs_once():
+    repo = _repository()
+    cache = MyScheduleCache(repo)
+    results = {}
+    first = _render_in_thread(cache, "U1", results)
+    assert repo.entered.wait(10)
+
+    # 讀取進行中：其他操作不必等鎖，同月份的查詢等待同一次讀取
+    assert cache.metrics()["month_loads"] == 0
+    cache.invalidate("staff_2")
+    second = _render_in_thread(cache, "U2", results)
+    second.join(0.2)
+    assert second.is_alive()
+
+    repo.gate.set()
+    first.join(10)
+    second.join(10)
+    assert repo.month_reads == 1
+    assert "早班" in results["U1"] and "員工2" in results["U2"]
+    metrics = cache.metrics()
+    assert metrics["month_loads"] == 1
+    # 讀取期間異動的員工在換上快照後重新讀取
+    assert metrics["staff_refreshes"] == 1
+
+
+def test_expired_month_served_from_old_snapshot_while_reloading():
+    now = [0.0]
+    repo = _repository()
+    repo.gate.set()
+    cache = MyScheduleCache(repo, ttl=60, clock=lambda: now[0])
+    expected = cache.render("U1", TODAY)
+
+    repo.gate.clear()
+    repo.entered.clear()
+    now[0] = 120.0
+    results = {}
+    reloading = _render_in_thread(cache, "U1", results)
+    assert repo.entered.wait(10)
+    waiting = _render_in_thread(cache, "U2", results)
+    waiting.join(10)
+    assert not waiting.is_alive() and "員工2" in results["U2"]
+
+    repo.gate.set()
+    reloading.join(10)
+    assert results["U1"] == expected
+    assert repo.month_reads == 2
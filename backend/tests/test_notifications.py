@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推播通知 API：查詢參數驗證
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import AppConfig
+from app.factory import create_app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("PUSH_QUEUE_PATH", str(tmp_path / 'push_queue.db'))
+    app = create_app(AppConfig.profile("full", warm_up=False, line_channel_access_token="x",
+                                       line_channel_secret="y"))
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("params", [
+    {"year": 2026, "month": 13},
+    {"year": 2026, "month": 0},
+    {"year": 0, "month": 5},
+    {"year": 2026},
+])
+def test_roster_published_rejects_invalid_month(client, params):
+    response = client.post("/api/notifications/roster-published", params=params)
+    assert response.status_code == 422
+
+
+def test_roster_published_queues_nothing_without_recipients(client):
+    response = client.post("/api/notifications/roster-published",
+                           params={"year": 2026, "month": 12, "brand_id": "no_such_brand"})
+    assert response.status_code == 200
+    assert response.json() == {"year": 2026, "month": 12, "recipients": 0, "queued_requests": 0}
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Supabase (PostgREST) 存取層：以本機 PostgREST 測試伺服器驗證
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from postgrest_stub import PostgRESTStub, self_test
+from storage.repository import ConflictError
+from storage.postgrest import AsyncPostgRESTRepository
+
+
+class _TrackingTransport(httpx.AsyncBaseTransport):
+    """記錄進行中的請求數；本體含 slow 的請求延遲送達"""
+
+    def __init__(self, app):
+        self._inner = httpx.ASGITransport(app=app)
+        self.in_flight = 0
+
+    async def handle_async_request(self, request):
+        self.in_flight += 1
+        try:
+            if b'"slow' in request.content:
+                await asyncio.sleep(0.5)
+            return await self._inner.handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+
+def _staff(staff_id, employee_id):
+    return {"id": staff_id, "employee_id": employee_id, "name": staff_id, "is_active": True}
+
+
+def test_stub_self_test_passes():
+    assert asyncio.run(self_test())
+
+
+def test_failed_upsert_settles_every_batch_before_raising():
+    async def run():
+        stub = PostgRESTStub()
+        transport = _TrackingTransport(stub.app)
+        repository = AsyncPostgRESTRepository("http://stub", "test-key", batch_size=2, transport=transport)
+        rows = [
+            _staff("staff_1", "E001"), _staff("staff_2", "E001"),   # 第一批：員工編號重複
+            _staff("slow_1", "E101"), _staff("slow_2", "E102"),     # 第二批：延遲送達
+            _staff("fast_1", "E201"), _staff("fast_2", "E202"),     # 第三批：成功
+        ]
+        with pytest.raises(ConflictError):
+            await repository.upsert("staff", rows)
+        in_flight = transport.in_flight
+        await asyncio.sleep(0.6)
+        written = [row["id"] for row in await repository.list("staff")]
+        await repository.close()
+        return in_flight, written
+
+    in_flight, written = asyncio.run(run())
+    assert in_flight == 0
+    # 被取消的批次沒有寫入；已完成的批次保留（不是單一交易），第三批是否已完成取決於排程
+    assert set(written) <= {"fast_1", "fast_2"}
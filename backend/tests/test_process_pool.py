@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共用行程池：行程數與啟動方式
+"""
+
+import os
+
+import pytest
+
+from app.process_pool import create_process_pool, pool_workers
+
+
+@pytest.mark.parametrize("max_workers, env, expected", [
+    (3, None, 3),
+    (None, "2", 2),
+    (None, None, os.cpu_count() or 1),
+])
+def test_pool_workers_reports_configured_count(monkeypatch, max_workers, env, expected):
+    if env is None:
+        monkeypatch.delenv("WORKER_PROCESSES", raising=False)
+    else:
+        monkeypatch.setenv("WORKER_PROCESSES", env)
+    pool = create_process_pool(max_workers=max_workers)
+    try:
+        assert pool_workers(pool) == expected
+    finally:
+        pool.shutdown()
+
+
+def test_pool_runs_work_in_child_processes():
+    pool = create_process_pool(max_workers=2)
+    try:
+        assert pool.submit(os.getpid).result(timeout=60) != os.getpid()
+    finally:
+        pool.shutdown()
+
+
+def test_fork_start_method_is_rejected():
+    with pytest.raises(ValueError):
+        create_process_pool(start_method="fork")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料存取層契約：記憶體與 SQLite 實作對相同操作的結果一致
+"""
+
+import threading
+
+import pytest
+
+from storage.repository import ConflictError, InMemoryRepository, SQLiteRepository
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def repository(request, tmp_path):
+    repo = InMemoryRepository() if request.param == 'memory' else SQLiteRepository(str(tmp_path / 'test.db'))
+    repo.upsert("staff", [{"id": f"staff_{i}", "employee_id": f"E{i:03d}", "name": f"員工{i}", "is_active": True}
+                          for i in range(1, 4)])
+    yield repo
+    repo.close()
+
+
+def _schedule(schedule_id, staff_id, day, shift="早班"):
+    return {"id": schedule_id, "staff_id": staff_id, "shift_type_id": shift,
+            "schedule_date": f"2026-11-{day:02d}", "status": "scheduled"}
+
+
+def _ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_insert_rejects_duplicate_staff_day(repository):
+    repository.insert("schedules", _schedule(None, "staff_1", 1))
+    with pytest.raises(ConflictError):
+        repository.insert("schedules", _schedule(None, "staff_1", 1, "晚班"))
+    assert repository.count("schedules") == 1
+
+
+def test_upsert_rejects_duplicates_within_batch(repository):
+    revision = repository.revision("schedules")
+    with pytest.raises(ConflictError):
+        repository.upsert("schedules", [_schedule(None, "staff_1", 1), _schedule(None, "staff_1", 1, "晚班")])
+    assert repository.list_schedules() == []
+    assert repository.revision("schedules") == revision
+
+
+def test_upsert_rejects_duplicate_of_stored_row(repository):
+    repository.upsert("schedules", [_schedule("schedule_1", "staff_1", 1)])
+    with pytest.raises(ConflictError):
+        repository.upsert("schedules", [_schedule("schedule_2", "staff_2", 1), _schedule("schedule_3", "staff_1", 1)])
+    assert _ids(repository.list_schedules()) == ["schedule_1"]
+
+
+def test_upsert_applies_rows_in_order(repository):
+    repository.upsert("schedules", [_schedule("schedule_1", "staff_1", 1), _schedule("schedule_2", "staff_2", 1)])
+    # 先把 schedule_1 移到 2 日，schedule_3 才能使用 staff_1 的 1 日；同一個 ID 以最後一筆為準
+    repository.upsert("schedules", [
+        _schedule("schedule_1", "staff_1", 2),
+        _schedule("schedule_3", "staff_1", 1),
+        _schedule("schedule_2", "staff_2", 1, "晚班"),
+        _schedule("schedule_2", "staff_2", 3),
+    ])
+    rows = {row["id"]: row for row in repository.list_schedules()}
+    assert {k: (r["schedule_date"], r["shift_type_id"]) for k, r in rows.items()} == {
+        "schedule_1": ("2026-11-02", "早班"),
+        "schedule_2": ("2026-11-03", "早班"),
+        "schedule_3": ("2026-11-01", "早班"),
+    }
+
+
+def test_revision_counts_successful_writes(repository):
+    start = repository.revision("schedules")
+    created = repository.insert("schedules", _schedule(None, "staff_1", 1))
+    repository.upsert("schedules", [_schedule(None, "staff_2", 1), _schedule(None, "staff_3", 1)])
+    repository.update("schedules", created["id"], {**created, "status": "completed"})
+    assert repository.revision("schedules") == start + 3
+
+    assert repository.update("schedules", "missing", _schedule("missing", "staff_1", 5)) is None
+    assert repository.delete("schedules", "missing") is None
+    assert repository.revision("schedules") == start + 3
+
+    repository.delete("schedules", created["id"])
+    assert repository.revision("schedules") == start + 4
+    assert repository.revision("schedules", "staff") == start + 4 + repository.revision("staff")
+
+
+def test_list_pages_by_id(repository):
+    repository.upsert("staff", [{"id": "staff_0", "employee_id": "E000", "name": "員工0", "is_active": True}])
+    assert _ids(repository.list("staff")) == ["staff_0", "staff_1", "staff_2", "staff_3"]
+    assert _ids(repository.list("staff", after=("staff_1",), limit=2)) == ["staff_2", "staff_3"]
+    repository.delete("staff", "staff_2")
+    assert _ids(repository.list("staff", after=("staff_0",))) == ["staff_1", "staff_3"]
+
+
+def test_list_schedules_orders_by_date_then_id(repository):
+    repository.upsert("schedules", [_schedule("schedule_3", "staff_1", 2), _schedule("schedule_2", "staff_2", 2),
+                                    _schedule("schedule_1", "staff_3", 5)])
+    assert _ids(repository.list_schedules()) == ["schedule_2", "schedule_3", "schedule_1"]
+    assert _ids(repository.list_schedules(date_from="2026-11-02", date_to="2026-11-02",
+                                          after=("2026-11-02", "schedule_2"))) == ["schedule_3"]
+    assert _ids(repository.list_schedules(staff_id="staff_3")) == ["schedule_1"]
+
+
+def test_claim_key_once_per_ttl(repository):
+    assert repository.claim_key("line:evt-1", 60)
+    assert not repository.claim_key("line:evt-1", 60)
+    assert repository.claim_key("line:evt-2", -1) and repository.claim_key("line:evt-2", 60)
+    repository.release_key("line:evt-1")
+    assert repository.claim_key("line:evt-1", 60)
+
+
+def test_close_after_reads_from_other_threads(repository):
+    thread = threading.Thread(target=repository.list_schedules)
+    thread.start()
+    thread.join()
+    repository.close()
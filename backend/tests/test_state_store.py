@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+對話狀態儲存：到期、容量上限、跨執行緒使用與關閉
+"""
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from line_bot import state_store
+from line_bot.state_store import MemoryStateStore, SQLiteStateStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    store = MemoryStateStore() if request.param == 'memory' else SQLiteStateStore(str(tmp_path / 'states.db'))
+    yield store
+    store.close()
+
+
+def test_set_get_delete_returns_copies(store):
+    store.set("U1", {"step": "leave_date", "dates": ["2026-11-02"]})
+    state = store.get("U1")
+    state["dates"].append("2026-11-03")
+    assert store.get("U1") == {"step": "leave_date", "dates": ["2026-11-02"]}
+    assert "U1" in store and "U2" not in store
+    store.delete("U1")
+    assert store.get("U1") is None
+
+
+def test_expired_state_is_gone(store):
+    store.set("U1", {"step": "leave_date"}, ttl=-1)
+    store.set("U2", {"step": "leave_date"})
+    assert store.get("U1") is None
+    assert store.get("U2") is not None
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryStateStore(max_entries=2)
+    store.set("U1", {})
+    store.set("U2", {})
+    store.get("U1")
+    store.set("U3", {})
+    assert store.get("U2") is None and store.get("U1") == {} and store.get("U3") == {}
+    assert store.metrics()["evicted"] == 1
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'states.db')
+    first, second = SQLiteStateStore(path), SQLiteStateStore(path)
+    first.set("U1", {"step": "leave_reason"})
+    assert second.get("U1") == {"step": "leave_reason"}
+    first.close()
+    second.close()
+
+
+def test_sqlite_sweep_counts_writes_from_all_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, "SWEEP_INTERVAL", 50)
+    store = SQLiteStateStore(str(tmp_path / 'states.db'), max_entries=10)
+
+    def write(worker):
+        for i in range(100):
+            store.set(f"U{worker}-{i}", {"i": i})
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store._writes == 400
+    # 最後一次寫入恰好觸發清除，只保留最新的 max_entries 筆
+    assert store.metrics()["entries"] == 10
+    store.close()
+
+
+def test_app_shutdown_closes_sqlite_state_store(tmp_path, monkeypatch):
+    from app.config import AppConfig
+    from app.factory import create_app
+
+    monkeypatch.setenv("STATE_STORE", "sqlite")
+    monkeypatch.setenv("STATE_STORE_PATH", str(tmp_path / 'states.db'))
+    app = create_app(AppConfig.profile("full", warm_up=False))
+    with TestClient(app):
+        store = app.state.subsystems.get("state_store")
+        thread = threading.Thread(target=store.set, args=("U1", {"step": "leave_date"}))
+        thread.start()
+        thread.join()
+        assert store._connections
+    assert store._connections == []
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班規則檢查器：每月休息天數與工作時數（經由 validate_schedule）
+"""
+
+from datetime import date, timedelta
+
+from benchmark_validator import generate_data, time_monthly_checks
+from scheduling.validator import Schedule, SchedulingRule, ScheduleValidator, Staff
+
+RULES = [
+    SchedulingRule("1", "每月最少休息天數", "min_rest_days", 8, ""),
+    SchedulingRule("2", "每月最多工作時數", "max_monthly_hours", 200, ""),
+]
+
+
+def _work(staff_id, first, days, hours=8):
+    return [Schedule(f"{staff_id}_{first:%m}_{n}", staff_id, "全日班", first + timedelta(days=n), hours)
+            for n in range(days)]
+
+
+def _monthly(violations):
+    return sorted((v.violation_type, v.description) for v in violations)
+
+
+def test_monthly_checks_report_each_staff_month():
+    staff = [Staff(f"staff_{i}", f"E{i}", f"員工{i}", "brand_1", 160, rest) for i, rest in enumerate((8, 8, 10))]
+    schedules = (
+        _work("staff_0", date(2024, 2, 1), 22)                  # 2月 29 天：休 7 天、176 小時
+        + _work("staff_1", date(2024, 3, 1), 21, hours=10)      # 3月：休 10 天、210 小時
+        + _work("staff_2", date(2024, 4, 1), 21)                # 4月：休 9 天，低於本人的 10 天
+        + _work("staff_2", date(2024, 5, 1), 21)                # 5月：休 10 天
+    )
+    schedules.append(Schedule("cancelled", "staff_0", "早班", date(2024, 2, 25), 8, status='cancelled'))
+
+    violations = ScheduleValidator().validate_schedule(schedules, staff, RULES)
+    assert _monthly(violations) == [
+        ("excessive_working_hours", "員工1 在 2024年3月 工作時數 210 小時，超過規定的 200 小時"),
+        ("insufficient_rest_days", "員工0 在 2024年2月 只休息 7 天，少於規定的 8 天"),
+        ("insufficient_rest_days", "員工2 在 2024年4月 只休息 9 天，少於規定的 10 天"),
+    ]
+
+
+def test_benchmark_data_passes_monthly_checks():
+    staff_list, schedules, rules = generate_data(50)
+    assert ScheduleValidator().validate_schedule(schedules, staff_list, rules) == []
+    assert time_monthly_checks(staff_list, schedules, rules, repeat=1) > 0
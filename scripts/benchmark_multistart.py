@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多起點平行排班搜尋效能測試
+以 benchmark_roster 的整月問題，用相同的 seeds 在不同行程數下執行多起點搜尋，
+列出各行程數的最佳/平均目標值與耗時，並驗證最佳結果與行程數無關、不比單一起點差
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from benchmark_roster import MIN_STAFF_PER_SHIFT, STAFF_COUNT, generate_problem
+from scheduling.multistart import generate_roster_multistart
+from scheduling.roster import generate_roster
+
+STARTS = 8
+WORKER_COUNTS = (1, 2, 4)
+# 全店專櫃數，用來估計整月批次的耗時
+COUNTERS = 300
+
+
+def main():
+    """主程式 - 執行多起點搜尋效能測試"""
+    parser = argparse.ArgumentParser(description="多起點平行排班搜尋效能測試")
+    parser.add_argument("--staff", type=int, default=STAFF_COUNT, help="員工人數")
+    parser.add_argument("--min-staff", type=int, default=MIN_STAFF_PER_SHIFT, help="每班最少人數")
+    parser.add_argument("--starts", type=int, default=STARTS, help="起點數")
+    parser.add_argument("--workers", type=int, nargs="+", default=list(WORKER_COUNTS), help="要比較的行程數")
+    parser.add_argument("--budget", type=float, default=1.5, help="每個起點的時間預算（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="問題資料的亂數種子")
+    args = parser.parse_args()
+
+    print("=== 多起點平行排班搜尋效能測試 ===")
+    print(f"• {args.staff} 人，每班 {args.min_staff} 人，{args.starts} 個起點，CPU 核心 {os.cpu_count()}")
+    problem = generate_problem(args.staff, args.min_staff, args.seed)
+
+    started = time.perf_counter()
+    single = generate_roster(problem, time_budget=args.budget, seed=0)
+    single_elapsed = time.perf_counter() - started
+    print(f"• 單一起點 (seed 0)：目標值 {single.objective}，{single_elapsed * 1000:.0f} ms")
+
+    print(f"\n{'行程數':>6} {'最佳目標值':>12} {'平均目標值':>12} {'放棄':>4} {'耗時 ms':>9} {'加速':>6} {'300 櫃估計':>10}")
+    runs = []
+    for workers in args.workers:
+        result = generate_roster_multistart(problem, seeds=range(args.starts),
+                                            time_budget=args.budget, max_workers=workers)
+        summary = result.summary()
+        runs.append(result)
+        speedup = runs[0].elapsed / result.elapsed
+        print(f"{result.workers:>9} {summary['best_objective']:>16} {summary['mean_objective']:>16} "
+              f"{summary['abandoned']:>6} {summary['elapsed_ms']:>10.0f} {speedup:>7.2f}x "
+              f"{result.elapsed * COUNTERS / 60:>10.1f} 分")
+
+    failed = False
+    reference = runs[0]
+    for result in runs[1:]:
+        if (result.seed, result.best.assignments) != (reference.seed, reference.best.assignments):
+            print(f"❌ {result.workers} 個行程的最佳結果與 {reference.workers} 個行程不同")
+            failed = True
+    if reference.best.objective > single.objective:
+        print("❌ 多起點的最佳結果比單一起點差")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"\n✅ 各行程數的最佳結果相同（seed {reference.seed}，目標值 {reference.best.objective}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自動排班引擎效能測試
+以 40 人、3 個班別、31 天的專櫃產生整月排班，驗證在時間上限內完成、
+各班人數補足且產生的排班通過規則檢查器；
+再讓一位員工請假 3 天，驗證局部重排在時間上限內完成、只異動少量排班
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from scheduling.availability import popcount
+from scheduling.roster import RosterProblem, RosterResult, generate_roster, repair_roster
+from scheduling.shifts import SHIFT_TYPES
+from scheduling.validator import Staff, SchedulingRule, ScheduleValidator
+
+STAFF_COUNT = 40
+YEAR, MONTH = 2026, 1  # 31 天
+# 每班最少人數：3 班共需 6 × 28 = 168 小時 / 天，約為全體可用時數的 81%
+MIN_STAFF_PER_SHIFT = 6
+# 整個求解（含貪婪建構）的時間上限
+MAX_SECONDS = 2.0
+# 核准請假後局部重排的時間上限與請假天數
+MAX_REPAIR_SECONDS = 0.5
+REPAIR_LEAVE_DAYS = 3
+
+
+def generate_problem(staff_count: int, min_staff: int, seed: int = 0) -> RosterProblem:
+    """產生指定人數的單一專櫃排班問題，約一成員工有 1–3 天已核准請假"""
+    rng = random.Random(seed)
+    staff_list = [
+        Staff(f"staff_{i}", f"E{i:04d}", f"員工{i}", "brand_1", 160, 8)
+        for i in range(staff_count)
+    ]
+    rules = [
+        SchedulingRule("1", "每班最少人數", "min_staff_per_shift", min_staff, f"每個班次至少需要{min_staff}名員工"),
+        SchedulingRule("2", "每月最少休息天數", "min_rest_days", 8, "每位員工每月至少休息8天"),
+        SchedulingRule("3", "每月最多工作時數", "max_monthly_hours", 200, "每位員工每月最多工作200小時"),
+        SchedulingRule("4", "最多連續工作天數", "max_consecutive_days", 6, "不可連續工作超過6天"),
+    ]
+    leave_days = {}
+    for staff in rng.sample(staff_list, max(1, staff_count // 10)):
+        start = rng.randint(1, 27)
+        leave_days[staff.id] = {date(YEAR, MONTH, start + n) for n in range(rng.randint(1, 3))}
+    shift_hours = {shift_id: shift["duration_hours"] for shift_id, shift in SHIFT_TYPES.items()}
+    return RosterProblem(YEAR, MONTH, staff_list, rules, shift_hours, leave_days=leave_days)
+
+
+def main():
+    """主程式 - 執行排班引擎效能測試"""
+    parser = argparse.ArgumentParser(description="自動排班引擎效能測試")
+    parser.add_argument("--staff", type=int, default=STAFF_COUNT, help="員工人數")
+    parser.add_argument("--min-staff", type=int, default=MIN_STAFF_PER_SHIFT, help="每班最少人數")
+    parser.add_argument("--budget", type=float, default=1.5, help="區域搜尋時間預算（秒）")
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS, help="總耗時上限（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("=== 自動排班引擎效能測試 ===")
+    problem = generate_problem(args.staff, args.min_staff, args.seed)
+    started = time.perf_counter()
+    result = generate_roster(problem, time_budget=args.budget, seed=args.seed)
+    elapsed = time.perf_counter() - started
+
+    shift_hours = problem.shift_hours
+    schedules = result.to_schedules(shift_hours)
+    violations = ScheduleValidator().validate_schedule(schedules, problem.staff, problem.rules)
+    month_calendar = result.to_calendar(problem)
+    on_leave = sum(popcount(worked & leave) for worked, leave in zip(month_calendar.worked, month_calendar.leave))
+    longest = max(month_calendar.longest_run(s.id) for s in problem.staff)
+    hours = sorted(result.hours.values())
+
+    print(f"• {args.staff} 人 × {len(shift_hours)} 班 × {problem.days} 天，每班 {args.min_staff} 人")
+    print(f"• 耗時 {elapsed * 1000:.0f} ms（上限 {args.max_seconds * 1000:.0f} ms），"
+          f"區域搜尋 {result.iterations} 步")
+    print(f"• 排班 {len(result.assignments)} 筆，缺額 {sum(result.shortfall.values())} 人次，"
+          f"目標值 {result.objective}")
+    print(f"• 每人工時 {hours[0]}–{hours[-1]} 小時（平均 {sum(hours) / len(hours):.1f}）")
+    print(f"• 最長連續上班 {longest} 天，規則違規 {len(violations)} 筆，排在請假日 {on_leave} 筆")
+
+    failed = False
+    if elapsed > args.max_seconds:
+        print("❌ 超過時間上限")
+        failed = True
+    if not result.is_complete:
+        print("❌ 仍有班別人數不足")
+        failed = True
+    if violations or on_leave:
+        for violation in violations[:5]:
+            print(f"   {violation.description}")
+        print("❌ 產生的排班違反規則")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ 時間上限內產生符合規則的整月排班")
+
+    print("\n=== 核准請假後局部重排 ===")
+    # 產生的排班改為固定，請假員工前後一週內的排班可調整
+    staff_id = result.assignments[0][0]
+    leave_first = next(day for sid, day, _ in result.assignments if sid == staff_id and day.day <= 20)
+    leave = {leave_first + timedelta(days=n) for n in range(REPAIR_LEAVE_DAYS)}
+    window = timedelta(days=7)
+    in_window = lambda a: leave_first - window <= a[1] <= max(leave) + window
+    movable = [a for a in result.assignments if in_window(a)]
+    problem.fixed = [a for a in result.assignments if not in_window(a)]
+    problem.leave_days.setdefault(staff_id, set()).update(leave)
+
+    started = time.perf_counter()
+    repair = repair_roster(problem, movable, seed=args.seed)
+    repair_elapsed = time.perf_counter() - started
+
+    repaired = (set(result.assignments) - set(repair.removed)) | set(repair.added)
+    lost = sum(1 for sid, day, _ in result.assignments if sid == staff_id and day in leave)
+    repaired_result = RosterResult(assignments=sorted(repaired, key=lambda a: (a[1], a[0])), shortfall={},
+                                   hours={}, objective=0, iterations=0, elapsed=0)
+    schedules = repaired_result.to_schedules(shift_hours)
+    violations = ScheduleValidator().validate_schedule(schedules, problem.staff, problem.rules)
+    on_leave = sum(1 for sid, day, _ in repaired if day in problem.leave_days.get(sid, ()))
+
+    print(f"• {staff_id} 請假 {min(leave)}–{max(leave)}，空出 {lost} 個班")
+    print(f"• 耗時 {repair_elapsed * 1000:.1f} ms（上限 {MAX_REPAIR_SECONDS * 1000:.0f} ms），"
+          f"異動 {repair.changes} 筆（刪除 {len(repair.removed)}、新增 {len(repair.added)}）")
+    print(f"• 缺額 {sum(repair.shortfall.values())} 人次，規則違規 {len(violations)} 筆，排在請假日 {on_leave} 筆")
+
+    if repair_elapsed > MAX_REPAIR_SECONDS:
+        print("❌ 局部重排超過時間上限")
+        failed = True
+    if repair.shortfall or violations or on_leave:
+        for violation in violations[:5]:
+            print(f"   {violation.description}")
+        print("❌ 局部重排後的排班不符合規則")
+        failed = True
+    if repair.changes > 4 * lost:
+        print("❌ 局部重排異動過多")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ 局部重排只補回請假空出的班")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班規則檢查器效能測試
+驗證每月休息天數與工作時數檢查隨員工人數線性成長
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from scheduling.validator import Staff, Schedule, SchedulingRule, ScheduleValidator
+
+
+STAFF_SIZES = [100, 1000, 10000]
+# 每位員工每月排班天數（全年資料）
+DAYS_PER_MONTH = 4
+# 最大規模與最小規模的「每位員工耗時」比值上限，超過即視為非線性
+MAX_SCALING_RATIO = 3.0
+
+
+def generate_data(staff_count: int, year: int = 2024):
+    """產生指定人數、一整年的排班資料"""
+    staff_list = [
+        Staff(f"staff_{i}", f"E{i:05d}", f"員工{i}", f"brand_{i % 20}", 160, 8)
+        for i in range(staff_count)
+    ]
+
+    schedules = []
+    for i, staff in enumerate(staff_list):
+        for month in range(1, 13):
+            first_day = date(year, month, 1)
+            for n in range(DAYS_PER_MONTH):
+                schedule_date = first_day + timedelta(days=(i + n * 7) % 28)
+                schedules.append(Schedule(
+                    f"s_{i}_{month}_{n}", staff.id, "早班" if n % 2 else "晚班", schedule_date, 8
+                ))
+
+    rules = [
+        SchedulingRule("1", "每月最少休息天數", "min_rest_days", 8, "每位員工每月至少休息8天"),
+        SchedulingRule("2", "每月最多工作時數", "max_monthly_hours", 200, "每位員工每月最多工作200小時"),
+    ]
+    return staff_list, schedules, rules
+
+
+def time_monthly_checks(staff_list, schedules, rules, repeat: int = 3) -> float:
+    """
+    回傳每月規則檢查的最佳耗時（秒）
+
+    經由 validate_schedule 執行；rules 只有每月休息天數與工作時數，
+    其他規則的檢查直接略過（重複排班檢查仍會執行，同樣是線性）
+    """
+    validator = ScheduleValidator()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        validator.validate_schedule(schedules, staff_list, rules)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """主程式 - 執行線性擴展效能測試"""
+    parser = argparse.ArgumentParser(description="排班規則檢查器效能測試")
+    parser.add_argument("--sizes", type=int, nargs="+", default=STAFF_SIZES, help="員工人數規模")
+    parser.add_argument("--max-ratio", type=float, default=MAX_SCALING_RATIO, help="每人耗時比值上限")
+    args = parser.parse_args()
+
+    print("=== 排班規則檢查器效能測試 ===")
+    per_staff = {}
+    for size in args.sizes:
+        staff_list, schedules, rules = generate_data(size)
+        elapsed = time_monthly_checks(staff_list, schedules, rules)
+        per_staff[size] = elapsed / size
+        print(f"• {size:>6} 人 / {len(schedules):>7} 筆排班：{elapsed * 1000:8.1f} ms "
+              f"（每人 {per_staff[size] * 1e6:.2f} µs）")
+
+    smallest, largest = min(args.sizes), max(args.sizes)
+    ratio = per_staff[largest] / per_staff[smallest]
+    print(f"\n每人耗時比值 ({largest} / {smallest} 人)：{ratio:.2f}（上限 {args.max_ratio}）")
+
+    if ratio > args.max_ratio:
+        print("❌ 檢查耗時未隨人數線性成長")
+        sys.exit(1)
+    print("✅ 檢查耗時隨人數線性成長")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LINE Webhook 路徑效能測試
+比較原本的流程與 LineSignatureMiddleware（直接對原始位元組計算 HMAC、只解析一次）：
+- SDK 路徑：main.py 原本交給 line-bot-sdk 解碼本體、重新編碼計算 HMAC、再解析 JSON
+- dict 路徑：獨立版 LINE 主程式原本在路由中讀取本體、計算 HMAC 並解析 JSON
+計時僅供比較；簽名錯誤與過大本體的處理不符預期時以非零狀態結束
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import asyncio
+import argparse
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from fastapi import FastAPI, HTTPException, Request
+# 原本 main.py 使用 line-bot-sdk 的 v2 相容 API，匯入時會發出棄用警告
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+from linebot import WebhookParser
+from linebot.models import MessageEvent
+
+from line_bot.signature import LineSignatureMiddleware, compute_signature
+
+SECRET = "benchmark-channel-secret"
+EVENT_COUNTS = [1, 10, 100]
+
+
+def build_payload(event_count: int) -> bytes:
+    events = [{
+        "type": "message", "mode": "active", "timestamp": 1700000000000 + i,
+        "source": {"type": "user", "userId": f"U{i:032d}"},
+        "webhookEventId": f"01H{i:023d}", "deliveryContext": {"isRedelivery": False},
+        "replyToken": f"{i:032x}",
+        "message": {"type": "text", "id": str(10 ** 12 + i), "text": f"我的排班 {i}"},
+    } for i in range(event_count)]
+    return json.dumps({"destination": "U" + "0" * 32, "events": events}, ensure_ascii=False).encode("utf-8")
+
+
+def legacy_sdk_app() -> FastAPI:
+    """原本 main.py：await request.body() 後交給 line-bot-sdk 解碼、驗證並解析"""
+    app = FastAPI()
+    parser = WebhookParser(SECRET)
+
+    @app.post("/webhook/line")
+    async def webhook(request: Request):
+        body = await request.body()
+        events = parser.parse(body.decode("utf-8"), request.headers.get("X-Line-Signature", ""))
+        return {"events": len(events)}
+    return app
+
+
+def middleware_sdk_app() -> FastAPI:
+    """現在 main.py：中介層驗證並解析，路由直接由 dict 建立事件物件"""
+    app = FastAPI()
+    app.add_middleware(LineSignatureMiddleware, channel_secret=SECRET)
+
+    @app.post("/webhook/line")
+    async def webhook(request: Request):
+        events = [MessageEvent.new_from_json_dict(e) for e in request.state.line_payload["events"]]
+        return {"events": len(events)}
+    return app
+
+
+def legacy_dict_app() -> FastAPI:
+    """原本的獨立版主程式：路由中讀取本體、計算 HMAC 後解析 JSON"""
+    app = FastAPI()
+
+    @app.post("/webhook/line")
+    async def webhook(request: Request):
+        body = await request.body()
+        signature = compute_signature(SECRET, body)
+        if not hmac.compare_digest(signature, request.headers.get("X-Line-Signature", "")):
+            raise HTTPException(status_code=400, detail="Invalid signature")
+        return {"events": len(json.loads(body).get("events", []))}
+    return app
+
+
+def middleware_dict_app() -> FastAPI:
+    """現在的獨立版主程式：直接使用中介層解析好的 payload"""
+    app = FastAPI()
+    app.add_middleware(LineSignatureMiddleware, channel_secret=SECRET)
+
+    @app.post("/webhook/line")
+    async def webhook(request: Request):
+        return {"events": len(request.state.line_payload.get("events", []))}
+    return app
+
+
+async def call(app, body: bytes, signature: str, content_length: int = None) -> tuple:
+    """直接以 ASGI 介面呼叫（不經過網路與 HTTP 客戶端）；回傳 (狀態碼, receive 呼叫次數)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/webhook/line", "raw_path": b"/webhook/line", "query_string": b"",
+        "root_path": "", "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 80),
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(content_length or len(body)).encode("ascii")),
+                    (b"x-line-signature", signature.encode("ascii"))],
+    }
+    status, receives = None, 0
+
+    async def receive():
+        nonlocal receives
+        receives += 1
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status, receives
+
+
+async def time_requests(app, body: bytes, signature: str, iterations: int) -> float:
+    """回傳每個請求的最佳平均耗時（秒）"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            status, _ = await call(app, body, signature)
+            assert status == 200, status
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best
+
+
+async def run(args) -> bool:
+    ok = True
+    for label, legacy, middleware in (("SDK 路徑", legacy_sdk_app(), middleware_sdk_app()),
+                                      ("dict 路徑", legacy_dict_app(), middleware_dict_app())):
+        print(f"\n{label}")
+        for count in args.events:
+            body = build_payload(count)
+            signature = compute_signature(SECRET, body)
+            iterations = max(20, args.iterations // count)
+            before = await time_requests(legacy, body, signature, iterations)
+            after = await time_requests(middleware, body, signature, iterations)
+            print(f"• {count:>4} 個事件 ({len(body) / 1024:6.1f} KB)：原本 {before * 1e6:8.1f} µs → "
+                  f"中介層 {after * 1e6:8.1f} µs（{after / before:.2f}x）")
+    print()
+
+    middleware = middleware_dict_app()
+    # 宣告的長度超過上限時，不應讀取本體
+    status, receives = await call(middleware, b"", "x", content_length=50 * 1024 * 1024)
+    rejected = status == 413 and receives == 0
+    ok = ok and rejected
+    print(f"{'✅' if rejected else '❌'} 50 MB 本體在讀取前即回應 413（receive 呼叫 {receives} 次）")
+
+    status, _ = await call(middleware, build_payload(1), "invalid")
+    ok = ok and status == 400
+    print(f"{'✅' if status == 400 else '❌'} 簽名錯誤回應 400")
+    return ok
+
+
+def main():
+    """主程式 - 執行 Webhook 路徑效能測試"""
+    parser = argparse.ArgumentParser(description="LINE Webhook 路徑效能測試")
+    parser.add_argument("--events", type=int, nargs="+", default=EVENT_COUNTS, help="每個請求的事件數")
+    parser.add_argument("--iterations", type=int, default=1000, help="單一事件請求的重複次數")
+    args = parser.parse_args()
+
+    print("=== LINE Webhook 路徑效能測試 ===")
+    if not asyncio.run(run(args)):
+        print("❌ 中介層未達到預期")
+        sys.exit(1)
+    print("✅ 中介層驗證與拒絕行為正確")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本機 LINE Messaging API 測試伺服器
+模擬 push / multicast / reply，可依比例注入 429、5xx 與「已接受但回應遺失」，
+並依 X-Line-Retry-Key 去重；以 --self-test 驗證推播佇列的限速與重試
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from line_bot.client import AsyncLineClient
+from line_bot.push_queue import PushJournal, PushQueue
+
+
+class LineAPIStub:
+    """記錄實際送達的訊息；同一個 retry key 只送達一次"""
+
+    def __init__(self, throttle_rate: float = 0.0, error_rate: float = 0.0,
+                 lost_response_rate: float = 0.0, seed: int = 0):
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.lost_response_rate = lost_response_rate
+        self._random = random.Random(seed)
+        self.accepted_keys = {}          # retry key -> request id
+        self.delivered = Counter()       # 收件者 -> 送達則數
+        self.accepted_at = []            # 每次接受請求的時間 (monotonic)
+        self.status_counts = Counter()
+        self.app = Starlette(routes=[
+            Route('/v2/bot/message/{kind}', self.handle, methods=['POST'])
+        ])
+
+    def _respond(self, status: int, body: dict, headers=None) -> JSONResponse:
+        self.status_counts[status] += 1
+        return JSONResponse(body, status_code=status, headers=headers)
+
+    async def handle(self, request: Request) -> JSONResponse:
+        kind = request.path_params['kind']
+        payload = json.loads(await request.body())
+        retry_key = request.headers.get('X-Line-Retry-Key')
+
+        if retry_key and retry_key in self.accepted_keys:
+            return self._respond(409, {"message": "The retry key is already accepted"},
+                                 {"x-line-accepted-request-id": self.accepted_keys[retry_key]})
+
+        roll = self._random.random()
+        if roll < self.throttle_rate:
+            return self._respond(429, {"message": "The API rate limit has been exceeded. Try again later."})
+        roll -= self.throttle_rate
+        if roll < self.error_rate:
+            return self._respond(500, {"message": "Internal server error"})
+        roll -= self.error_rate
+
+        recipients = payload['to'] if kind == 'multicast' else [payload.get('to', payload.get('replyToken'))]
+        for to in recipients:
+            self.delivered[to] += len(payload['messages'])
+        request_id = f"req-{len(self.accepted_at)}"
+        if retry_key:
+            self.accepted_keys[retry_key] = request_id
+        self.accepted_at.append(time.monotonic())
+
+        if roll < self.lost_response_rate:
+            # 已送達但回應遺失：客戶端會以同一個 retry key 重試
+            return self._respond(502, {"message": "Bad gateway"})
+        return self._respond(200, {}, {"x-line-request-id": request_id})
+
+
+def _max_per_window(timestamps, window: float = 1.0) -> int:
+    ordered, best, start = sorted(timestamps), 0, 0
+    for end, t in enumerate(ordered):
+        while t - ordered[start] > window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+async def self_test() -> bool:
+    """以 ASGI transport 對測試伺服器執行推播佇列"""
+    stub = LineAPIStub(throttle_rate=0.2, error_rate=0.05, lost_response_rate=0.05, seed=1)
+    client = AsyncLineClient("test-token", base_url="http://stub/v2/bot",
+                             transport=httpx.ASGITransport(app=stub.app))
+    ok = True
+
+    def check(name, passed):
+        nonlocal ok
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} {name}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "push_queue.db")
+        rate = 300
+
+        # 先寫入日誌但不啟動 worker，模擬行程重啟後由新的佇列送出
+        journal = PushJournal(path)
+        staff = [f"U{i:04d}" for i in range(2000)]
+        roster = [(user, [{"type": "text", "text": "2024年05月班表已公布"}]) for user in staff]
+        roster_jobs = PushQueue(journal, client).enqueue_pushes(roster)
+        journal.close()
+        check("班表公布 2000 人合併為 4 個 Multicast", roster_jobs == 4)
+
+        queue = PushQueue(PushJournal(path), client, rate=rate, workers=8,
+                          base_delay=0.02, max_delay=0.2, max_attempts=20)
+        await queue.start()
+        reminders = [(user, [{"type": "text", "text": f"提醒 {user}"}]) for user in staff[:600]]
+        jobs = roster_jobs + queue.enqueue_pushes(reminders)
+
+        started = time.monotonic()
+        while queue.journal.counts().keys() - {'sent', 'failed'}:
+            await asyncio.sleep(0.05)
+            if time.monotonic() - started > 60:
+                break
+        elapsed = time.monotonic() - started
+        await queue.stop()
+
+        counts = queue.journal.counts()
+        print(f"   {jobs} 個請求，{elapsed:.2f} 秒；回應狀態 {dict(stub.status_counts)}")
+        check("所有工作皆已送出", counts == {'sent': jobs})
+        check("每位員工恰好收到一次公布通知與一次提醒",
+              all(stub.delivered[u] == (2 if i < 600 else 1) for i, u in enumerate(staff)))
+        check("遇到 429 / 5xx 後重試", stub.status_counts[429] > 0 and queue.retried > 0)
+        check("回應遺失時以 retry key 避免重複傳送 (409)", stub.status_counts[409] > 0)
+        check(f"每秒送出不超過 {rate} + bucket 容量",
+              _max_per_window(stub.accepted_at) <= rate + queue.bucket.capacity)
+        queue.journal.close()
+
+    await client.close()
+    return ok
+
+
+def main():
+    """主程式 - 啟動測試伺服器或執行自我測試"""
+    parser = argparse.ArgumentParser(description="本機 LINE Messaging API 測試伺服器")
+    parser.add_argument("--self-test", action="store_true", help="對測試伺服器執行推播佇列測試")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--throttle-rate", type=float, default=0.1, help="回應 429 的比例")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="回應 500 的比例")
+    args = parser.parse_args()
+
+    if args.self_test:
+        print("=== LINE 推播佇列自我測試 ===")
+        if not asyncio.run(self_test()):
+            sys.exit(1)
+        return
+
+    import uvicorn
+    print(f"🚀 LINE API 測試伺服器：LINE_API_BASE=http://{args.host}:{args.port}/v2/bot")
+    stub = LineAPIStub(throttle_rate=args.throttle_rate, error_rate=args.error_rate)
+    uvicorn.run(stub.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本機 PostgREST 相容測試伺服器
+實作排班系統用到的 PostgREST 子集合（篩選、排序、Range 分頁、批次 upsert、資料版本號），
+可用 uvicorn 啟動，或以 --self-test 驗證 Supabase 存取層
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from storage.repository import TABLES, ConflictError, InMemoryRepository
+from storage.postgrest import KEYS_TABLE, REVISIONS_TABLE, AsyncPostgRESTRepository
+
+_OPERATORS = {
+    'eq': lambda a, b: a == b,
+    'neq': lambda a, b: a != b,
+    'gt': lambda a, b: a > b,
+    'gte': lambda a, b: a >= b,
+    'lt': lambda a, b: a < b,
+    'lte': lambda a, b: a <= b,
+}
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return value
+
+
+def _split_top_level(text: str):
+    """以最外層的逗號切開（忽略括號與雙引號內的逗號）"""
+    parts, depth, quoted, start, i = [], 0, False, 0, 0
+    while i < len(text):
+        ch = text[i]
+        if quoted:
+            if ch == '\\':
+                i += 1
+            elif ch == '"':
+                quoted = False
+        elif ch == '"':
+            quoted = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _parse_condition(text: str):
+    """'col.op.value'、'and(...)' 或 'or(...)' -> 判斷函式"""
+    for name, combine in (('and', all), ('or', any)):
+        if text.startswith(name + '('):
+            children = [_parse_condition(p) for p in _split_top_level(text[len(name) + 1:-1])]
+            return lambda row, children=children, combine=combine: combine(c(row) for c in children)
+    column, op, value = text.split('.', 2)
+    return _filter(column, op, _unquote(value))
+
+
+def _filter(column: str, op: str, raw: str):
+    if op == 'in':
+        values = {_unquote(v) for v in _split_top_level(raw[1:-1])}
+        return lambda row: row.get(column) in values
+    compare = _OPERATORS[op]
+
+    def matches(row):
+        value = row.get(column)
+        if value is None:
+            return False
+        if isinstance(value, bool):
+            return compare(value, raw == 'true')
+        if isinstance(value, int):
+            return compare(value, int(raw))
+        if isinstance(value, float):
+            return compare(value, float(raw))
+        return compare(value, raw)
+    return matches
+
+
+class PostgRESTStub:
+    """以 InMemoryRepository 保存資料並模擬 PostgREST 回應"""
+
+    def __init__(self):
+        self.storage = InMemoryRepository(id_strategy='uuid7')
+        self.keys = {}  # idempotency_keys：key -> 資料列
+        self.request_count = 0
+        self.app = Starlette(routes=[
+            Route('/rest/v1/{table}', self.handle, methods=['GET', 'HEAD', 'POST', 'PATCH', 'DELETE'])
+        ])
+
+    def _source(self, table: str):
+        if table == KEYS_TABLE:
+            return self.keys.values()
+        if table == REVISIONS_TABLE:
+            # 對應資料庫觸發程序：每個寫入請求（語句）加一
+            return [{"name": name, "value": self.storage.revision(name)} for name in TABLES]
+        return self.storage.list(table)
+
+    def _rows(self, table: str, request: Request):
+        source = self._source(table)
+        conditions = []
+        for key, value in request.query_params.multi_items():
+            if key in ('select', 'order', 'columns'):
+                continue
+            if key == 'or':
+                conditions.append(_parse_condition('or' + value))
+            else:
+                op, raw = value.split('.', 1)
+                conditions.append(_filter(key, op, _unquote(raw)))
+        rows = [r for r in source if all(c(r) for c in conditions)]
+
+        order = request.query_params.get('order')
+        if order:
+            for term in reversed(order.split(',')):
+                column, _, direction = term.partition('.')
+                rows.sort(key=lambda r: r.get(column), reverse=direction == 'desc')
+        return rows
+
+    @staticmethod
+    def _select(request: Request, rows):
+        select = request.query_params.get('select')
+        if not select or select == '*':
+            return rows
+        columns = select.split(',')
+        return [{c: r.get(c) for c in columns} for r in rows]
+
+    async def handle_keys(self, request: Request) -> Response:
+        """冪等鍵資料表：主鍵為 key，支援 ignore-duplicates 新增與條件刪除"""
+        prefer = request.headers.get('Prefer', '')
+        representation = 'return=representation' in prefer
+        if request.method == 'POST':
+            payload = json.loads(await request.body())
+            inserted = []
+            for row in payload if isinstance(payload, list) else [payload]:
+                if row['key'] in self.keys:
+                    if 'resolution=ignore-duplicates' in prefer:
+                        continue
+                    return Response(json.dumps({"code": "23505", "message": "duplicate key"}), status_code=409,
+                                    media_type='application/json')
+                self.keys[row['key']] = row
+                inserted.append(row)
+            return Response(json.dumps(inserted) if representation else '', status_code=201,
+                            media_type='application/json')
+        rows = self._rows(KEYS_TABLE, request)
+        if request.method == 'DELETE':
+            for row in rows:
+                del self.keys[row['key']]
+        return Response(json.dumps(rows) if representation or request.method == 'GET' else '',
+                        status_code=200 if representation or request.method == 'GET' else 204,
+                        media_type='application/json')
+
+    async def handle(self, request: Request) -> Response:
+        self.request_count += 1
+        table = request.path_params['table']
+        if table == KEYS_TABLE:
+            return await self.handle_keys(request)
+        if table == REVISIONS_TABLE and request.method == 'GET':
+            return Response(json.dumps(self._select(request, self._rows(table, request))),
+                            media_type='application/json')
+        if table not in TABLES:
+            return Response(json.dumps({"message": f"relation {table} does not exist"}), status_code=404)
+        prefer = request.headers.get('Prefer', '')
+        representation = 'return=representation' in prefer
+
+        try:
+            if request.method in ('GET', 'HEAD'):
+                rows = self._rows(table, request)
+                total, start = len(rows), 0
+                if 'Range' in request.headers:
+                    start, end = (int(x) for x in request.headers['Range'].split('-'))
+                    rows = rows[start:end + 1]
+                count = str(total) if 'count=exact' in prefer else '*'
+                content_range = f"{start}-{start + len(rows) - 1}/{count}" if rows else f"*/{count}"
+                body = '' if request.method == 'HEAD' else json.dumps(self._select(request, rows))
+                return Response(body, status_code=200, media_type='application/json',
+                                headers={'Content-Range': content_range})
+
+            if request.method == 'POST':
+                payload = json.loads(await request.body())
+                payload = payload if isinstance(payload, list) else [payload]
+                columns = request.query_params.get('columns')
+                if columns:
+                    payload = [{c: row.get(c) for c in columns.split(',')} for row in payload]
+                if 'resolution=merge-duplicates' in prefer:
+                    self.storage.upsert(table, payload)
+                    rows = [self.storage.get(table, row['id']) for row in payload]
+                else:
+                    rows = [self.storage.insert(table, row) for row in payload]
+                return Response(json.dumps(rows) if representation else '', status_code=201,
+                                media_type='application/json')
+
+            rows = self._rows(table, request)
+            if request.method == 'PATCH':
+                changes = json.loads(await request.body())
+                rows = [self.storage.update(table, r['id'], {**r, **changes}) for r in rows]
+            else:
+                rows = [self.storage.delete(table, r['id']) for r in rows]
+            return Response(json.dumps(rows) if representation else '', status_code=200 if representation else 204,
+                            media_type='application/json')
+        except ConflictError as e:
+            return Response(json.dumps({"code": "23505", "message": str(e)}), status_code=409,
+                            media_type='application/json')
+
+
+async def self_test() -> bool:
+    """以 ASGI transport 對測試伺服器執行存取層的主要操作"""
+    stub = PostgRESTStub()
+    repository = AsyncPostgRESTRepository(
+        "http://stub", "test-key", batch_size=500, page_size=300,
+        transport=httpx.ASGITransport(app=stub.app)
+    )
+    ok = True
+
+    def check(name, passed):
+        nonlocal ok
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} {name}")
+
+    staff = [{"id": f"staff_{i}", "employee_id": f"E{i:04d}", "name": f"員工{i}", "brand_id": f"brand_{i % 3}",
+              "monthly_available_hours": 160, "min_rest_days_per_month": 8, "is_active": True,
+              "line_user_id": f"U{i:04d}"}
+             for i in range(20)]
+    schedules = [{"id": f"s_{i:05d}", "staff_id": f"staff_{i % 20}", "shift_type_id": "早班",
+                  "schedule_date": f"2024-{i // 20 % 12 + 1:02d}-{i // 240 % 28 + 1:02d}", "status": "scheduled"}
+                 for i in range(2000)]
+
+    before = stub.request_count
+    await repository.upsert("staff", staff)
+    await repository.upsert("schedules", schedules)
+    check("批次 upsert 2020 筆只送出 5 個請求", stub.request_count - before == 5)
+
+    await repository.upsert("schedules", [{**schedules[0], "status": "completed"}])
+    check("merge-duplicates 覆寫既有資料", (await repository.get("schedules", "s_00000"))["status"] == "completed")
+
+    before = stub.request_count
+    everything = await repository.list_schedules()
+    expected = sorted(schedules, key=lambda s: (s["schedule_date"], s["id"]))
+    check("Range 分頁讀取全部資料", [s["id"] for s in everything] == [s["id"] for s in expected])
+    check("Range 分頁請求數 (2000 / 300 = 7)", stub.request_count - before == 7)
+
+    page, after, collected = None, None, []
+    while page != []:
+        page = await repository.list_schedules(staff_id="staff_3", after=after, limit=7)
+        collected += page
+        after = (page[-1]["schedule_date"], page[-1]["id"]) if page else None
+    check("依 (schedule_date, id) 游標分頁",
+          [s["id"] for s in collected] == [s["id"] for s in expected if s["staff_id"] == "staff_3"])
+
+    check("依 LINE User ID 查詢員工", (await repository.find_staff_by_line_user("U0007"))["id"] == "staff_7"
+          and await repository.find_staff_by_line_user("U9999") is None)
+
+    in_range = await repository.list_schedules(date_from="2024-03-01", date_to="2024-03-31")
+    check("日期範圍查詢", len(in_range) == sum(1 for s in schedules if s["schedule_date"].startswith("2024-03")))
+
+    try:
+        await repository.insert("schedules", {**schedules[1], "id": None})
+        check("重複排班回傳 ConflictError", False)
+    except ConflictError:
+        check("重複排班回傳 ConflictError", True)
+
+    created = await repository.insert("leave_requests", {
+        "staff_id": "staff_1", "leave_type": "事假", "start_date": "2024-05-01",
+        "end_date": "2024-05-01", "reason": "測試", "status": "pending"
+    })
+    check("新增時由伺服器配發 ID", bool(created["id"]))
+    updated = await repository.update("leave_requests", created["id"], {**created, "status": "approved"})
+    check("更新資料", updated["status"] == "approved")
+    check("計算筆數", await repository.count("leave_requests", status="approved") == 1
+          and await repository.count("staff", is_active=True) == 20)
+    check("刪除資料", (await repository.delete("leave_requests", created["id"]))["id"] == created["id"]
+          and await repository.get("leave_requests", created["id"]) is None)
+
+    other = AsyncPostgRESTRepository("http://stub", "test-key", transport=httpx.ASGITransport(app=stub.app))
+    before = await repository.revision("schedules", "scheduling_rules")
+    await other.update("schedules", "s_00001", {**schedules[1], "status": "completed"})
+    check("版本號反映其他 worker 的寫入", await repository.revision("schedules", "scheduling_rules") == before + 1
+          and await repository.revision("staff") == await other.revision("staff"))
+    await other.close()
+
+    check("冪等鍵只能宣告一次", await repository.claim_key("line:evt-1", 60)
+          and not await repository.claim_key("line:evt-1", 60))
+    check("過期的冪等鍵可重新宣告", await repository.claim_key("line:evt-2", -1)
+          and await repository.claim_key("line:evt-2", 60))
+    await repository.release_key("line:evt-1")
+    check("釋放後可重新宣告", await repository.claim_key("line:evt-1", 60))
+
+    await repository.close()
+    return ok
+
+
+def main():
+    """主程式 - 啟動測試伺服器或執行自我測試"""
+    parser = argparse.ArgumentParser(description="本機 PostgREST 相容測試伺服器")
+    parser.add_argument("--self-test", action="store_true", help="對測試伺服器執行存取層測試")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args()
+
+    if args.self_test:
+        print("=== Supabase 存取層自我測試 ===")
+        if not asyncio.run(self_test()):
+            sys.exit(1)
+        return
+
+    import uvicorn
+    print(f"🚀 PostgREST 測試伺服器：SUPABASE_URL=http://{args.host}:{args.port}")
+    uvicorn.run(PostgRESTStub().app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷啟動效能分析
+以全新的 Python 行程（-X importtime）載入每個部署入口，量測：
+模組匯入時間（依套件與模組）、create_app、啟動事件、第一個 /health 與 Webhook 請求的延遲，
+以及各子系統（含 init_sample_data）的建立時間；結果可輸出為 JSON，
+超過絕對上限或相對於上一版基準退步時以非零狀態結束
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from collections import defaultdict
+from datetime import datetime
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.append(BACKEND_DIR)
+
+from app.config import APP_VERSION
+
+ENTRY_POINTS = [
+    "app.main",
+    "app.smart_line_main",
+    "app.push_line_main",
+    "app.full_line_main",
+    "app.line_working_main",
+    "app.working_main",
+    "app.simple_main",
+]
+# 從啟動行程到第一個 Webhook 回應的上限（毫秒）
+MAX_COLD_START_MS = 3000
+# 相對於基準的容許退步比例，以及忽略的最小差距（避免雜訊）
+TOLERANCE = 0.25
+MIN_DELTA_MS = 50
+TOP_MODULES = 15
+IMPORTED_MARKER = "@@profile imported"
+RESULT_PREFIX = "@@profile "
+
+# 在子行程中執行：匯入入口模組後，直接以 ASGI 介面送出第一個請求（不匯入 HTTP 客戶端，避免影響量測）
+PROBE = r'''
+import sys, time, json, hmac, base64, hashlib, asyncio, importlib, os
+
+entry = sys.argv[1]
+started = time.perf_counter()
+module = importlib.import_module(entry)
+import_seconds = time.perf_counter() - started
+sys.stderr.write("@@profile imported\n")
+sys.stderr.flush()
+app = module.app
+
+async def call(method, path, body=b"", headers=()):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 80),
+        "headers": [(b"content-length", str(len(body)).encode())] + list(headers),
+    }
+    status = None
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    begin = time.perf_counter()
+    await app(scope, receive, send)
+    return status, time.perf_counter() - begin
+
+async def main():
+    result = {"import_seconds": import_seconds}
+    begin = time.perf_counter()
+    await app.router.startup()
+    result["startup_seconds"] = time.perf_counter() - begin
+
+    result["health_status"], result["health_seconds"] = await call("GET", "/health")
+    result["first_response_at"] = time.time()
+    if any(getattr(route, "path", None) == "/webhook/line" for route in app.routes):
+        # 不需回覆的事件：會建立處理事件所需的子系統，但不呼叫 LINE API
+        event = {"type": "unfollow", "mode": "active", "timestamp": int(time.time() * 1000),
+                 "source": {"type": "user", "userId": "U" + "0" * 32},
+                 "webhookEventId": "01PROFILESTARTUP000000000", "deliveryContext": {"isRedelivery": False}}
+        body = json.dumps({"destination": "U" + "0" * 32, "events": [event]}).encode()
+        secret = os.getenv("LINE_CHANNEL_SECRET", "").encode()
+        signature = base64.b64encode(hmac.new(secret, body, hashlib.sha256).digest())
+        headers = [(b"content-type", b"application/json"), (b"x-line-signature", signature)]
+        result["webhook_status"], result["webhook_seconds"] = await call("POST", "/webhook/line", body, headers)
+        result["first_response_at"] = time.time()
+
+    task = getattr(app.state, "warm_up_task", None)
+    if task is not None:
+        await task
+    subsystems = getattr(app.state, "subsystems", None)
+    result["create_app_seconds"] = getattr(app.state, "create_app_seconds", None)
+    result["subsystems"] = subsystems.metrics()["construct_ms"] if subsystems else {}
+    await app.router.shutdown()
+    print("@@profile " + json.dumps(result))
+
+asyncio.run(main())
+'''
+
+
+def parse_importtime(stderr: str):
+    """解析 -X importtime 輸出，以標記分成入口匯入階段與之後（延遲匯入）的模組"""
+    phases = {"import": [], "deferred": []}
+    phase = "import"
+    for line in stderr.splitlines():
+        if line.strip() == IMPORTED_MARKER:
+            phase = "deferred"
+            continue
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        phases[phase].append((name.strip(), int(self_us), int(cumulative_us)))
+    return phases
+
+
+def summarize_modules(modules, top: int) -> dict:
+    """依頂層套件加總自身匯入時間，並列出自身耗時最高的模組（毫秒）"""
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    return {
+        "total_ms": round(sum(self_us for _, self_us, _ in modules) / 1000, 2),
+        "packages": {name: round(us / 1000, 2)
+                     for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]},
+        "modules": [{"module": name, "self_ms": round(self_us / 1000, 2), "cumulative_ms": round(cum_us / 1000, 2)}
+                    for name, self_us, cum_us in sorted(modules, key=lambda m: -m[1])[:top]],
+    }
+
+
+def profile_once(entry: str, env: dict) -> dict:
+    spawned_at = time.time()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE, entry],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=300)
+    results = [line[len(RESULT_PREFIX):] for line in proc.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+    if proc.returncode != 0 or not results:
+        raise RuntimeError(f"{entry} failed (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+    probe = json.loads(results[-1])
+    ms = lambda seconds: round(seconds * 1000, 2) if seconds is not None else None
+    run = {
+        "cold_start_ms": ms(probe["first_response_at"] - spawned_at),
+        "import_ms": ms(probe["import_seconds"]),
+        "create_app_ms": ms(probe["create_app_seconds"]),
+        "startup_ms": ms(probe["startup_seconds"]),
+        "first_request_ms": {"health": ms(probe["health_seconds"])},
+        "status": {"health": probe["health_status"]},
+        "subsystems_ms": probe["subsystems"],
+        "init_sample_data_ms": probe["subsystems"].get("init_sample_data"),
+    }
+    if "webhook_seconds" in probe:
+        run["first_request_ms"]["webhook"] = ms(probe["webhook_seconds"])
+        run["status"]["webhook"] = probe["webhook_status"]
+    phases = parse_importtime(proc.stderr)
+    run["imports"] = summarize_modules(phases["import"], TOP_MODULES)
+    run["deferred_imports"] = summarize_modules(phases["deferred"], TOP_MODULES)
+    return run
+
+
+def profile_entry(entry: str, env: dict, runs: int) -> dict:
+    """執行多次，取冷啟動時間為中位數的那一次，並附上各次的冷啟動時間"""
+    samples = sorted((profile_once(entry, env) for _ in range(runs)), key=lambda r: r["cold_start_ms"])
+    result = samples[len(samples) // 2]
+    result["cold_start_samples_ms"] = [r["cold_start_ms"] for r in samples]
+    result["cold_start_median_ms"] = statistics.median(result["cold_start_samples_ms"])
+    return result
+
+
+def check_thresholds(report: dict, max_cold_start_ms: float, baseline: dict,
+                     tolerance: float, min_delta_ms: float) -> list:
+    regressions = []
+    for entry, result in report["entry_points"].items():
+        cold = result["cold_start_median_ms"]
+        if cold > max_cold_start_ms:
+            regressions.append({"entry_point": entry, "metric": "cold_start_ms",
+                                "value": cold, "limit": max_cold_start_ms})
+        if any(status >= 500 for status in result["status"].values()):
+            regressions.append({"entry_point": entry, "metric": "status", "value": result["status"]})
+        previous = (baseline or {}).get("entry_points", {}).get(entry)
+        if previous:
+            limit = previous["cold_start_median_ms"] * (1 + tolerance)
+            if cold > limit and cold - previous["cold_start_median_ms"] > min_delta_ms:
+                regressions.append({"entry_point": entry, "metric": "cold_start_ms", "value": cold,
+                                    "baseline": previous["cold_start_median_ms"], "limit": round(limit, 2)})
+    return regressions
+
+
+def print_summary(report: dict):
+    print(f"=== 冷啟動效能分析（v{report['app_version']}，每個入口 {report['runs']} 次，"
+          f"背景預熱 {'開啟' if report['warm_up'] else '關閉'}）===")
+    for entry, r in report["entry_points"].items():
+        first = "，".join(f"{path} {value:.1f} ms" for path, value in r["first_request_ms"].items())
+        print(f"\n• {entry}：冷啟動 {r['cold_start_median_ms']:.0f} ms（匯入 {r['import_ms']:.0f} ms，"
+              f"create_app {r['create_app_ms'] or 0:.1f} ms，啟動 {r['startup_ms']:.1f} ms；第一個請求 {first}）")
+        top = "、".join(f"{name} {value:.0f}" for name, value in list(r["imports"]["packages"].items())[:5])
+        print(f"    匯入（ms）：{top}")
+        if r["subsystems_ms"]:
+            print("    子系統（ms）：" + "、".join(f"{name} {value:.1f}" for name, value in r["subsystems_ms"].items()))
+    print()
+    for regression in report["regressions"]:
+        print(f"❌ {regression['entry_point']} {regression['metric']}: {json.dumps(regression, ensure_ascii=False)}")
+    if report["passed"]:
+        print("✅ 冷啟動時間在門檻內")
+
+
+def main():
+    """主程式 - 執行冷啟動效能分析"""
+    parser = argparse.ArgumentParser(description="冷啟動效能分析")
+    parser.add_argument("--entry-points", nargs="+", default=ENTRY_POINTS, help="要量測的入口模組")
+    parser.add_argument("--runs", type=int, default=3, help="每個入口的量測次數（取中位數）")
+    parser.add_argument("--no-warm-up", action="store_true", help="停用啟動後的背景預熱（APP_WARM_UP=false）")
+    parser.add_argument("--output", help="將結果寫入 JSON 檔案")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出到標準輸出")
+    parser.add_argument("--baseline", help="上一版的 JSON 結果，用於偵測退步")
+    parser.add_argument("--max-cold-start-ms", type=float, default=MAX_COLD_START_MS, help="冷啟動時間上限")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="相對基準的容許退步比例")
+    parser.add_argument("--min-delta-ms", type=float, default=MIN_DELTA_MS, help="忽略小於此差距的退步")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "PYTHONPATH": BACKEND_DIR,
+            "LINE_CHANNEL_ACCESS_TOKEN": os.getenv("LINE_CHANNEL_ACCESS_TOKEN", "profile-access-token"),
+            "LINE_CHANNEL_SECRET": os.getenv("LINE_CHANNEL_SECRET", "profile-channel-secret"),
+            "APP_WARM_UP": "false" if args.no_warm_up else "true",
+            # 各次量測使用全新的本機檔案，與實際冷啟動相同
+            "PUSH_QUEUE_PATH": os.path.join(tmp, "push_queue.db"),
+            "STATE_STORE_PATH": os.path.join(tmp, "conversation_states.db"),
+            "SQLITE_PATH": os.path.join(tmp, "scheduling.db"),
+        }
+        entry_points = {}
+        for entry in args.entry_points:
+            entry_points[entry] = profile_entry(entry, env, max(1, args.runs))
+            for name in ("push_queue.db", "conversation_states.db", "scheduling.db"):
+                for suffix in ("", "-wal", "-shm"):
+                    path = os.path.join(tmp, name + suffix)
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    report = {
+        "schema_version": 1,
+        "app_version": APP_VERSION,
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": max(1, args.runs),
+        "warm_up": not args.no_warm_up,
+        "thresholds": {"max_cold_start_ms": args.max_cold_start_ms, "tolerance": args.tolerance,
+                       "min_delta_ms": args.min_delta_ms, "baseline": args.baseline},
+        "entry_points": entry_points,
+    }
+    report["regressions"] = check_thresholds(report, args.max_cold_start_ms, baseline,
+                                             args.tolerance, args.min_delta_ms)
+    report["passed"] = not report["regressions"]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_summary(report)
+    if not report["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -87,6 +87,8 @@ function doGet(e) {
 function checkReminders() {
   const data = Database.getAllRemindersRaw();
   const now = new Date();
+  const pushes = [];
+  const runs = [];  // runs[i]: sheet update for pushes[i], applied only after it is delivered
   
   // Skip Header (Index 0)
   for (let i = 1; i < data.length; i++) {
@@ -106,11 +108,11 @@ function checkReminders() {
         const timeStr = Utilities.formatDate(scheduledTime, "GMT+8", "HH:mm");
         const flex = createTriggerFlex(content, timeStr);
         
-        pushMessage(targetId, [{ 
+        pushes.push({ to: targetId, messages: [{ 
             type: 'flex', 
             altText: `🔔 提醒：${content}`, 
             contents: flex 
-        }]);
+        }] });
       }
       
       // 2. Schedule Next Run
@@ -122,8 +124,17 @@ function checkReminders() {
       else if (freqCode === 'WEEKLY') nextDate.setDate(nextDate.getDate() + 7);
       else if (freqCode === 'MONTHLY') nextDate.setMonth(nextDate.getMonth() + 1);
       
-      // Update DB (Next Run or Complete)
-      Database.updateReminderAfterRun(i + 1, freqCode, nextDate);
+      // Update DB (Next Run or Complete); rows with a target wait for their push
+      const run = { row: i + 1, freqCode: freqCode, nextDate: nextDate };
+      if (targetId) runs.push(run);
+      else Database.updateReminderAfterRun(run.row, run.freqCode, run.nextDate);
     }
   }
+
+  // Same reminder for many users -> one multicast call.
+  // Failed pushes keep their row as 待執行 so the next trigger retries them.
+  const delivered = sendPushes(pushes);
+  runs.forEach((run, index) => {
+    if (delivered[index]) Database.updateReminderAfterRun(run.row, run.freqCode, run.nextDate);
+  });
 }
@@ -54,6 +54,72 @@ function pushMessage(to, messages) {
   }
 }
 
+/**
+ * Sends many pushes with as few API calls as possible.
+ * pushes: [{ to, messages }]. Pushes with an identical payload are merged into
+ * one multicast per 500 users; group / room IDs still use push.
+ * Returns one flag per push: true only when the request carrying it got HTTP 200,
+ * so callers can retry the rest on the next run.
+ */
+function sendPushes(pushes) {
+  const groups = {};
+  pushes.forEach((p, index) => {
+    const key = JSON.stringify(p.messages);
+    if (!groups[key]) groups[key] = { messages: p.messages, recipients: {} };
+    const recipients = groups[key].recipients;
+    if (!recipients[p.to]) recipients[p.to] = [];
+    recipients[p.to].push(index);
+  });
+
+  const headers = {
+    'Content-Type': 'application/json',
+    'Authorization': 'Bearer ' + CONFIG.CHANNEL_ACCESS_TOKEN
+  };
+  const requests = [];
+  const covers = [];  // covers[i]: indexes of the pushes carried by requests[i]
+  Object.keys(groups).forEach(key => {
+    const group = groups[key];
+    const ids = Object.keys(group.recipients);
+    let users = ids.filter(to => to.charAt(0) === 'U');
+    let others = ids.filter(to => to.charAt(0) !== 'U');
+    if (users.length === 1) { others = others.concat(users); users = []; }
+    const indexesOf = tos => [].concat.apply([], tos.map(to => group.recipients[to]));
+    for (let i = 0; i < users.length; i += 500) {
+      const to = users.slice(i, i + 500);
+      requests.push({
+        'url': 'https://api.line.me/v2/bot/message/multicast',
+        'method': 'post', 'headers': headers, 'muteHttpExceptions': true,
+        'payload': JSON.stringify({ to: to, messages: group.messages })
+      });
+      covers.push(indexesOf(to));
+    }
+    others.forEach(to => {
+      requests.push({
+        'url': 'https://api.line.me/v2/bot/message/push',
+        'method': 'post', 'headers': headers, 'muteHttpExceptions': true,
+        'payload': JSON.stringify({ to: to, messages: group.messages })
+      });
+      covers.push(indexesOf([to]));
+    });
+  });
+
+  const delivered = pushes.map(() => false);
+  if (requests.length === 0) return delivered;
+
+  try {
+    UrlFetchApp.fetchAll(requests).forEach((response, i) => {
+      if (response.getResponseCode() === 200) {
+        covers[i].forEach(index => { delivered[index] = true; });
+      } else {
+        console.error('Push Error:', requests[i].url, response.getContentText());
+      }
+    });
+  } catch (e) {
+    console.error('Push Error:', e);
+  }
+  return delivered;
+}
+
 function getUserProfile(userId) {
   try {
     const response = UrlFetchApp.fetch(`https://api.line.me/v2/bot/profile/${userId}`, {